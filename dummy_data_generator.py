@@ -10,8 +10,9 @@ from sqlalchemy.orm import sessionmaker
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, os.path.abspath("."))
 
-# モデルとデータベース接続をインポート
-from src.database import Base, engine
+# モデルをインポート（データベース接続はmain()で作成する。
+# generate_random_frameはベンチマークからも利用するため、import時には接続しない）
+from src.database import Base, get_engine
 from src.models.frame import Frame
 
 # JSONエンコーダーをカスタマイズ
@@ -122,6 +123,7 @@ def generate_random_frame(id_num):
 
 def main():
     # データベース接続
+    engine = get_engine()
     Base.metadata.create_all(bind=engine)
     Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     db = Session()
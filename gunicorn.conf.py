@@ -0,0 +1,60 @@
+import os
+import shutil
+
+# サーバー設定（環境変数から取得）
+# アプリケーションはマスタープロセスで読み込んでからワーカーをフォークする（preload）。
+# 読み取り専用のカタログ構造はsrc.server:create_app()でフォーク前に作り、ワーカー間で共有する
+# （App Serviceのアプリ設定に.env.exampleの空のキーをコピーした場合に備え、空文字は未設定として扱う）
+wsgi_app = "src.server:create_app()"
+preload_app = (os.environ.get("GUNICORN_PRELOAD") or "true").lower() == "true"
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"{os.environ.get('HOST') or '0.0.0.0'}:{os.environ.get('PORT') or os.environ.get('WEBSITES_PORT') or '8000'}"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT") or "180")
+
+# ワーカー数の既定は1。
+# 説明生成ジョブ（src.services.explanation_jobs）はワーカープロセスのメモリに保持するため、
+# 複数ワーカーではPOSTと異なるワーカーにポーリングが届くと404になる。
+# ジョブを共有のストア（DBやRedis）に移すまでは、WEB_CONCURRENCYを2以上にする場合は
+# 説明生成ジョブのエンドポイントを使わないか、スティッキーセッションで同じワーカーに振り分けること
+workers = int(os.environ.get("WEB_CONCURRENCY") or "1")
+
+# Prometheusメトリクスを全ワーカーで集計するための共有ディレクトリ
+# （src.services.metricsより先に設定されている必要があるため、ワーカー起動前に用意する）
+prometheus_multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if prometheus_multiproc_dir:
+    # preload時はon_startingより先にアプリケーションを読み込むため、ここで作成しておく
+    os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+
+
+def on_starting(server):
+    """マスタープロセス起動時に前回の集計ファイルを削除する"""
+    if prometheus_multiproc_dir:
+        shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+        os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+
+
+def when_ready(server):
+    """ワーカーのフォーク前に、マスタープロセスのメモリ使用量を記録する"""
+    from src.services.process_memory import format_memory, memory_usage
+
+    server.log.info(f"マスタープロセス: preload={preload_app} workers={workers} {format_memory(memory_usage())}")
+    if workers > 1:
+        server.log.warning(
+            f"ワーカーが{workers}個あります。説明生成ジョブはワーカーごとに保持されるため、"
+            "ポーリングが別のワーカーに届くと404になります"
+        )
+
+
+def post_worker_init(worker):
+    """ワーカーの初期化後のメモリ使用量を記録する（sharedがマスターと共有しているページ）"""
+    from src.services.process_memory import format_memory, memory_usage
+
+    worker.log.info(f"ワーカー起動: pid={worker.pid} {format_memory(memory_usage())}")
+
+
+def child_exit(server, worker):
+    """終了したワーカーのゲージ値を集計対象から外す"""
+    if prometheus_multiproc_dir:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""カタログ全体のスコアリング（src.services.catalog_scoring）のベンチマーク
+
+カタログスナップショット（scripts/export_catalog_snapshot.pyで書き出したもの）全体のスコア上位k件を、
+プロセス数ごとに計測します。0は1プロセスでの計算で、それ以外はシャードに分けてプロセスプールで計算します
+（シャードあたりの件数が--min-shard-rowsに満たない場合は、自動的にシャード数が減ります）。
+あわせて次の点を確認します。
+- どのプロセス数でも上位k件が1プロセスでの計算と一致すること
+- ベクトル化したスコアがcrud.recommendation.rank_framesのスコア（意味的な類似度を除く）と一致すること
+
+使い方:
+    python scripts/benchmark_catalog_scoring.py --workers 0,2,4 --output catalog_scoring.json
+    python scripts/benchmark_catalog_scoring.py --workers 0,4 --baseline catalog_scoring.json
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import statistics
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# プロジェクトルートをPythonパスに追加
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from src import models, schemas
+from src.crud import recommendation as crud_recommendation
+from src.services.catalog_scoring import CatalogScorer, build_query, score_range
+from src.services.catalog_snapshot import CATALOG_SNAPSHOT_DIR, load_current_snapshot
+
+# スコアの一致を確認する行数（上位k件に加えて無作為に選ぶ行）
+PARITY_SAMPLE_SIZE = 500
+# float32で保存した寸法による誤差の許容値
+PARITY_TOLERANCE = 1e-3
+
+
+def build_request():
+    """crudの推薦と同じ入力（顔データ・顔型・スタイル設定）"""
+    face_data = schemas.FaceMeasurement(
+        id=1, user_id=1, created_at=datetime.now(),
+        face_width=138.0, eye_distance=63.0, cheek_area=45.0, nose_height=18.0, temple_position=82.0,
+    )
+    style_pref = schemas.StylePreference(
+        personal_color="秋",
+        preferred_styles=["クラシック", "ミニマル"],
+        preferred_materials=["チタン"],
+        preferred_colors=["ブラック"],
+    )
+    return face_data, crud_recommendation.analyze_face_shape(face_data), style_pref
+
+
+def check_parity(snapshot, query, face_data, face_shape, style_pref, rows: np.ndarray) -> float:
+    """ベクトル化したスコアとcrud.recommendationのスコアの最大差"""
+    scores = score_range(snapshot, query, 0, len(snapshot))
+    style_category = crud_recommendation.determine_style_category(face_shape, style_pref)
+    frames = [models.Frame(**snapshot.frame(int(row))) for row in rows]
+    ranked = crud_recommendation.rank_frames(face_data, face_shape, style_category, frames, style_pref)
+    expected = {item["frame"].id: item["total_score"] for item in ranked}
+    return max(abs(scores[row] - expected[int(snapshot.ids[row])]) for row in rows)
+
+
+def compare(result: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """中央値がベースラインより tolerance 以上遅くなったプロセス数を返す"""
+    regressions = []
+    previous_runs = {run["workers"]: run for run in baseline.get("runs", [])}
+    for current in result["runs"]:
+        previous = previous_runs.get(current["workers"])
+        if previous is None:
+            continue
+        change = (current["median_ms"] - previous["median_ms"]) / previous["median_ms"] if previous["median_ms"] else 0.0
+        print(f"workers={current['workers']}: {previous['median_ms']:.2f}ms -> {current['median_ms']:.2f}ms ({change:+.1%})")
+        if change > tolerance:
+            regressions.append(f"workers={current['workers']}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="カタログ全体のスコアリングを計測します")
+    parser.add_argument("--dir", default=CATALOG_SNAPSHOT_DIR, help="カタログスナップショットのディレクトリ")
+    parser.add_argument("--workers", default="0,2,4", help="計測するプロセス数（カンマ区切り、0は1プロセス）")
+    parser.add_argument("--min-shard-rows", type=int, default=50000, help="1シャードあたりの最小件数")
+    parser.add_argument("--k", type=int, default=10, help="取得する上位の件数")
+    parser.add_argument("--runs", type=int, default=20, help="計測回数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="結果を書き出すJSONファイル")
+    parser.add_argument("--baseline", help="比較するベースラインのJSONファイル")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="許容する悪化率（0.2 = 20%%）")
+    args = parser.parse_args(argv)
+
+    snapshot = load_current_snapshot(args.dir)
+    if snapshot is None:
+        print(f"カタログスナップショットがありません: {args.dir}（scripts/export_catalog_snapshot.pyで作成してください）")
+        return 1
+    face_data, face_shape, style_pref = build_request()
+    shapes = crud_recommendation.OPTIMAL_FRAME_SHAPES.get(face_shape, ["すべて"])
+    query = build_query(
+        snapshot, face_data.face_width, face_data.nose_height,
+        None if "すべて" in shapes else shapes,
+        style_pref.personal_color, style_pref.preferred_styles,
+        style_pref.preferred_materials, style_pref.preferred_colors,
+    )
+
+    runs = []
+    expected_rows = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        scorer = CatalogScorer(workers=workers, min_shard_rows=args.min_shard_rows)
+        try:
+            # プロセスプールの起動とスナップショットのmmapを計測から除く
+            rows, _ = scorer.top_k(snapshot, query, args.k)
+            timings = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                rows, _ = scorer.top_k(snapshot, query, args.k)
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            scorer.shutdown()
+        if expected_rows is None:
+            expected_rows = rows
+        elif not np.array_equal(rows, expected_rows):
+            print(f"workers={workers}: 上位{args.k}件が1プロセスでの計算と一致しません")
+            return 1
+        run = {
+            "workers": workers,
+            "shards": scorer.shard_count(len(snapshot)),
+            "median_ms": round(statistics.median(timings), 3),
+            "min_ms": round(min(timings), 3),
+        }
+        runs.append(run)
+        print(f"workers={workers} shards={run['shards']}: 中央値={run['median_ms']:.2f}ms 最小={run['min_ms']:.2f}ms")
+
+    sample = np.random.default_rng(args.seed).choice(len(snapshot), min(PARITY_SAMPLE_SIZE, len(snapshot)), replace=False)
+    max_diff = check_parity(snapshot, query, face_data, face_shape, style_pref, np.union1d(expected_rows, sample))
+    print(f"crud.recommendationとのスコアの最大差: {max_diff:.6f}")
+    if max_diff > PARITY_TOLERANCE:
+        print("スコアがcrud.recommendationと一致しません")
+        return 1
+
+    result = {
+        "rows": len(snapshot),
+        "catalog_version": snapshot.version,
+        "k": args.k,
+        "min_shard_rows": args.min_shard_rows,
+        "max_score_diff": max_diff,
+        "runs": runs,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f"スコアリングが遅くなりました: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""CORSミドルウェアのリクエストあたりのオーバーヘッドを計測するベンチマーク
+
+同じ軽量エンドポイントに対して、次の構成でASGIアプリを直接呼び出します（ネットワークなし）。
+- none: ミドルウェアなし（基準）
+- legacy: StarletteのCORSMiddleware + 旧`add_cors_headers`（@app.middleware("http")）
+- asgi: src.middleware.cors.CORSMiddleware
+
+使い方:
+    python scripts/benchmark_middleware.py --requests 20000
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+from typing import Dict, List, Optional
+
+# プロジェクトルートをPythonパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.cors import CORSMiddleware as StarletteCORSMiddleware
+
+from src.middleware.cors import CORSMiddleware
+
+ORIGIN = "http://localhost:3000"
+logger = logging.getLogger("benchmark.legacy")
+
+
+def build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    if variant == "legacy":
+        app.add_middleware(
+            StarletteCORSMiddleware,
+            allow_origins=["*"],
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+            expose_headers=["*"]
+        )
+
+        # 置き換え前のsrc.main.add_cors_headersと同じ処理
+        @app.middleware("http")
+        async def add_cors_headers(request: Request, call_next):
+            try:
+                response = await call_next(request)
+                allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
+                origin = request.headers.get("Origin", "")
+                if "*" in allowed_origins or origin in allowed_origins:
+                    response.headers["Access-Control-Allow-Origin"] = origin if origin else "*"
+                    response.headers["Access-Control-Allow-Credentials"] = "true"
+                    response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
+                    response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Requested-With"
+                    response.headers["Access-Control-Max-Age"] = "3600"
+                logger.info(f"リクエスト処理完了: {request.method} {request.url.path}")
+                return response
+            except Exception:
+                return JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
+    elif variant == "asgi":
+        app.add_middleware(CORSMiddleware, allow_origins=[ORIGIN])
+    return app
+
+
+async def drive(app, requests: int) -> List[float]:
+    """ASGIアプリを直接呼び出し、1リクエストごとの所要時間（秒）を返す"""
+    scope_template = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/ping",
+        "raw_path": b"/ping",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"testserver"), (b"origin", ORIGIN.encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    timings = []
+    for _ in range(requests):
+        scope = dict(scope_template)
+        started = time.perf_counter()
+        await app(scope, receive, send)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def run_variant(variant: str, requests: int, warmup: int) -> Dict[str, float]:
+    app = build_app(variant)
+    asyncio.run(drive(app, warmup))
+    timings = sorted(asyncio.run(drive(app, requests)))
+    return {
+        "mean_us": round(statistics.fmean(timings) * 1e6, 2),
+        "p50_us": round(timings[len(timings) // 2] * 1e6, 2),
+        "p99_us": round(timings[int(len(timings) * 0.99)] * 1e6, 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="CORSミドルウェアのオーバーヘッドを計測します")
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--output", help="結果を書き出すJSONファイル")
+    args = parser.parse_args(argv)
+
+    # 本番と同じINFOレベルのログを、出力先なしで有効にする
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+
+    results = {variant: run_variant(variant, args.requests, args.warmup) for variant in ("none", "legacy", "asgi")}
+    for variant in ("legacy", "asgi"):
+        results[variant]["overhead_us"] = round(results[variant]["mean_us"] - results["none"]["mean_us"], 2)
+    results["saving_per_request_us"] = round(results["legacy"]["mean_us"] - results["asgi"]["mean_us"], 2)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""サンプリングプロファイラー（src.services.stack_sampler）のオーバーヘッドを計測するベンチマーク
+
+推薦のスコアリング（FrameRecommendationService.calculate_total_score）を
+ワーカースレッドで一定時間繰り返し、サンプラーの停止時と稼働時の処理件数を比較します。
+揺らぎを抑えるため、停止・稼働を交互に複数ラウンド実行します。
+処理件数の差は環境の揺らぎ（数%）の影響を受けるため、判定にはサンプラースレッド自身の
+CPU時間の割合（sampler_cpu_ratio）を使い、--max-overheadを超えた場合は終了コード1を返します。
+
+使い方:
+    python scripts/benchmark_sampler.py --interval-ms 10 --rounds 5 --seconds 2
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import threading
+import statistics
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# プロジェクトルートをPythonパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import models
+from src.services.frame_recommendation import FrameRecommendationService
+from src.services.stack_sampler import StackSampler
+
+SHAPES = ["ラウンド", "スクエア", "オーバル", "ボストン", "ウェリントン"]
+MATERIALS = ["チタン", "アセテート", "メタル", "プラスチック"]
+STYLES = ["クラシック", "モダン", "カジュアル", "ビジネス"]
+
+
+def build_frames(count: int) -> List[models.Frame]:
+    now = datetime.now()
+    frames = []
+    for i in range(count):
+        frames.append(models.Frame(
+            id=i + 1,
+            name=f"フレーム{i}",
+            brand="Bench",
+            price=10000 + i,
+            style=STYLES[i % len(STYLES)],
+            shape=SHAPES[i % len(SHAPES)],
+            material=MATERIALS[i % len(MATERIALS)],
+            color="ブラック",
+            frame_width=130.0 + i % 15,
+            lens_width=48.0,
+            bridge_width=18.0,
+            temple_length=140.0,
+            lens_height=40.0,
+            weight=15.0 + i % 10,
+            recommended_face_width_min=125.0,
+            recommended_face_width_max=150.0,
+            recommended_nose_height_min=35.0,
+            recommended_nose_height_max=55.0,
+            personal_color_season="オータム",
+            face_shape_types=["丸型"],
+            style_tags=[STYLES[i % len(STYLES)]],
+            image_urls=[],
+            created_at=now,
+            updated_at=now,
+        ))
+    return frames
+
+
+def run_workload(seconds: float, frames: List[models.Frame]) -> int:
+    """ワーカースレッドでスコアリングを繰り返し、処理したフレーム数を返す"""
+    face = models.FaceMeasurement(
+        face_width=140.0, eye_distance=65.0, cheek_area=45.0, nose_height=45.0, temple_position=82.0
+    )
+    scored = 0
+
+    def work():
+        nonlocal scored
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for frame in frames:
+                FrameRecommendationService.calculate_total_score(
+                    frame=frame, face_measurement=face, user_preferences=[]
+                )
+            scored += len(frames)
+
+    worker = threading.Thread(target=work, name="workload")
+    worker.start()
+    worker.join()
+    return scored
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="サンプリングプロファイラーのオーバーヘッドを計測します")
+    parser.add_argument("--interval-ms", type=float, default=10.0)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seconds", type=float, default=2.0, help="1ラウンドあたりの計測時間")
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--max-overhead", type=float, default=0.02, help="許容するオーバーヘッド（割合）")
+    parser.add_argument("--output", help="結果を書き出すJSONファイル")
+    args = parser.parse_args(argv)
+
+    frames = build_frames(args.frames)
+    run_workload(0.5, frames)  # ウォームアップ
+
+    baseline: List[float] = []
+    sampled: List[float] = []
+    status: Dict = {}
+    for _ in range(args.rounds):
+        baseline.append(run_workload(args.seconds, frames) / args.seconds)
+
+        sampler = StackSampler(interval=args.interval_ms / 1000)
+        sampler.start()
+        sampled.append(run_workload(args.seconds, frames) / args.seconds)
+        sampler.stop()
+        status = sampler.status()
+
+    baseline_rate = statistics.median(baseline)
+    sampled_rate = statistics.median(sampled)
+    overhead = 1.0 - sampled_rate / baseline_rate
+    results = {
+        "interval_ms": args.interval_ms,
+        "baseline_frames_per_sec": round(baseline_rate),
+        "sampled_frames_per_sec": round(sampled_rate),
+        "throughput_overhead": round(overhead, 4),
+        "sampler_cpu_ratio": status.get("overhead_ratio"),
+        "distinct_stacks": status.get("distinct_stacks"),
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    cpu_ratio = status.get("overhead_ratio", 0.0)
+    if cpu_ratio > args.max_overhead:
+        print(f"オーバーヘッドが上限を超えています: {cpu_ratio:.2%} > {args.max_overhead:.2%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
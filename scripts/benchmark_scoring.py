@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""推薦スコアリングのマイクロベンチマーク
+
+2つのスコアリング実装について、合成カタログ（既定では100 / 1,000 / 10,000 / 100,000件）で
+各スコア関数とランキング処理全体の所要時間を計測します。
+- service: src.services.frame_recommendation.FrameRecommendationService（0〜1のスケール）
+- crud: src.crud.recommendation.calculate_fit_score / calculate_style_score（0〜100のスケール）
+
+カタログはdummy_data_generator.generate_random_frameと同じ分布で、--seedにより再現可能です。
+フレームはORMオブジェクト（DBには保存しない）として生成し、本番と同じ属性アクセスのコストを含めます。
+意味的な類似度（エンベディング）は外部APIに依存するため計測対象外です。
+
+使い方:
+    python scripts/benchmark_scoring.py --output scoring.json
+    python scripts/benchmark_scoring.py --sizes 100,1000 --baseline scoring.json
+"""
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# プロジェクトルートをPythonパスに追加
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from dummy_data_generator import generate_random_frame
+from src import models, schemas
+from src.crud import recommendation as crud_recommendation
+from src.services.frame_recommendation import FrameRecommendationService
+
+DEFAULT_SIZES = "100,1000,10000,100000"
+# レスポンスに含める推薦の件数（crudの推薦理由の生成対象）
+TOP_K = 5
+
+
+def build_catalog(size: int, seed: int) -> List[models.Frame]:
+    """generate_random_frameの分布で合成カタログを生成する"""
+    random.seed(seed)
+    return [models.Frame(id=i + 1, **generate_random_frame(i + 1)) for i in range(size)]
+
+
+def build_inputs() -> Dict:
+    """両方の実装に渡す顔データとスタイル設定"""
+    measurements = dict(face_width=138.0, eye_distance=63.0, cheek_area=45.0, nose_height=18.0, temple_position=82.0)
+    style_pref = schemas.StylePreference(
+        personal_color="秋",
+        preferred_styles=["クラシック", "ミニマル"],
+        preferred_shapes=["ウェリントン"],
+        preferred_materials=["チタン"],
+        preferred_colors=["ブラック"],
+    )
+    user_preferences = []
+    for category, values in (
+        ("style", style_pref.preferred_styles),
+        ("shape", style_pref.preferred_shapes),
+        ("material", style_pref.preferred_materials),
+    ):
+        for value in values:
+            user_preferences.append(models.UserResponse(
+                preference=models.Preference(category=category, preference_value=value, display_name=value)
+            ))
+    face_schema = schemas.FaceMeasurement(id=1, user_id=1, created_at=datetime.now(), **measurements)
+    face_shape = crud_recommendation.analyze_face_shape(face_schema)
+    return {
+        "face_model": models.FaceMeasurement(**measurements),
+        "face_schema": face_schema,
+        "face_shape": face_shape,
+        "style_category": crud_recommendation.determine_style_category(face_shape, style_pref),
+        "style_pref": style_pref,
+        "user_preferences": user_preferences,
+    }
+
+
+def build_benchmarks(inputs: Dict) -> Dict[str, Callable[[List[models.Frame]], object]]:
+    """ベンチマーク名とカタログ全体を処理する関数の対応"""
+    service = FrameRecommendationService
+    face_model = inputs["face_model"]
+    face_schema = inputs["face_schema"]
+    face_shape = inputs["face_shape"]
+    style_category = inputs["style_category"]
+    style_pref = inputs["style_pref"]
+    user_preferences = inputs["user_preferences"]
+
+    def crud_pipeline(frames):
+        ranked = crud_recommendation.rank_frames(face_schema, face_shape, style_category, frames, style_pref)
+        for item in ranked[:TOP_K]:
+            item["reason"] = crud_recommendation.generate_recommendation_reason(
+                face_shape, style_category, item["fit_score"], item["style_score"], item["frame"]
+            )
+        return ranked
+
+    return {
+        "service.fit_score": lambda frames: [service.calculate_fit_score(f, face_model) for f in frames],
+        "service.design_score": lambda frames: [
+            service.calculate_design_score(f, face_model, user_preferences) for f in frames
+        ],
+        "service.comfort_score": lambda frames: [service.calculate_comfort_score(f, face_model) for f in frames],
+        "service.reason": lambda frames: [service.get_recommendation_reason(f, 0.7, 0.7, 0.7) for f in frames],
+        "service.total_score": lambda frames: [
+            service.calculate_total_score(f, face_model, user_preferences) for f in frames
+        ],
+        "service.rank_frames": lambda frames: service.rank_frames(frames, face_model, user_preferences),
+        "crud.fit_score": lambda frames: [crud_recommendation.calculate_fit_score(face_schema, f) for f in frames],
+        "crud.style_score": lambda frames: [
+            crud_recommendation.calculate_style_score(face_shape, style_category, f, style_pref) for f in frames
+        ],
+        "crud.reason": lambda frames: [
+            crud_recommendation.generate_recommendation_reason(face_shape, style_category, 80.0, 75.0, f)
+            for f in frames
+        ],
+        "crud.rank_frames": lambda frames: crud_recommendation.rank_frames(
+            face_schema, face_shape, style_category, frames, style_pref
+        ),
+        "crud.pipeline": crud_pipeline,
+    }
+
+
+def time_benchmark(func: Callable, frames: List[models.Frame], repeat: int, budget: float) -> Dict[str, float]:
+    """repeat回（合計がbudget秒を超えた時点で打ち切り）実行し、所要時間を集計する"""
+    timings = []
+    total = 0.0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(frames)
+        elapsed = time.perf_counter() - started
+        timings.append(elapsed)
+        total += elapsed
+        if total > budget:
+            break
+    median = statistics.median(timings)
+    return {
+        "runs": len(timings),
+        "min_s": round(min(timings), 6),
+        "median_s": round(median, 6),
+        "per_frame_us": round(median / len(frames) * 1e6, 3),
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """フレームあたりの時間がベースラインより tolerance 以上遅くなった項目を返す"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        before, after = previous["per_frame_us"], current["per_frame_us"]
+        change = (after - before) / before if before else 0.0
+        print(f"{key}: {before:.3f}us -> {after:.3f}us ({change:+.1%})")
+        if change > tolerance:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="推薦スコアリングの各関数とランキング処理を計測します")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="カタログの件数（カンマ区切り）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5, help="1項目あたりの最大実行回数")
+    parser.add_argument("--budget", type=float, default=5.0, help="1項目あたりの計測時間の目安（秒）")
+    parser.add_argument("--only", help="計測するベンチマーク名の接頭辞（例: crud.）")
+    parser.add_argument("--output", help="結果を書き出すJSONファイル")
+    parser.add_argument("--baseline", help="比較するベースラインのJSONファイル")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="許容する悪化率（0.2 = 20%%）")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    benchmarks = build_benchmarks(build_inputs())
+    if args.only:
+        benchmarks = {name: func for name, func in benchmarks.items() if name.startswith(args.only)}
+
+    results: Dict[str, Dict[str, float]] = {}
+    for size in sizes:
+        frames = build_catalog(size, args.seed)
+        for name, func in benchmarks.items():
+            func(frames[:100])  # ウォームアップ
+            key = f"{name}@{size}"
+            results[key] = time_benchmark(func, frames, args.repeat, args.budget)
+            print(f"{key}: median={results[key]['median_s']:.4f}s per_frame={results[key]['per_frame_us']:.2f}us")
+
+    output = {
+        "python": sys.version.split()[0],
+        "seed": args.seed,
+        "sizes": sizes,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get("results", {}), args.tolerance)
+        if regressions:
+            print(f"スコアリングの性能が悪化しました: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""起動時間のベンチマーク
+
+新しいPythonプロセスを毎回起動し、次の値を計測します。
+- import: `import src.main` に要した時間
+- first_response: プロセス起動から最初のレスポンス（/api/health）が返るまでの時間
+  （--server指定時はuvicornワーカーを起動してHTTPで計測）
+
+使い方:
+    python scripts/benchmark_startup.py --runs 10 --output startup.json
+    python scripts/benchmark_startup.py --server --runs 5 --baseline startup.json
+"""
+import sys
+import os
+import json
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.request
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子プロセスで実行する計測コード（ASGIアプリを直接呼び出す）
+IN_PROCESS_PROBE = r"""
+import json, sys, time
+started = time.perf_counter()
+import src.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(src.main.app) as client:
+    status = client.get(sys.argv[1]).status_code
+responded = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "first_response": responded - started,
+    "status": status,
+    "modules": len(sys.modules),
+    "heavy_modules": sorted(m for m in ("openai", "numpy", "pandas", "sklearn", "sqlite3") if m in sys.modules),
+}))
+"""
+
+# 子プロセスで実行するimportのみの計測コード（--server時）
+IMPORT_PROBE = r"""
+import json, time
+started = time.perf_counter()
+import src.main
+print(json.dumps({"import": time.perf_counter() - started}))
+"""
+
+
+def _child_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = PROJECT_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    return env
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_in_process(path: str) -> Dict:
+    """新しいプロセスでimportとASGI経由の最初のレスポンスを計測する"""
+    result = subprocess.run(
+        [sys.executable, "-c", IN_PROCESS_PROBE, path],
+        cwd=PROJECT_ROOT, env=_child_env(), capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_server(path: str, timeout: float) -> Dict:
+    """uvicornワーカーを起動し、HTTPで最初のレスポンスが返るまでを計測する"""
+    imported = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        cwd=PROJECT_ROOT, env=_child_env(), capture_output=True, text=True, check=True,
+    )
+    sample = json.loads(imported.stdout.strip().splitlines()[-1])
+
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=PROJECT_ROOT, env=_child_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if time.perf_counter() - started > timeout:
+                raise TimeoutError(f"{timeout}秒以内にレスポンスがありませんでした: {url}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    sample["status"] = response.status
+                    break
+            except OSError:
+                time.sleep(0.01)
+        sample["first_response"] = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return sample
+
+
+def summarize(samples: List[Dict], key: str) -> Dict[str, float]:
+    values = sorted(s[key] for s in samples)
+    return {
+        "min": round(values[0], 4),
+        "median": round(statistics.median(values), 4),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 4),
+        "max": round(values[-1], 4),
+    }
+
+
+def compare(summary: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """中央値がベースラインより tolerance 以上遅くなった項目を返す"""
+    regressions = []
+    for key in ("import", "first_response"):
+        if key not in summary or key not in baseline:
+            continue
+        current, previous = summary[key]["median"], baseline[key]["median"]
+        change = (current - previous) / previous if previous else 0.0
+        print(f"{key}: {previous:.4f}s -> {current:.4f}s ({change:+.1%})")
+        if change > tolerance:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="import src.main と最初のレスポンスまでの時間を計測します")
+    parser.add_argument("--runs", type=int, default=5, help="計測回数（毎回新しいプロセスを起動）")
+    parser.add_argument("--path", default="/api/health", help="最初に呼び出すエンドポイント")
+    parser.add_argument("--server", action="store_true", help="uvicornを起動してHTTPで計測する")
+    parser.add_argument("--timeout", type=float, default=60.0, help="--server時の起動待ちの上限（秒）")
+    parser.add_argument("--output", help="結果を書き出すJSONファイル")
+    parser.add_argument("--baseline", help="比較するベースラインのJSONファイル")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="許容する悪化率（0.2 = 20%%）")
+    args = parser.parse_args(argv)
+
+    samples = []
+    for i in range(args.runs):
+        sample = run_server(args.path, args.timeout) if args.server else run_in_process(args.path)
+        samples.append(sample)
+        print(f"run {i + 1}/{args.runs}: import={sample['import']:.4f}s first_response={sample['first_response']:.4f}s")
+
+    result = {
+        "mode": "server" if args.server else "in_process",
+        "path": args.path,
+        "runs": args.runs,
+        "python": sys.version.split()[0],
+        "import": summarize(samples, "import"),
+        "first_response": summarize(samples, "first_response"),
+        "heavy_modules": samples[-1].get("heavy_modules"),
+        "samples": samples,
+    }
+    print(json.dumps({k: result[k] for k in ("mode", "import", "first_response", "heavy_modules")}, ensure_ascii=False, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f"起動時間が悪化しました: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""gunicornワーカーごとのメモリ使用量のベンチマーク
+
+gunicorn.conf.py（src.server:create_app）でサーバーを起動し、preloadの有無ごとに次の値を計測します。
+- ワーカーごとのRSS・PSS・共有（マスターや他のワーカーと共有しているページ）・専有
+- 全プロセスのPSSの合計（実際に消費している物理メモリ）
+- --duration指定時は、負荷をかけた後の値とスループット
+
+使い方:
+    python scripts/benchmark_workers.py --workers 4 --output workers.json
+    python scripts/benchmark_workers.py --workers 4 --duration 10 --path /api/v1/frames --baseline workers.json
+"""
+import sys
+import os
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import urllib.request
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from src.services.process_memory import child_pids, memory_usage
+
+MB = 1024 * 1024
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(process: subprocess.Popen, url: str, workers: int, timeout: float) -> None:
+    """全ワーカーが起動し、ヘルスチェックが応答するまで待つ"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicornが終了しました: 終了コード={process.returncode}")
+        if len(child_pids(process.pid)) >= workers:
+            try:
+                with urllib.request.urlopen(url, timeout=1):
+                    return
+            except OSError:
+                pass
+        time.sleep(0.1)
+    raise TimeoutError(f"{timeout}秒以内に起動しませんでした: {url}")
+
+
+def _drive_load(url: str, duration: float, concurrency: int) -> Dict[str, float]:
+    """duration秒間、concurrency本のスレッドでリクエストを送り続ける"""
+    counts = [0] * concurrency
+    errors = [0] * concurrency
+    deadline = time.perf_counter() + duration
+
+    def _run(index: int) -> None:
+        while time.perf_counter() < deadline:
+            try:
+                with urllib.request.urlopen(url, timeout=10) as response:
+                    response.read()
+                counts[index] += 1
+            except OSError:
+                errors[index] += 1
+
+    threads = [threading.Thread(target=_run, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {"requests": sum(counts), "errors": sum(errors), "requests_per_second": sum(counts) / duration}
+
+
+def run(preload: bool, args) -> Dict:
+    """gunicornを起動して、マスターと各ワーカーのメモリ使用量を計測する"""
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": PROJECT_ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+        "WEB_CONCURRENCY": str(args.workers),
+        "GUNICORN_PRELOAD": "true" if preload else "false",
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+    })
+    env.setdefault("LOG_LEVEL", "WARNING")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_ready(process, f"http://127.0.0.1:{port}/api/health", args.workers, args.timeout)
+        load = None
+        if args.duration > 0:
+            load = _drive_load(f"http://127.0.0.1:{port}{args.path}", args.duration, args.concurrency)
+        master = memory_usage(process.pid)
+        workers = [{"pid": pid, **memory_usage(pid)} for pid in child_pids(process.pid)]
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    return {
+        "preload": preload,
+        "workers": workers,
+        "master": master,
+        "total_pss_mb": round((master.get("pss", 0) + sum(w.get("pss", 0) for w in workers)) / MB, 1),
+        "worker_private_mb": round(sum(w.get("private", 0) for w in workers) / len(workers) / MB, 1),
+        "worker_shared_mb": round(sum(w.get("shared", 0) for w in workers) / len(workers) / MB, 1),
+        "load": load,
+    }
+
+
+def compare(result: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """PSSの合計とワーカーの専有メモリが、ベースラインより tolerance 以上増えた項目を返す"""
+    regressions = []
+    previous_runs = {run["preload"]: run for run in baseline.get("runs", [])}
+    for current in result["runs"]:
+        previous = previous_runs.get(current["preload"])
+        if previous is None:
+            continue
+        for key in ("total_pss_mb", "worker_private_mb"):
+            change = (current[key] - previous[key]) / previous[key] if previous[key] else 0.0
+            print(f"preload={current['preload']} {key}: {previous[key]:.1f}MB -> {current[key]:.1f}MB ({change:+.1%})")
+            if change > tolerance:
+                regressions.append(f"preload={current['preload']} {key}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="gunicornワーカーごとのメモリ使用量を計測します")
+    parser.add_argument("--workers", type=int, default=4, help="ワーカー数")
+    parser.add_argument("--mode", choices=("both", "preload", "no-preload"), default="both")
+    parser.add_argument("--duration", type=float, default=0.0, help="計測前に負荷をかける秒数（0の場合はかけない）")
+    parser.add_argument("--concurrency", type=int, default=16, help="負荷をかけるスレッド数")
+    parser.add_argument("--path", default="/api/health", help="負荷をかけるエンドポイント")
+    parser.add_argument("--timeout", type=float, default=120.0, help="起動待ちの上限（秒）")
+    parser.add_argument("--output", help="結果を書き出すJSONファイル")
+    parser.add_argument("--baseline", help="比較するベースラインのJSONファイル")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="許容する増加率（0.2 = 20%%）")
+    args = parser.parse_args(argv)
+
+    modes = {"both": (False, True), "preload": (True,), "no-preload": (False,)}[args.mode]
+    runs = []
+    for preload in modes:
+        result = run(preload, args)
+        runs.append(result)
+        line = (f"preload={preload}: ワーカー{len(result['workers'])}個 PSS合計={result['total_pss_mb']:.1f}MB "
+                f"ワーカーあたり 専有={result['worker_private_mb']:.1f}MB 共有={result['worker_shared_mb']:.1f}MB")
+        if result["load"]:
+            line += f" {result['load']['requests_per_second']:.0f}req/s"
+        print(line)
+
+    result = {"workers": args.workers, "path": args.path, "duration": args.duration, "runs": runs}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f"メモリ使用量が増えました: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""カタログスナップショットの書き出し
+
+framesテーブルを列指向のファイル（数値の列は.npy、文字列の列は辞書符号化、タグはビットセット）に書き出し、
+CATALOG_SNAPSHOT_DIR/<カタログのバージョン>/ に配置してCURRENTを更新します。
+カタログが変わっていなければ何もしません。--verifyを指定すると、書き出したスナップショットを開く時間と
+ORMで全フレームを読み込む時間を比較し、内容がデータベースと一致するかを確認します。
+
+使い方:
+    python scripts/export_catalog_snapshot.py
+    python scripts/export_catalog_snapshot.py --force --verify --output snapshot.json
+"""
+import sys
+import os
+import json
+import time
+import argparse
+from typing import Dict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from src.database import SessionLocal, engine_provider
+from src.models.frame import Frame
+from src.services.catalog_snapshot import CATALOG_SNAPSHOT_DIR, CatalogSnapshot, export_snapshot
+
+# 内容を比較するフレーム数
+VERIFY_SAMPLE_SIZE = 200
+
+
+def verify(path: str) -> Dict[str, float]:
+    """スナップショットを開く時間とORMでの読み込み時間を計測し、先頭のフレームの内容を比較する"""
+    started = time.perf_counter()
+    snapshot = CatalogSnapshot(path)
+    open_seconds = time.perf_counter() - started
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        frames = db.query(Frame).order_by(Frame.id).all()
+        orm_seconds = time.perf_counter() - started
+    finally:
+        db.close()
+
+    if len(frames) != len(snapshot):
+        raise SystemExit(f"件数が一致しません: データベース={len(frames)}, スナップショット={len(snapshot)}")
+    for row, frame in enumerate(frames[:VERIFY_SAMPLE_SIZE]):
+        record = snapshot.frame(row)
+        for name in ("id", "name", "brand", "price", "shape", "material", "color", "style_tags", "face_shape_types"):
+            expected, actual = getattr(frame, name), record[name]
+            # タグはビットセットのため、順序は語彙の順になる
+            if name in ("style_tags", "face_shape_types"):
+                expected = set(json.loads(expected) if isinstance(expected, str) else expected or [])
+                actual = set(actual)
+            if expected != actual:
+                raise SystemExit(f"内容が一致しません: id={frame.id} {name} {expected!r} != {actual!r}")
+        if frame.frame_width is not None and abs(frame.frame_width - record["frame_width"]) > 1e-3:
+            raise SystemExit(f"内容が一致しません: id={frame.id} frame_width")
+    return {"open_ms": open_seconds * 1000, "orm_load_ms": orm_seconds * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="カタログスナップショットの書き出し")
+    parser.add_argument("--dir", default=CATALOG_SNAPSHOT_DIR, help="書き出し先のディレクトリ")
+    parser.add_argument("--force", action="store_true", help="同じバージョンが存在しても書き出し直す")
+    parser.add_argument("--verify", action="store_true", help="読み込み時間の計測と内容の比較を行う")
+    parser.add_argument("--output", help="結果をJSONで保存するファイル")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    manifest = export_snapshot(engine_provider.get_engine(), args.dir, force=args.force)
+    path = os.path.join(args.dir, manifest["catalog_version"])
+    snapshot = CatalogSnapshot(path)
+    result = {**snapshot.info(), "export_seconds": time.perf_counter() - started}
+    print(f"バージョン: {result['catalog_version']}  件数: {result['rows']}  "
+          f"サイズ: {result['bytes'] / 1024:.1f}KB  ({result['export_seconds']:.2f}秒)")
+
+    if args.verify:
+        result.update(verify(path))
+        print(f"スナップショットを開く時間: {result['open_ms']:.2f}ms  "
+              f"ORMでの読み込み: {result['orm_load_ms']:.1f}ms  内容は一致しました")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""再現可能な大規模合成データの生成
+
+フレーム・ユーザー・顔測定・アンケート回答を、numpyでまとめて（1行ずつではなく列単位で）生成します。
+dummy_data_generator.pyの一様乱数と異なり、本番に近い相関を持たせています。
+- フレーム: レンズ幅・ブリッジ幅からフレーム幅、形状からレンズの高さ、フレーム幅からテンプル長、
+  素材と大きさから重さ、ブランドから価格が決まる。スタイル・形状・カラーの人気は偏りがあり（Zipf分布）、
+  カラーは素材、パーソナルカラーはカラー、似合う顔の形は形状、スタイルタグは主スタイルとの共起に従う
+- 顔測定: 性別ごとの平均と、各部位の相関を持つ多変量正規分布
+- アンケート回答: ユーザーごとの嗜好のタイプ（ビジネス・カジュアルなど）に応じた複数選択
+
+データはBLOCK_SIZE件ごとに (--seed, テーブル, ブロック番号) から乱数を初期化して生成するため、
+同じ--seedと件数からは出力形式やバッチサイズによらず同じデータが得られます。
+
+出力形式:
+- db: データベースへ一括INSERT（IDは既存の最大値の次から採番し、質問・選択肢のマスターがなければ作成する）
+- json: テーブルごとのJSON Lines（<テーブル名>.jsonl）
+- csv: テーブルごとのCSV（リストの列はJSON文字列）
+- parquet: テーブルごとのディレクトリにブロック単位のParquetファイル（pyarrowが必要）
+
+使い方:
+    python scripts/generate_synthetic_data.py --frames 1000000 --users 200000 --format parquet
+    python scripts/generate_synthetic_data.py --frames 100000 --users 10000 --format db
+"""
+import sys
+import os
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# プロジェクトルートをPythonパスに追加
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+# 乱数を初期化する単位の件数（出力の再現性はこの値に依存する）
+BLOCK_SIZE = 100_000
+# 乱数の系列をテーブルごとに分ける番号
+STREAM_FRAMES, STREAM_USERS, STREAM_FACES, STREAM_RESPONSES = 1, 2, 3, 4
+# created_at等の基準日（--as-ofで変更可）
+DEFAULT_AS_OF = "2025-01-01"
+FORMATS = ("db", "json", "csv", "parquet")
+
+# ブランドと人気・価格の中央値（千円）
+BRANDS = ["Zoff", "JINS", "Ray-Ban", "Oakley", "Oliver Peoples", "Tom Ford", "Persol", "Gucci"]
+BRAND_WEIGHTS = np.array([0.25, 0.25, 0.15, 0.10, 0.05, 0.05, 0.07, 0.08])
+BRAND_PRICE_MEDIAN = np.array([8, 9, 22, 20, 45, 50, 35, 48])
+
+STYLES = ["クラシック", "モダン", "カジュアル", "ビジネス", "スポーティ", "レトロ", "ミニマル"]
+# スタイルタグの共起の重み（行: 主スタイル、列: 追加するタグ）
+STYLE_COOCCURRENCE = np.array([
+    [0, 1, 1, 4, 0.2, 5, 2],
+    [1, 0, 3, 3, 1, 0.5, 5],
+    [1, 3, 0, 0.5, 4, 2, 2],
+    [4, 3, 0.5, 0, 0.2, 1, 5],
+    [0.2, 2, 5, 0.2, 0, 0.2, 1],
+    [5, 0.5, 3, 1, 0.2, 0, 1],
+    [2, 5, 2, 4, 0.5, 1, 0],
+])
+
+SHAPES = ["ラウンド", "スクエア", "オーバル", "キャットアイ", "ティアドロップ", "ウェリントン", "ボストン", "ブロー"]
+# 形状ごとのレンズの縦横比
+SHAPE_ASPECT = np.array([0.90, 0.78, 0.80, 0.72, 0.90, 0.80, 0.88, 0.75])
+
+FACE_SHAPES = ["丸型", "四角型", "卵型", "ハート型", "逆三角形", "長方形"]
+# 形状ごとの似合う顔の形の重み（行: SHAPES、列: FACE_SHAPES）
+SHAPE_FACE_AFFINITY = np.array([
+    [0.3, 5, 2, 1, 1, 4],
+    [5, 0.3, 3, 1, 1, 0.5],
+    [2, 4, 2, 1, 3, 2],
+    [4, 1, 2, 4, 0.5, 1],
+    [1, 4, 3, 1, 1, 2],
+    [5, 1, 4, 3, 1, 1],
+    [1, 3, 2, 1, 4, 3],
+    [1, 1, 3, 3, 4, 1],
+])
+
+MATERIALS = ["プラスチック", "メタル", "チタン", "アセテート", "コンビネーション"]
+MATERIAL_WEIGHTS = np.array([0.25, 0.20, 0.20, 0.25, 0.10])
+# 素材ごとの標準的な重さ（g、フレーム幅135mm・レンズ高さ40mm相当）
+MATERIAL_BASE_WEIGHT = np.array([18.0, 20.0, 14.0, 24.0, 20.0])
+
+COLORS = ["ブラック", "ブラウン", "ゴールド", "シルバー", "ブルー", "レッド", "グリーン", "クリア", "トータス"]
+# 素材ごとのカラーの重み（行: MATERIALS、列: COLORS）
+MATERIAL_COLOR = np.array([
+    [6, 2, 0.1, 0.2, 2, 1.5, 1, 3, 1],
+    [2, 1, 5, 5, 1, 0.3, 0.3, 0.1, 0.1],
+    [2, 1, 4, 6, 1, 0.2, 0.2, 0.1, 0.1],
+    [5, 3, 0.1, 0.1, 1, 1, 1, 3, 5],
+    [5, 3, 2, 2, 0.5, 0.3, 0.3, 0.5, 3],
+])
+
+PERSONAL_COLORS = ["春", "夏", "秋", "冬"]
+# カラーごとのパーソナルカラーの重み（行: COLORS、列: PERSONAL_COLORS）
+COLOR_SEASON = np.array([
+    [1, 1, 1, 5],
+    [2, 0.5, 5, 0.5],
+    [4, 0.5, 4, 0.5],
+    [0.5, 4, 0.5, 4],
+    [1, 4, 0.5, 3],
+    [3, 1, 1, 3],
+    [2, 1, 4, 0.5],
+    [4, 4, 1, 1],
+    [1, 0.5, 5, 0.5],
+])
+
+GENDERS = ["male", "female", "other"]
+GENDER_WEIGHTS = np.array([0.48, 0.48, 0.04])
+# 顔測定の列と性別ごとの平均・共通の標準偏差・相関
+FACE_COLUMNS = ["face_width", "eye_distance", "cheek_area", "nose_height", "temple_position"]
+FACE_MEANS = {
+    "male": np.array([141.0, 64.5, 46.0, 20.0, 84.0]),
+    "female": np.array([134.0, 61.5, 43.0, 18.0, 80.0]),
+    "other": np.array([137.5, 63.0, 44.5, 19.0, 82.0]),
+}
+FACE_STDS = np.array([4.5, 2.5, 4.0, 3.0, 3.0])
+FACE_CORRELATION = np.array([
+    [1.00, 0.60, 0.55, 0.20, 0.75],
+    [0.60, 1.00, 0.30, 0.15, 0.50],
+    [0.55, 0.30, 1.00, 0.10, 0.40],
+    [0.20, 0.15, 0.10, 1.00, 0.15],
+    [0.75, 0.50, 0.40, 0.15, 1.00],
+])
+
+# アンケートの質問IDと選択肢のプリファレンスID（crud.questionnaire.ensure_test_data_existsのマスターと同じ）
+QUESTION_PREFERENCES = {
+    1: [1, 2, 3, 4, 5],  # シーン
+    2: [11, 12, 13, 14, 15, 16, 17, 18, 19],  # イメージ
+    3: [20, 21, 22, 23, 24, 25, 26, 27],  # ファッション
+}
+PERSONAL_COLOR_QUESTION = 4
+PERSONAL_COLOR_PREFERENCES = [28, 29, 30, 31, 32]
+PERSONAL_COLOR_WEIGHTS = np.array([0.20, 0.22, 0.18, 0.20, 0.20])
+# 嗜好のタイプごとに選ばれやすい選択肢（プリファレンスID）
+PERSONAS = {
+    "business": [1, 11, 13, 15, 21, 24],
+    "casual": [2, 3, 14, 16, 18, 20, 25],
+    "sporty": [3, 4, 12, 15, 17, 22, 26],
+    "mode": [2, 3, 15, 16, 23, 25],
+    "natural": [2, 13, 14, 20, 24],
+}
+PERSONA_WEIGHTS = np.array([0.25, 0.30, 0.15, 0.10, 0.20])
+PERSONA_SELECT_PROB = 0.6
+BASE_SELECT_PROB = 0.08
+OTHER_SELECT_PROB = 0.02
+OTHER_PREFERENCES = {5, 19, 27}
+
+
+def block_rng(seed: int, stream: int, block: int) -> np.random.Generator:
+    """(シード, テーブル, ブロック番号) から乱数を初期化する"""
+    return np.random.default_rng([seed, stream, block])
+
+
+def zipf_weights(count: int, exponent: float = 1.1) -> np.ndarray:
+    """人気の偏り（順位の累乗に反比例）"""
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+
+def sample_rows(rng: np.random.Generator, weights: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """行ごとに異なる重み（weights[rows]）で1つずつ選ぶ"""
+    probs = weights[rows] / weights[rows].sum(axis=1, keepdims=True)
+    cumulative = probs.cumsum(axis=1)
+    draws = rng.random((len(rows), 1))
+    return np.minimum((cumulative < draws).sum(axis=1), weights.shape[1] - 1)
+
+
+def sample_tags(
+    rng: np.random.Generator,
+    weights: np.ndarray,
+    names: List[str],
+    counts: np.ndarray,
+    forced: Optional[np.ndarray] = None,
+) -> List[List[str]]:
+    """行ごとに重み付きで重複なくcounts個を選ぶ（Gumbel-top-k、forcedの列は必ず含める）"""
+    keys = np.log(np.maximum(weights, 1e-12)) + rng.gumbel(size=weights.shape)
+    if forced is not None:
+        keys[np.arange(len(keys)), forced] = np.inf
+    order = np.argsort(-keys, axis=1)
+    names_array = np.array(names, dtype=object)
+    tags: List[Optional[List[str]]] = [None] * len(counts)
+    for k in np.unique(counts):
+        rows = np.flatnonzero(counts == k)
+        for row, selected in zip(rows, names_array[order[rows, :k]].tolist()):
+            tags[row] = selected
+    return tags
+
+
+def random_datetimes(rng: np.random.Generator, size: int, as_of: datetime, days: int) -> np.ndarray:
+    """基準日までのdays日間に一様に分布する日時"""
+    offsets = rng.integers(0, days * 86400, size=size)
+    return (np.datetime64(as_of, "s") - offsets.astype("timedelta64[s]")).astype("datetime64[ns]")
+
+
+def generate_frames(rng: np.random.Generator, start_id: int, size: int, as_of: datetime) -> pd.DataFrame:
+    """フレームのブロックを生成する"""
+    ids = np.arange(start_id, start_id + size)
+    brand = rng.choice(len(BRANDS), size=size, p=BRAND_WEIGHTS)
+    style = rng.choice(len(STYLES), size=size, p=zipf_weights(len(STYLES)))
+    shape = rng.choice(len(SHAPES), size=size, p=zipf_weights(len(SHAPES), 0.8))
+    material = rng.choice(len(MATERIALS), size=size, p=MATERIAL_WEIGHTS)
+    color = sample_rows(rng, MATERIAL_COLOR, material)
+    season = sample_rows(rng, COLOR_SEASON, color)
+
+    # サイズは部位どうしの関係から決める
+    lens_width = np.clip(rng.normal(50.0, 2.5, size), 44.0, 56.0)
+    bridge_width = np.clip(rng.normal(18.5, 1.5, size) + (lens_width - 50.0) * 0.15, 14.0, 23.0)
+    frame_width = np.clip(2 * lens_width + bridge_width + rng.normal(17.0, 3.0, size), 120.0, 150.0)
+    lens_height = np.clip(lens_width * SHAPE_ASPECT[shape] + rng.normal(0.0, 1.5, size), 28.0, 55.0)
+    temple_length = np.clip(np.round((135.0 + 0.45 * (frame_width - 125.0) + rng.normal(0.0, 2.5, size)) / 5) * 5, 130, 155)
+    weight = MATERIAL_BASE_WEIGHT[material] * (frame_width * lens_height) / (135.0 * 40.0) + rng.normal(0.0, 1.5, size)
+    nose_height_min = np.clip(10.0 + (bridge_width - 14.0) * 0.4 + rng.uniform(0.0, 2.0, size), 10.0, 15.0)
+    nose_height_max = np.clip(nose_height_min + rng.uniform(7.0, 11.0, size), 20.0, 25.0)
+    price = np.maximum(5, np.round(BRAND_PRICE_MEDIAN[brand] * rng.lognormal(0.0, 0.2, size))) * 1000
+
+    # 似合う顔の形は形状、スタイルタグは主スタイルとの共起に従って1〜3個選ぶ
+    face_shape_types = sample_tags(rng, SHAPE_FACE_AFFINITY[shape], FACE_SHAPES, rng.integers(1, 4, size))
+    style_tags = sample_tags(rng, STYLE_COOCCURRENCE[style] + 1e-3, STYLES, rng.integers(1, 4, size), forced=style)
+
+    created_at = random_datetimes(rng, size, as_of, 730)
+    updated_at = np.minimum(
+        created_at + (rng.exponential(60.0, size) * 86400).astype("timedelta64[s]"), np.datetime64(as_of, "ns")
+    )
+
+    brands = np.array(BRANDS, dtype=object)[brand]
+    styles = np.array(STYLES, dtype=object)[style]
+    shapes = np.array(SHAPES, dtype=object)[shape]
+    return pd.DataFrame({
+        "id": ids,
+        "name": brands + " " + styles + " " + shapes,
+        "brand": brands,
+        "price": price.astype(np.int64),
+        "style": styles,
+        "shape": shapes,
+        "material": np.array(MATERIALS, dtype=object)[material],
+        "color": np.array(COLORS, dtype=object)[color],
+        "frame_width": frame_width.round(1),
+        "lens_width": lens_width.round(1),
+        "bridge_width": bridge_width.round(1),
+        "temple_length": temple_length.astype(float),
+        "lens_height": lens_height.round(1),
+        "weight": np.clip(weight, 8.0, 40.0).round(1),
+        "recommended_face_width_min": (frame_width * 0.9).round(1),
+        "recommended_face_width_max": (frame_width * 1.1).round(1),
+        "recommended_nose_height_min": nose_height_min.round(1),
+        "recommended_nose_height_max": nose_height_max.round(1),
+        "personal_color_season": np.array(PERSONAL_COLORS, dtype=object)[season],
+        "face_shape_types": face_shape_types,
+        "style_tags": style_tags,
+        "image_urls": [
+            [f"https://example.com/frames/{i}/front.jpg", f"https://example.com/frames/{i}/side.jpg",
+             f"https://example.com/frames/{i}/angle.jpg"]
+            for i in ids.tolist()
+        ],
+        "created_at": pd.to_datetime(created_at),
+        "updated_at": pd.to_datetime(updated_at),
+    })
+
+
+def generate_users(rng: np.random.Generator, start_id: int, size: int, as_of: datetime) -> pd.DataFrame:
+    """ユーザーのブロックを生成する"""
+    ids = np.arange(start_id, start_id + size)
+    age_days = (np.clip(rng.normal(40.0, 13.0, size), 16.0, 80.0) * 365.25).astype("timedelta64[D]")
+    created_at = pd.to_datetime(random_datetimes(rng, size, as_of, 365))
+    return pd.DataFrame({
+        "id": ids,
+        "email": [f"user{i}@example.com" for i in ids.tolist()],
+        "gender": np.array(GENDERS, dtype=object)[rng.choice(len(GENDERS), size=size, p=GENDER_WEIGHTS)],
+        "birth_date": pd.to_datetime(np.datetime64(as_of, "D") - age_days).date,
+        "created_at": created_at,
+        "updated_at": created_at,
+    })
+
+
+def generate_face_measurements(rng: np.random.Generator, users: pd.DataFrame, start_id: int) -> pd.DataFrame:
+    """ユーザーごとに1〜2件の顔測定を生成する（部位どうしは相関を持つ）"""
+    repeats = 1 + (rng.random(len(users)) < 0.15)
+    user_rows = np.repeat(np.arange(len(users)), repeats)
+    genders = users["gender"].to_numpy()[user_rows]
+    means = np.stack([FACE_MEANS[g] for g in GENDERS])[pd.Categorical(genders, categories=GENDERS).codes]
+    covariance = FACE_CORRELATION * np.outer(FACE_STDS, FACE_STDS)
+    values = means + rng.standard_normal((len(user_rows), len(FACE_COLUMNS))) @ np.linalg.cholesky(covariance).T
+    frame = pd.DataFrame(values.round(1), columns=FACE_COLUMNS)
+    frame.insert(0, "id", np.arange(start_id, start_id + len(user_rows)))
+    frame.insert(1, "user_id", users["id"].to_numpy()[user_rows])
+    frame["created_at"] = users["created_at"].to_numpy()[user_rows] + (
+        rng.exponential(3.0, len(user_rows)) * 86400
+    ).astype("timedelta64[s]")
+    return frame
+
+
+def generate_responses(rng: np.random.Generator, users: pd.DataFrame, start_id: int) -> pd.DataFrame:
+    """ユーザーの嗜好のタイプに応じたアンケート回答を生成する"""
+    size = len(users)
+    persona = rng.choice(len(PERSONAS), size=size, p=PERSONA_WEIGHTS)
+    user_ids = users["id"].to_numpy()
+    answered_at = users["created_at"].to_numpy()
+    parts = []
+    for question_id, preference_ids in QUESTION_PREFERENCES.items():
+        # タイプごとの選択確率の表（行: タイプ、列: 選択肢）
+        probs = np.array([
+            [
+                OTHER_SELECT_PROB if pid in OTHER_PREFERENCES
+                else PERSONA_SELECT_PROB if pid in favored else BASE_SELECT_PROB
+                for pid in preference_ids
+            ]
+            for favored in PERSONAS.values()
+        ])[persona]
+        selected = rng.random(probs.shape) < probs
+        # 何も選ばなかったユーザーは最も選ばれやすい選択肢を1つ選ぶ
+        empty = ~selected.any(axis=1)
+        selected[empty, np.argmax(probs[empty] + rng.random(probs[empty].shape) * 0.01, axis=1)] = True
+        rows, columns = np.nonzero(selected)
+        parts.append((rows, np.full(len(rows), question_id), np.array(preference_ids)[columns]))
+    # パーソナルカラーは単一選択
+    color = rng.choice(len(PERSONAL_COLOR_PREFERENCES), size=size, p=PERSONAL_COLOR_WEIGHTS)
+    parts.append((
+        np.arange(size), np.full(size, PERSONAL_COLOR_QUESTION), np.array(PERSONAL_COLOR_PREFERENCES)[color]
+    ))
+
+    rows = np.concatenate([p[0] for p in parts])
+    order = np.argsort(rows, kind="stable")
+    rows = rows[order]
+    created_at = pd.to_datetime(answered_at[rows])
+    return pd.DataFrame({
+        "id": np.arange(start_id, start_id + len(rows)),
+        "user_id": user_ids[rows],
+        "question_id": np.concatenate([p[1] for p in parts])[order],
+        "selected_preference_id": np.concatenate([p[2] for p in parts])[order],
+        "created_at": created_at,
+        "updated_at": created_at,
+    })
+
+
+def generate_blocks(
+    seed: int, frames: int, users: int, as_of: datetime, start_ids: Dict[str, int]
+) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """(テーブル名, ブロック) を順に生成する"""
+    for block, offset in enumerate(range(0, frames, BLOCK_SIZE)):
+        size = min(BLOCK_SIZE, frames - offset)
+        yield "frames", generate_frames(block_rng(seed, STREAM_FRAMES, block), start_ids["frames"] + offset, size, as_of)
+
+    face_id = start_ids["face_measurements"]
+    response_id = start_ids["user_responses"]
+    for block, offset in enumerate(range(0, users, BLOCK_SIZE)):
+        size = min(BLOCK_SIZE, users - offset)
+        user_block = generate_users(block_rng(seed, STREAM_USERS, block), start_ids["users"] + offset, size, as_of)
+        faces = generate_face_measurements(block_rng(seed, STREAM_FACES, block), user_block, face_id)
+        responses = generate_responses(block_rng(seed, STREAM_RESPONSES, block), user_block, response_id)
+        face_id += len(faces)
+        response_id += len(responses)
+        yield "users", user_block
+        yield "face_measurements", faces
+        yield "user_responses", responses
+
+
+def _records(frame: pd.DataFrame) -> List[Dict]:
+    """DBドライバーに渡せる型（numpyの型を除く）のレコードに変換する"""
+    records = frame.astype(object).to_dict("records")
+    for record in records:
+        for key, value in record.items():
+            if isinstance(value, pd.Timestamp):
+                record[key] = value.to_pydatetime()
+    return records
+
+
+class FileWriter:
+    """テーブルごとのファイルにブロックを追記する"""
+
+    def __init__(self, output_dir: str, file_format: str):
+        self.output_dir = output_dir
+        self.file_format = file_format
+        self.blocks: Dict[str, int] = {}
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, table: str, frame: pd.DataFrame) -> None:
+        block = self.blocks.get(table, 0)
+        self.blocks[table] = block + 1
+        if self.file_format == "parquet":
+            directory = os.path.join(self.output_dir, table)
+            os.makedirs(directory, exist_ok=True)
+            frame.to_parquet(os.path.join(directory, f"part-{block:05d}.parquet"), index=False)
+            return
+
+        mode = "w" if block == 0 else "a"
+        frame = frame.copy()
+        if "birth_date" in frame:
+            frame["birth_date"] = frame["birth_date"].astype(str)
+        if self.file_format == "csv":
+            for column in ("face_shape_types", "style_tags", "image_urls"):
+                if column in frame:
+                    frame[column] = [json.dumps(v, ensure_ascii=False) for v in frame[column]]
+            frame.to_csv(os.path.join(self.output_dir, f"{table}.csv"), mode=mode, header=block == 0, index=False)
+        else:
+            text = frame.to_json(orient="records", lines=True, force_ascii=False, date_format="iso")
+            with open(os.path.join(self.output_dir, f"{table}.jsonl"), mode, encoding="utf-8") as f:
+                f.write(text if text.endswith("\n") else text + "\n")
+
+    def close(self) -> None:
+        pass
+
+
+class DatabaseWriter:
+    """ORMを介さずにテーブルへ一括INSERTする"""
+
+    def __init__(self, batch_size: int):
+        from sqlalchemy import func, select
+        from sqlalchemy.exc import SQLAlchemyError
+        from src.database import Base, SessionLocal, get_engine
+        from src import models  # noqa: F401  テーブル定義を登録する
+        from src.crud.questionnaire import ensure_test_data_exists
+
+        self.engine = get_engine()
+        self.batch_size = batch_size
+        try:
+            Base.metadata.create_all(bind=self.engine)
+        except SQLAlchemyError:
+            # framesの索引（ix_frames_id）は2つのモデルで定義されているため、新規のDBでは
+            # framesの作成後に失敗する。2回目は作成済みのframesを飛ばして残りのテーブルを作成する
+            Base.metadata.create_all(bind=self.engine)
+        self.tables = Base.metadata.tables
+        # 回答が参照する質問・選択肢のマスター
+        db = SessionLocal()
+        try:
+            ensure_test_data_exists(db)
+        finally:
+            db.close()
+        with self.engine.connect() as conn:
+            self.start_ids = {
+                name: (conn.execute(select(func.max(self.tables[name].c.id))).scalar() or 0) + 1
+                for name in ("frames", "users", "face_measurements", "user_responses")
+            }
+
+    def write(self, table: str, frame: pd.DataFrame) -> None:
+        records = _records(frame)
+        statement = self.tables[table].insert()
+        with self.engine.begin() as conn:
+            for start in range(0, len(records), self.batch_size):
+                conn.execute(statement, records[start:start + self.batch_size])
+
+    def close(self) -> None:
+        self.engine.dispose()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="フレーム・ユーザー・顔測定・アンケート回答の合成データを生成します")
+    parser.add_argument("--frames", type=int, default=10_000, help="フレームの件数")
+    parser.add_argument("--users", type=int, default=1_000, help="ユーザーの件数（顔測定・回答はユーザーごとに生成）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=FORMATS, default="json", help="出力形式")
+    parser.add_argument("--output-dir", default="synthetic_data", help="ファイル出力先のディレクトリ")
+    parser.add_argument("--batch-size", type=int, default=5_000, help="dbの場合の1回のINSERTの件数")
+    parser.add_argument("--as-of", default=DEFAULT_AS_OF, help="日時の基準日（YYYY-MM-DD）")
+    args = parser.parse_args(argv)
+
+    as_of = datetime.strptime(args.as_of, "%Y-%m-%d") + timedelta(days=1)
+    if args.format == "db":
+        writer = DatabaseWriter(args.batch_size)
+        start_ids = writer.start_ids
+    else:
+        if args.format == "parquet":
+            try:
+                pd.io.parquet.get_engine("auto")
+            except ImportError as e:
+                print(f"Parquetの出力にはpyarrowが必要です: {e}")
+                return 1
+        writer = FileWriter(args.output_dir, args.format)
+        start_ids = {"frames": 1, "users": 1, "face_measurements": 1, "user_responses": 1}
+
+    started = time.perf_counter()
+    counts: Dict[str, int] = {}
+    try:
+        for table, frame in generate_blocks(args.seed, args.frames, args.users, as_of, start_ids):
+            writer.write(table, frame)
+            counts[table] = counts.get(table, 0) + len(frame)
+            print(f"{table}: {counts[table]} 件")
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - started
+
+    total = sum(counts.values())
+    print(f"合計 {total} 件を {elapsed:.1f} 秒で生成しました（{total / elapsed:,.0f} 件/秒）")
+    if args.format != "db":
+        print(f"出力先: {os.path.abspath(args.output_dir)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
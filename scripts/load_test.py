@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""負荷試験ハーネス
+
+ASGIアプリをプロセス内で直接呼び出すか（既定、ネットワークなし）、--url指定時はHTTPで
+起動中のサーバーに対して、指定した同時実行数でリクエストを送信します。
+送信するリクエストは次のいずれかです。
+- --replay: 記録したリクエストのJSONLファイル（1行に1リクエスト、下記の形式）を順に再生する
+- 既定: フレーム一覧・詳細、推薦、アンケート、顔測定の呼び出しを--mixの比率で生成する
+  （AIによる説明生成のexplanationsは既定の比率に含めない。外部APIを呼ばずに計測する場合は
+  AZURE_OPENAI_FAKE=trueでAzure OpenAIの代替を使う）
+
+再生ファイルの形式（method・path以外は省略可、method・pathのない行は読み飛ばす）:
+    {"name": "recommendation", "method": "POST", "path": "/api/v1/recommendations/glasses", "json": {...}, "headers": {...}}
+
+結果としてルートごとの件数・エラー数・ステータス内訳・p50/p95/p99と全体のスループットを出力します。
+
+使い方:
+    python scripts/load_test.py --requests 2000 --concurrency 16
+    python scripts/load_test.py --replay traffic.jsonl --duration 30 --output load.json
+    python scripts/load_test.py --url http://localhost:8000 --mix recommendation=1 --concurrency 32
+    AZURE_OPENAI_FAKE=true FAKE_OPENAI_RATE_LIMIT_RATE=0.1 python scripts/load_test.py --mix explanations=1 --requests 200
+"""
+import sys
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+import itertools
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+
+# プロジェクトルートをPythonパスに追加
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+DEFAULT_MIX = "frames=4,frame_detail=3,recommendation=2,questionnaire=1,face_measurements=1"
+STYLE_DESCRIPTIONS = ["知的で落ち着いた印象", "明るくカジュアル", "シャープでモダン", "やわらかく上品", None]
+PERSONAL_COLORS = ["春", "夏", "秋", "冬", None]
+FRAME_STYLES = ["クラシック", "モダン", "カジュアル", "ビジネス"]
+FRAME_SHAPES = ["ラウンド", "スクエア", "ウェリントン", "ボストン"]
+FRAME_MATERIALS = ["チタン", "アセテート", "ステンレス"]
+
+
+def _face_data(rng: random.Random) -> Dict:
+    return {
+        "face_width": round(rng.uniform(125, 150), 1),
+        "eye_distance": round(rng.uniform(58, 70), 1),
+        "cheek_area": round(rng.uniform(35, 55), 1),
+        "nose_height": round(rng.uniform(15, 50), 1),
+        "temple_position": round(rng.uniform(75, 90), 1),
+    }
+
+
+def generate_request(name: str, rng: random.Random, catalog_size: int) -> Dict:
+    """シナリオ名に対応するリクエストを生成する"""
+    if name == "frames":
+        return {"name": name, "method": "GET", "path": f"/api/v1/frames?skip={rng.randint(0, 5) * 20}&limit=20"}
+    if name == "frame_detail":
+        return {"name": name, "method": "GET", "path": f"/api/v1/frames/{rng.randint(1, catalog_size)}"}
+    if name == "recommendation":
+        face_data = dict(_face_data(rng), id=1, user_id=1, created_at="2024-01-01T00:00:00")
+        body = {
+            "face_data": face_data,
+            "style_preference": {
+                "personal_color": rng.choice(PERSONAL_COLORS),
+                "style_description": rng.choice(STYLE_DESCRIPTIONS),
+            },
+        }
+        return {"name": name, "method": "POST", "path": "/api/v1/recommendations/glasses", "json": body}
+    if name == "questionnaire":
+        responses = [
+            {"question_id": question_id, "selected_preference_ids": [rng.randint(1, 20)]}
+            for question_id in range(1, rng.randint(2, 6))
+        ]
+        return {"name": name, "method": "POST", "path": "/api/v1/questionnaire/submit", "json": {"responses": responses}}
+    if name == "face_measurements":
+        body = dict(_face_data(rng), user_id=1)
+        return {"name": name, "method": "POST", "path": "/api/v1/questionnaire/face-measurements/submit", "json": body}
+    if name == "explanations":
+        frames = [
+            {
+                "id": rng.randint(1, catalog_size),
+                "name": f"フレーム{i}",
+                "brand": "テスト",
+                "price": rng.randint(10, 50) * 1000,
+                "style": rng.choice(FRAME_STYLES),
+                "shape": rng.choice(FRAME_SHAPES),
+                "material": rng.choice(FRAME_MATERIALS),
+                "color": "ブラック",
+            }
+            for i in range(1, rng.randint(2, 4))
+        ]
+        body = {
+            "frames": frames,
+            "face_data": _face_data(rng),
+            "style_preference": {"personal_color": rng.choice(PERSONAL_COLORS)},
+            "combined_prompt": rng.random() < 0.5,
+        }
+        return {"name": name, "method": "POST", "path": "/api/v1/ai/generate-explanations", "json": body}
+    raise ValueError(f"不明なシナリオです: {name}")
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """「シナリオ名=比率」のカンマ区切り設定を辞書に変換する"""
+    mix = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, weight = item.split("=", 1)
+            mix[name.strip()] = float(weight)
+    return mix
+
+
+def generated_requests(mix: Dict[str, float], seed: int, catalog_size: int) -> Iterator[Dict]:
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while True:
+        yield generate_request(rng.choices(names, weights)[0], rng, catalog_size)
+
+
+def load_replay(path: str) -> List[Dict]:
+    """再生ファイルを読み込む（method・pathのない行は読み飛ばす）"""
+    requests = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "method" in record and "path" in record:
+                requests.append(record)
+    if not requests:
+        raise ValueError(f"再生できるリクエストがありません: {path}")
+    return requests
+
+
+def route_name(request: Dict) -> str:
+    """集計用のルート名（数値のIDはまとめる）"""
+    if request.get("name"):
+        return request["name"]
+    path = request["path"].split("?", 1)[0]
+    return f"{request['method'].upper()} {re.sub(r'/[0-9]+(?=/|$)', '/{id}', path)}"
+
+
+class LoadResult:
+    """ルートごとのレイテンシとステータスを集計する"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+
+    def record(self, route: str, status: str, seconds: float) -> None:
+        self.latencies[route].append(seconds)
+        self.statuses[route][status] += 1
+        if not status.isdigit() or int(status) >= 500:
+            self.errors[route] += 1
+
+    @staticmethod
+    def _summary(latencies: List[float], elapsed: float) -> Dict[str, float]:
+        values = sorted(latencies)
+        count = len(values)
+
+        def percentile(q: float) -> float:
+            return round(values[min(count - 1, int(q * count))] * 1000, 2)
+
+        return {
+            "count": count,
+            "rps": round(count / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(values[-1] * 1000, 2),
+        }
+
+    def report(self, elapsed: float) -> Dict:
+        routes = {}
+        for route, latencies in sorted(self.latencies.items()):
+            routes[route] = dict(
+                self._summary(latencies, elapsed),
+                errors=self.errors[route],
+                status=dict(self.statuses[route]),
+            )
+        all_latencies = [s for latencies in self.latencies.values() for s in latencies]
+        total = self._summary(all_latencies, elapsed) if all_latencies else {"count": 0}
+        total["errors"] = sum(self.errors.values())
+        return {"duration_s": round(elapsed, 3), "total": total, "routes": routes}
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    requests: Iterator[Dict],
+    concurrency: int,
+    total_requests: Optional[int],
+    duration: Optional[float],
+) -> Dict:
+    """同時実行数分のワーカーでリクエストを送信し、集計結果を返す"""
+    result = LoadResult()
+    if total_requests is not None:
+        requests = itertools.islice(requests, total_requests)
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    async def worker():
+        while deadline is None or time.perf_counter() < deadline:
+            request = next(requests, None)
+            if request is None:
+                return
+            route = route_name(request)
+            sent = time.perf_counter()
+            try:
+                response = await client.request(
+                    request["method"], request["path"], json=request.get("json"), headers=request.get("headers")
+                )
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            result.record(route, status, time.perf_counter() - sent)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return result.report(time.perf_counter() - started)
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    """データベースの初期化が終わるまで/api/healthを確認する"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            response = await client.get("/api/health")
+            if response.status_code == 200 and response.json().get("database", "ready") == "ready":
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.1)
+    raise TimeoutError(f"{timeout}秒以内にアプリケーションの準備ができませんでした")
+
+
+async def main_async(args, requests: Iterator[Dict]) -> Dict:
+    timeout = httpx.Timeout(args.timeout)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout) as client:
+            await wait_until_ready(client, args.ready_timeout)
+            return await run_load(client, requests, args.concurrency, args.requests, args.duration)
+
+    # プロセス内で実行する場合は、起動・終了処理（lifespan）もここで実行する
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from src.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout) as client:
+            await wait_until_ready(client, args.ready_timeout)
+            return await run_load(client, requests, args.concurrency, args.requests, args.duration)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="アプリケーションに負荷をかけ、ルートごとのレイテンシを計測します")
+    parser.add_argument("--url", help="HTTPで計測する場合のサーバーURL（省略時はプロセス内でASGIアプリを呼び出す）")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, help="送信するリクエスト数（--durationとどちらか）")
+    parser.add_argument("--duration", type=float, help="計測時間（秒）")
+    parser.add_argument("--replay", help="再生するリクエストのJSONLファイル")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="生成するリクエストの比率（シナリオ名=比率）")
+    parser.add_argument("--catalog-size", type=int, default=10, help="frame_detailで参照するフレームIDの上限")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30.0, help="1リクエストのタイムアウト（秒）")
+    parser.add_argument("--ready-timeout", type=float, default=60.0, help="起動待ちの上限（秒）")
+    parser.add_argument("--output", help="結果を書き出すJSONファイル")
+    args = parser.parse_args(argv)
+
+    if args.requests is None and args.duration is None:
+        args.requests = 1000
+
+    if args.replay:
+        # 記録されたリクエストを順に再生する（件数・時間に達するまで繰り返す）
+        requests: Iterator[Dict] = itertools.cycle(load_replay(args.replay))
+    else:
+        requests = generated_requests(parse_mix(args.mix), args.seed, args.catalog_size)
+
+    report = asyncio.run(main_async(args, requests))
+    report = dict(
+        mode="http" if args.url else "in_process",
+        concurrency=args.concurrency,
+        source=args.replay or args.mix,
+        **report,
+    )
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
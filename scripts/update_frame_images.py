@@ -2,19 +2,22 @@
 import sys
 import os
 import json
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from functools import lru_cache
+from sqlalchemy import select, update
 
 # プロジェクトルートをPythonパスに追加
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.database import SessionLocal
 from src.models.frame import Frame
+from src.services.static_images import fingerprint_url
 
 # 環境変数
 is_production = os.environ.get("PRODUCTION", "false").lower() == "true"
 # 本番環境のベースURL (実際にデプロイする際に変更してください)
 PRODUCTION_BASE_URL = "https://eyesmile-prod.azurewebsites.net"
+# 1回のUPDATE文で更新するフレーム数
+BATCH_SIZE = 1000
 
 # 画像マッピング - キーはブランドと形状のペア、値は実際の画像ファイル名（真正面からの画像）
 IMAGE_MAPPINGS = {
@@ -39,77 +42,65 @@ def generate_filename(brand, product_name, style):
     filename = f"{brand_clean}-{style_clean}.jpg"
     return filename
 
+def _merge_urls(current, image_url):
+    """既存のimage_urlsの先頭（真正面からの画像）を更新し、3件に満たない分は同じ画像で補う"""
+    try:
+        # すでにJSON文字列の場合
+        urls = json.loads(current) if isinstance(current, str) else list(current or [])
+    except (json.JSONDecodeError, TypeError) as e:
+        print(f"エラー: 画像URL解析に失敗しました: {e}")
+        urls = []
+    if not urls:
+        return [image_url, image_url, image_url]
+    urls[0] = image_url
+    while len(urls) < 3:
+        urls.append(image_url)
+    return urls
+
+@lru_cache(maxsize=None)
+def _publish(url):
+    """ファイル内容のハッシュを含むURLに変換し、本番環境の場合は絶対URLにする
+
+    既存のURLが本番の絶対URLの場合は、パスに戻してからフィンガープリントを付け直す。
+    同じ画像は多くのフレームで共有されるため、結果はURLごとにキャッシュする。
+    """
+    if url.startswith(PRODUCTION_BASE_URL):
+        url = url[len(PRODUCTION_BASE_URL):]
+    url = fingerprint_url(url)
+    return f"{PRODUCTION_BASE_URL}{url}" if is_production else url
+
 def update_frame_images():
-    """フレームの画像URLを更新する"""
+    """フレームの画像URLを更新する（URLには画像ファイルの内容のハッシュを含める）"""
     db = SessionLocal()
-    updated_count = 0
     
     try:
-        # すべてのフレームを取得
-        frames = db.query(Frame).all()
+        # 更新に必要な列のみを取得（ORMオブジェクトは生成しない）
+        frames = db.execute(
+            select(Frame.id, Frame.brand, Frame.name, Frame.style, Frame.shape, Frame.image_urls)
+        ).all()
         print(f"合計フレーム数: {len(frames)}")
         
+        updates = []
         for frame in frames:
             # ブランドと形状に基づいて画像を割り当て
             brand_shape_key = (frame.brand, frame.shape)
             
-            # 商品名から生成したファイル名（真正面からの画像）
-            filename = generate_filename(frame.brand, frame.name, frame.style)
-            default_image = f"/images/frames/{filename}"
-            
             if brand_shape_key in IMAGE_MAPPINGS:
                 # 特定のマッピングがある場合はそれを使用
                 image_url = IMAGE_MAPPINGS[brand_shape_key]
             else:
-                # マッピングがない場合は生成したファイル名を使用
-                image_url = default_image
-            
-            # 本番環境の場合は絶対URLにする
-            if is_production:
-                image_url = f"{PRODUCTION_BASE_URL}{image_url}"
+                # マッピングがない場合は商品名から生成したファイル名（真正面からの画像）を使用
+                image_url = f"/images/frames/{generate_filename(frame.brand, frame.name, frame.style)}"
             
-            # スラッシュ区切りからファイル名を取得して、_2付きの名前を作成（斜め表示用）
-            filename_only = os.path.basename(image_url)
-            base_name, ext = os.path.splitext(filename_only)
-            angle_image_url = image_url.replace(filename_only, f"{base_name}_2{ext}")
-            
-            # JSON文字列からリストに変換して最初の要素を更新
-            if frame.image_urls:
-                try:
-                    # すでにJSON文字列の場合
-                    if isinstance(frame.image_urls, str):
-                        urls = json.loads(frame.image_urls)
-                    else:
-                        # すでにリストの場合
-                        urls = frame.image_urls
-                        
-                    # 画像URLを更新（真正面からの画像のみ使用）
-                    if len(urls) > 0:
-                        urls[0] = image_url  # 最初は真正面画像
-                        
-                        # 他の画像が必要な場合は同じ画像を使用
-                        while len(urls) < 3:
-                            urls.append(image_url)
-                    else:
-                        urls = [image_url, image_url, image_url]
-                    
-                    # 更新したURLをフレームに設定
-                    frame.image_urls = urls
-                    updated_count += 1
-                    
-                except (json.JSONDecodeError, TypeError) as e:
-                    print(f"エラー: '{frame.name}'の画像URL解析に失敗しました: {e}")
-                    # エラーが発生した場合は新しいリストを作成
-                    frame.image_urls = [image_url, image_url, image_url]
-                    updated_count += 1
-            else:
-                # 画像URLがまだ設定されていない場合は新しいリストを作成
-                frame.image_urls = [image_url, image_url, image_url]
-                updated_count += 1
+            urls = [_publish(url) for url in _merge_urls(frame.image_urls, image_url)]
+            if urls != frame.image_urls:
+                updates.append({"id": frame.id, "image_urls": urls})
         
-        # 変更をコミット
+        # 主キーを指定した一括UPDATE（executemany）
+        for start in range(0, len(updates), BATCH_SIZE):
+            db.execute(update(Frame), updates[start:start + BATCH_SIZE])
         db.commit()
-        print(f"更新されたフレーム数: {updated_count}")
+        print(f"更新されたフレーム数: {len(updates)}（変更なし: {len(frames) - len(updates)}）")
         print("注意: 真正面からの画像のみ使用するように設定しました。")
         
     except Exception as e:
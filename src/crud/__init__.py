@@ -6,8 +6,9 @@ from .frame import *
 __all__ = [
     'create_user_responses', 'get_user_responses',
     'create_face_measurement', 'get_face_measurements', 'get_latest_face_measurement',
+    'count_face_shapes_in_measurements',
     'get_frame_recommendations', 'analyze_face_shape', 'determine_style_category',
-    'calculate_fit_score', 'calculate_style_score', 'generate_recommendation_reason',
-    'generate_recommendation_details',
-    'create_frame', 'get_frame', 'get_frames', 'update_frame', 'delete_frame'
+    'calculate_fit_score', 'calculate_style_score', 'rank_frames', 'get_catalog_candidates',
+    'generate_recommendation_reason', 'generate_recommendation_details',
+    'create_frame', 'get_frame', 'get_frames', 'get_frames_by_ids', 'update_frame', 'delete_frame'
 ] 
\ No newline at end of file
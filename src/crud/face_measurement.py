@@ -1,5 +1,13 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import select
+from datetime import datetime
+from itertools import chain
+from typing import Dict, Optional
 from .. import models, schemas
+from ..services.face_shape import FACE_SHAPE_LABELS
+
+# 顔型の集計で1回に読み込む件数
+FACE_SHAPE_CHUNK_SIZE = 100000
 
 def create_face_measurement(
     db: Session,
@@ -32,4 +40,30 @@ def get_latest_face_measurement(
 ) -> models.FaceMeasurement:
     return db.query(models.FaceMeasurement).filter(
         models.FaceMeasurement.user_id == user_id
-    ).order_by(models.FaceMeasurement.created_at.desc()).first() 
\ No newline at end of file
+    ).order_by(models.FaceMeasurement.created_at.desc()).first()
+
+def count_face_shapes_in_measurements(
+    db: Session,
+    since: Optional[datetime] = None,
+    chunk_size: int = FACE_SHAPE_CHUNK_SIZE
+) -> Dict[str, int]:
+    """face_measurementsテーブル全体（sinceを指定した場合はそれ以降）の顔型ごとの件数
+
+    ORMオブジェクトを作らずに4列だけをまとめて読み込み、チャンクごとに配列で分類する。
+    """
+    # numpyは集計を実行する場合のみ読み込む
+    import numpy as np
+    from ..services.face_shape import classify_face_shapes
+
+    table = models.FaceMeasurement.__table__
+    query = select(table.c.face_width, table.c.nose_height, table.c.cheek_area, table.c.temple_position)
+    if since is not None:
+        query = query.where(table.c.created_at >= since)
+    counts = np.zeros(len(FACE_SHAPE_LABELS), dtype=np.int64)
+    result = db.execute(query.execution_options(yield_per=chunk_size))
+    for partition in result.partitions():
+        # np.arrayにRowを直接渡すと属性の探索が遅いため、値を平坦にして読み込む
+        columns = np.fromiter(chain.from_iterable(partition), dtype=np.float64, count=len(partition) * 4)
+        columns = columns.reshape(-1, 4).T
+        counts += np.bincount(classify_face_shapes(*columns), minlength=len(counts))
+    return {label: int(count) for label, count in zip(FACE_SHAPE_LABELS, counts)}
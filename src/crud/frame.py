@@ -41,6 +41,14 @@ def get_frames(
     
     return query.offset(skip).limit(limit).all()
 
+def get_frames_by_ids(db: Session, frame_ids: List[int]) -> List[models.Frame]:
+    """指定したIDのフレームを、IDの順序のまま返す（存在しないIDは除く）"""
+    if not frame_ids:
+        return []
+    frames = db.query(models.Frame).filter(models.Frame.id.in_(frame_ids)).all()
+    by_id = {frame.id: frame for frame in frames}
+    return [by_id[frame_id] for frame_id in frame_ids if frame_id in by_id]
+
 def update_frame(
     db: Session,
     frame_id: int,
@@ -3,39 +3,32 @@ import logging
 import math
 from typing import List, Dict, Any, Tuple, Optional, Union
 from .. import models, schemas
-from .frame import get_frames, get_recommended_frames
+from .frame import get_frames, get_frames_by_ids, get_recommended_frames
+from ..services.face_shape import classify_face_shape
+from ..services.request_timing import PHASE_FETCH, PHASE_REASON, PHASE_SCORE, PHASE_SERIALIZE, span
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
 
+# 意味的なスタイル一致による最大加点
+SEMANTIC_STYLE_MAX_BONUS = 15.0
+
+# 顔の形に対する最適なフレーム形状
+OPTIMAL_FRAME_SHAPES = {
+    "丸顔": ["スクエア", "長方形", "ウェリントン"],
+    "四角顔": ["ラウンド", "オーバル", "キャットアイ"],
+    "逆三角顔": ["ブロー", "クラブマスター", "アビエーター"],
+    "卵型顔": ["すべて"],  # 卵型は多くの形状に適合
+    "楕円顔": ["スクエア", "長方形", "ウェリントン"],
+    "ダイヤモンド顔": ["オーバル", "キャットアイ"]
+}
+
 # 顔の形状分析
 def analyze_face_shape(face_data: Union[schemas.FaceMeasurement, schemas.FaceData]) -> str:
-    """顔の形状を分析する"""
-    # 顔の縦横比を計算
-    width_to_height_ratio = face_data.face_width / face_data.nose_height
-    
-    # 頬の面積を考慮
-    cheek_factor = face_data.cheek_area / (face_data.face_width * face_data.nose_height)
-    
-    # 眉間の位置を考慮
-    temple_factor = face_data.temple_position / face_data.face_width
-    
-    # 顔の形状を判定
-    if width_to_height_ratio > 1.1:  # 横長の顔
-        if cheek_factor > 0.3:
-            return "丸顔"
-        else:
-            return "四角顔"
-    elif width_to_height_ratio < 0.9:  # 縦長の顔
-        if temple_factor > 0.6:
-            return "逆三角顔"
-        else:
-            return "卵型顔"
-    else:  # バランスの取れた顔
-        if cheek_factor > 0.3:
-            return "楕円顔"
-        else:
-            return "ダイヤモンド顔"
+    """顔の形状を分析する（判定はservices.face_shapeの配列用の分類と同じ規則）"""
+    return classify_face_shape(
+        face_data.face_width, face_data.nose_height, face_data.cheek_area, face_data.temple_position
+    )
 
 # スタイルカテゴリの判定
 def determine_style_category(face_shape: str, style_pref: Optional[schemas.StylePreference]) -> str:
@@ -112,23 +105,14 @@ def calculate_style_score(
     face_shape: str, 
     style_category: str,
     frame: models.Frame,
-    style_pref: Optional[schemas.StylePreference]
+    style_pref: Optional[schemas.StylePreference],
+    semantic_similarity: Optional[float] = None
 ) -> float:
     """フレームとスタイル好みの一致度を計算"""
     score = 70.0  # 基本スコア
     
-    # 顔の形に対する最適なフレーム形状
-    optimal_shapes = {
-        "丸顔": ["スクエア", "長方形", "ウェリントン"],
-        "四角顔": ["ラウンド", "オーバル", "キャットアイ"],
-        "逆三角顔": ["ブロー", "クラブマスター", "アビエーター"],
-        "卵型顔": ["すべて"],  # 卵型は多くの形状に適合
-        "楕円顔": ["スクエア", "長方形", "ウェリントン"],
-        "ダイヤモンド顔": ["オーバル", "キャットアイ"]
-    }
-    
     # フレーム形状に基づくスコア調整
-    recommended_shapes = optimal_shapes.get(face_shape, ["すべて"])
+    recommended_shapes = OPTIMAL_FRAME_SHAPES.get(face_shape, ["すべて"])
     if "すべて" in recommended_shapes or frame.shape in recommended_shapes:
         score += 15
     
@@ -153,9 +137,75 @@ def calculate_style_score(
         if frame.color in style_pref.preferred_colors:
             score += 5
     
+    # 説明文エンベディングによる意味的な一致度
+    if semantic_similarity is not None:
+        score += semantic_similarity * SEMANTIC_STYLE_MAX_BONUS
+    
     # スコアを0〜100の範囲に収める
     return max(0, min(100, score))
 
+# フレームのランキング
+def rank_frames(
+    face_data: schemas.FaceMeasurement,
+    face_shape: str,
+    style_category: str,
+    frames: List[models.Frame],
+    style_pref: Optional[schemas.StylePreference],
+    similarities: Optional[Dict[int, float]] = None
+) -> List[Dict[str, Any]]:
+    """フレームごとのフィット・スタイルスコアを計算し、総合スコアの降順に並べる"""
+    similarities = similarities or {}
+    ranked_frames = []
+    for frame in frames:
+        fit_score = calculate_fit_score(face_data, frame)
+        style_score = calculate_style_score(
+            face_shape, style_category, frame, style_pref, similarities.get(frame.id)
+        )
+        total_score = (fit_score * 0.6) + (style_score * 0.4)  # 重み付け
+        
+        ranked_frames.append({
+            "frame": frame,
+            "fit_score": fit_score,
+            "style_score": style_score,
+            "total_score": total_score
+        })
+    
+    # スコアでソート
+    ranked_frames.sort(key=lambda x: x["total_score"], reverse=True)
+    return ranked_frames
+
+# カタログ全体からの候補選択
+def get_catalog_candidates(
+    db: Session,
+    face_data: schemas.FaceMeasurement,
+    face_shape: str,
+    style_pref: Optional[schemas.StylePreference],
+    limit: int
+) -> Optional[List[models.Frame]]:
+    """カタログスナップショット全体のスコア上位のフレームを返す（無効・スナップショットがない場合はNone）
+
+    スコアは意味的な類似度を除いたrank_framesと同じ計算で、候補はrank_framesで改めて評価する。
+    """
+    from ..services.catalog_scoring import CATALOG_SCORING_ENABLED, build_query, catalog_scorer
+    from ..services.catalog_snapshot import get_catalog_snapshot
+
+    snapshot = get_catalog_snapshot()
+    if not CATALOG_SCORING_ENABLED or snapshot is None or len(snapshot) == 0:
+        return None
+    recommended_shapes = OPTIMAL_FRAME_SHAPES.get(face_shape, ["すべて"])
+    query = build_query(
+        snapshot,
+        face_width=face_data.face_width,
+        nose_height=face_data.nose_height,
+        recommended_shapes=None if "すべて" in recommended_shapes else recommended_shapes,
+        personal_color=style_pref.personal_color if style_pref else None,
+        preferred_styles=style_pref.preferred_styles if style_pref else None,
+        preferred_materials=style_pref.preferred_materials if style_pref else None,
+        preferred_colors=style_pref.preferred_colors if style_pref else None,
+    )
+    rows, _ = catalog_scorer.top_k(snapshot, query, limit)
+    return get_frames_by_ids(db, [int(snapshot.ids[row]) for row in rows])
+
 # 推薦理由の生成
 def generate_recommendation_reason(
     face_shape: str,
@@ -286,41 +336,35 @@ def get_frame_recommendations(
         if style_preference and style_preference.personal_color:
             personal_color = style_preference.personal_color
             
-        frames = get_recommended_frames(
-            db=db,
-            face_width=face_data.face_width,
-            nose_height=face_data.nose_height,
-            personal_color=personal_color,
-            style_preferences=style_preferences,
-            limit=limit * 2  # より多くの候補を取得
-        )
-        
-        # 候補がない場合、全てのフレームから選択
-        if not frames:
-            logger.warning("推奨条件に一致するフレームがありません。すべてのフレームから選択します。")
-            frames = get_frames(db=db, limit=limit * 3)
+        with span(PHASE_FETCH):
+            # カタログスナップショットがある場合は、カタログ全体のスコア上位を候補にする
+            frames = get_catalog_candidates(db, face_data, face_shape, style_preference, limit * 2)
+            if frames is None:
+                frames = get_recommended_frames(
+                    db=db,
+                    face_width=face_data.face_width,
+                    nose_height=face_data.nose_height,
+                    personal_color=personal_color,
+                    style_preferences=style_preferences,
+                    limit=limit * 2  # より多くの候補を取得
+                )
+            
+            # 候補がない場合、全てのフレームから選択
+            if not frames:
+                logger.warning("推奨条件に一致するフレームがありません。すべてのフレームから選択します。")
+                frames = get_frames(db=db, limit=limit * 3)
         
-        # フレームの評価とランキング
-        ranked_frames = []
-        for frame in frames:
-            fit_score = calculate_fit_score(face_data, frame)
-            style_score = calculate_style_score(face_shape, style_category, frame, style_preference)
-            total_score = (fit_score * 0.6) + (style_score * 0.4)  # 重み付け
+        # スコアリング（類似度計算・評価・並べ替え）
+        with span(PHASE_SCORE):
+            # スタイルの説明文とフレームとの意味的な類似度
+            # ベクトル検索（numpy）は初回利用時に読み込む
+            from ..services.vector_index import build_style_query, semantic_similarities
+            similarities = semantic_similarities(frames, build_style_query(style_preference))
             
-            reason = generate_recommendation_reason(
-                face_shape, style_category, fit_score, style_score, frame
+            # フレームの評価とランキング
+            ranked_frames = rank_frames(
+                face_data, face_shape, style_category, frames, style_preference, similarities
             )
-            
-            ranked_frames.append({
-                "frame": frame,
-                "fit_score": fit_score,
-                "style_score": style_score,
-                "total_score": total_score,
-                "reason": reason
-            })
-        
-        # スコアでソート
-        ranked_frames.sort(key=lambda x: x["total_score"], reverse=True)
         
         # 最適なフレームと代替フレームを選択
         primary = ranked_frames[0] if ranked_frames else None
@@ -329,44 +373,51 @@ def get_frame_recommendations(
         if not primary:
             raise ValueError("適切なフレームが見つかりませんでした")
         
-        # プライマリ推薦のレスポンス
-        primary_recommendation = schemas.FrameRecommendationResponse(
-            frame=primary["frame"],
-            fit_score=primary["fit_score"],
-            style_score=primary["style_score"],
-            total_score=primary["total_score"],
-            recommendation_reason=primary["reason"]
-        )
-        
-        # 代替推薦のレスポンス
-        alternative_recommendations = [
-            schemas.FrameRecommendationResponse(
-                frame=alt["frame"],
-                fit_score=alt["fit_score"],
-                style_score=alt["style_score"],
-                total_score=alt["total_score"],
-                recommendation_reason=alt["reason"]
+        # 推薦理由と詳細の生成（レスポンスに含めるフレームのみ）
+        with span(PHASE_REASON):
+            for ranked in ranked_frames[:limit]:
+                ranked["reason"] = generate_recommendation_reason(
+                    face_shape, style_category, ranked["fit_score"], ranked["style_score"], ranked["frame"]
+                )
+            
+            recommendation_details = generate_recommendation_details(
+                face_data,
+                face_shape,
+                style_category,
+                primary["frame"],
+                primary["fit_score"],
+                primary["style_score"]
             )
-            for alt in alternatives
-        ]
-        
-        # 推薦詳細の生成
-        recommendation_details = generate_recommendation_details(
-            face_data,
-            face_shape,
-            style_category,
-            primary["frame"],
-            primary["fit_score"],
-            primary["style_score"]
-        )
         
-        # 最終レスポンスの構築
-        return schemas.RecommendationResponse(
-            primary_recommendation=primary_recommendation,
-            alternative_recommendations=alternative_recommendations,
-            face_analysis=face_analysis,
-            recommendation_details=recommendation_details
-        )
+        with span(PHASE_SERIALIZE):
+            # プライマリ推薦のレスポンス
+            primary_recommendation = schemas.FrameRecommendationResponse(
+                frame=primary["frame"],
+                fit_score=primary["fit_score"],
+                style_score=primary["style_score"],
+                total_score=primary["total_score"],
+                recommendation_reason=primary["reason"]
+            )
+            
+            # 代替推薦のレスポンス
+            alternative_recommendations = [
+                schemas.FrameRecommendationResponse(
+                    frame=alt["frame"],
+                    fit_score=alt["fit_score"],
+                    style_score=alt["style_score"],
+                    total_score=alt["total_score"],
+                    recommendation_reason=alt["reason"]
+                )
+                for alt in alternatives
+            ]
+            
+            # 最終レスポンスの構築
+            return schemas.RecommendationResponse(
+                primary_recommendation=primary_recommendation,
+                alternative_recommendations=alternative_recommendations,
+                face_analysis=face_analysis,
+                recommendation_details=recommendation_details
+            )
         
     except Exception as e:
         logger.error(f"フレーム推薦中にエラーが発生しました: {str(e)}", exc_info=True)
@@ -1,173 +1,25 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
-import pymysql
 import logging
 import traceback
 from urllib.parse import quote_plus
+import threading
 import time
-from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from .services.pool_metrics import DB_POOL_METRICS, InstrumentedQueuePool, instrument_engine
+from .services.request_timing import install_query_timing
 
 # ロギングの設定
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-# データベース接続URLの構築
-try:
-    # Azure環境の検出
-    is_azure = os.getenv('WEBSITE_SITE_NAME') is not None
-    logger.info(f"データベース初期化 - 実行環境: {'Azure' if is_azure else 'ローカル'}")
-    
-    # Azure MySQL接続文字列の構築
-    db_user = os.getenv('DB_USER')
-    db_password = os.getenv('DB_PASSWORD')
-    db_host = os.getenv('DB_HOST')
-    db_port = os.getenv('DB_PORT', '3306')
-    db_name = os.getenv('DB_NAME')
-    
-    # 接続情報のログ
-    masked_password = '*' * (len(db_password) if db_password else 0)
-    logger.info(f"DB接続情報: USER={db_user}, HOST={db_host}, PORT={db_port}, DB={db_name}, PASS={masked_password[:2] + '***' if masked_password else None}")
-    
-    # 完全修飾ユーザー名の確認（@がない場合はホスト名を付加）
-    # ユーザー名に@が含まれている場合や強制シンプルモードの場合は変換しない
-    if (db_user and '@' not in db_user and db_host and '.mysql.database.azure.com' in db_host 
-        and os.getenv('NO_USER_QUALIFICATION', 'false').lower() != 'true'
-        and os.getenv('DB_FORCE_SIMPLE_USER', 'false').lower() != 'true'):
-        # 完全なサーバー名を使用する - 以前に切れていた問題を修正
-        logger.info(f"完全修飾ユーザー名に変換します: {db_user}@{db_host}")
-        db_user = f"{db_user}@{db_host}"
-    else:
-        logger.info("ユーザー名の自動修飾をスキップします（既に修飾されているか、無効化されています）")
-    
-    # SSL設定（環境変数から取得）
-    db_ssl_mode = os.getenv('DB_SSL_MODE', 'require').lower()
-    logger.info(f"SSL設定: {db_ssl_mode}")
-    
-    logger.info(f"データベース接続情報: host={db_host}, port={db_port}, user={db_user}, database={db_name}, ssl_mode={db_ssl_mode}")
-    
-    # 接続URL構築
-    SQLALCHEMY_DATABASE_URL = (
-        f"mysql+pymysql://{db_user}:{db_password}@"
-        f"{db_host}:{db_port}/{db_name}"
-    )
-    
-    # Azureでの接続設定
-    if is_azure:
-        # SSL設定はDB_SSL_MODEに基づいて構成
-        ssl_config = {}
-        if db_ssl_mode in ['require', 'preferred', 'verify-ca', 'verify-full']:
-            # Azure MySQLはSSLを要求するため、接続オプションを調整
-            ssl_config = {
-        "ssl": {
-                    "ca": None,  # CA検証なしでも接続可能
-                    "check_hostname": False,  # ホスト名検証の無効化（必要に応じて）
-                },
-                "connect_timeout": 60,  # 接続タイムアウトを60秒に設定
-            }
-        elif db_ssl_mode == 'disable':
-            ssl_config = {"connect_timeout": 60}  # SSL無効、タイムアウトのみ設定
-        else:
-            # デフォルトは必須（検証なし）
-            ssl_config = {
-                "ssl": {"ca": None},
-                "connect_timeout": 60
-            }
-        
-        logger.info(f"Azure環境用SSL設定: {ssl_config}")
-        
-        # Azureでの接続設定（SSL設定を変数から取得）
-        engine_params = {
-            "connect_args": ssl_config,
-            "pool_recycle": 280,  # Azureの接続タイムアウト（5分）より小さく設定
-            "pool_pre_ping": True,  # 接続前にpingを送信して有効性を確認
-            "pool_size": 2,
-            "max_overflow": 3,
-            "pool_timeout": 60,  # プールからの接続取得タイムアウト
-            "echo": True  # デバッグ中はSQLログ出力を有効化
-        }
-        logger.info(f"Azure環境用のデータベース設定: {engine_params}")
-    else:
-        # ローカル開発環境での設定
-        engine_params = {
-            "connect_args": {"ssl": {"ca": None}, "connect_timeout": 30},
-            "pool_pre_ping": True,  # 接続前にpingを送信して有効性を確認
-            "pool_size": 5,
-            "max_overflow": 10,
-            "pool_timeout": 30,
-            "pool_recycle": 1800,
-            "echo": True
-        }
-        logger.info(f"ローカル環境用のデータベース設定: {engine_params}")
-    
-    # 最初に接続テストを行う
-    logger.info("データベース接続テスト中...")
-    connection_success = False
-    try:
-        test_engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_params)
-        with test_engine.connect() as conn:
-            result = conn.execute("SELECT 1")
-            logger.info(f"データベース接続テスト成功: {result.fetchone()}")
-            connection_success = True
-    except Exception as e:
-        logger.error(f"データベース接続テスト失敗: {str(e)}")
-        logger.error(f"接続URL: {SQLALCHEMY_DATABASE_URL.replace(db_password, '******') if db_password else SQLALCHEMY_DATABASE_URL}")
-        logger.error(f"接続パラメータ: {engine_params}")
-        
-        # Azureでの特定のエラーを詳細にログ出力
-        if 'SSL connection error' in str(e):
-            logger.error("SSL接続エラー: Azureの設定を確認してください")
-        elif 'Access denied' in str(e):
-            logger.error("アクセス拒否エラー: ユーザー名とパスワードを確認してください")
-        elif 'Unknown MySQL server host' in str(e):
-            logger.error("ホスト名解決エラー: データベースホスト名を確認してください")
-            
-        # エラーがあってもSQLiteでの起動を試みるためここでは例外を再スローしない
-    
-    # 実際のエンジン設定
-    if connection_success:
-        logger.info("MySQL接続成功: データベースエンジンを設定します")
-        engine = test_engine  # テスト成功したエンジンを使用
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        Base = declarative_base()
-        logger.info("データベース設定が完了しました")
-    else:
-        # 接続に失敗した場合はSQLiteにフォールバック
-        raise Exception("MySQL接続に失敗しました。SQLiteにフォールバックします。")
-    
-except Exception as e:
-    logger.error(f"データベース接続設定エラー: {str(e)}")
-    logger.error(f"詳細: {e}", exc_info=True)
-    
-    # フォールバック：エラー時でもアプリケーションが起動できるよう、SQLiteに切り替え
-    logger.warning("フォールバック設定でデータベース接続を構成します - SQLiteを使用")
-    SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    Base = declarative_base()
-
-    # SQLiteフォールバックフラグを設定
-    os.environ['SQLITE_FALLBACK'] = 'true'
-    
-    # SQLiteファイルを作成するためにテーブルを生成
-    try:
-        Base.metadata.create_all(bind=engine)
-        logger.warning("SQLiteデータベースファイルとテーブルを作成しました")
-    except Exception as e:
-        logger.error(f"SQLiteデータベース初期化エラー: {str(e)}")
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    except Exception as e:
-        logger.error(f"データベースセッション使用中のエラー: {str(e)}")
-        logger.error(traceback.format_exc())
-    finally:
-        db.close()
+# モデルのベースクラス（エンジンとは独立して定義）
+Base = declarative_base()
 
 # 環境変数から接続情報を取得
 def get_db_connection_string():
@@ -178,28 +30,28 @@ def get_db_connection_string():
         db_user = os.environ.get("DB_USER")
         db_password = os.environ.get("DB_PASSWORD")
         db_name = os.environ.get("DB_NAME")
-        
+
         logger.info(f"DB接続情報: HOST={db_host}, USER={db_user}, DB={db_name}")
-        
+
         # MySQLの接続情報がすべて揃っている場合
         if all([db_host, db_user, db_password, db_name]):
             # Azure向けの対応: ユーザー名にサーバー名が含まれていない場合は追加
             # ただし、強制シンプルモードや修飾が無効の場合はスキップ
-            if (db_host and "@" not in db_user and "localhost" not in db_host 
-                and "127.0.0.1" not in db_host 
+            if (db_host and "@" not in db_user and "localhost" not in db_host
+                and "127.0.0.1" not in db_host
                 and os.getenv('NO_USER_QUALIFICATION', 'false').lower() != 'true'
                 and os.getenv('DB_FORCE_SIMPLE_USER', 'false').lower() != 'true'):
                 logger.info(f"Azure MySQL用にユーザー名を修正: {db_user}@{db_host.split('.')[0]}")
                 db_user = f"{db_user}@{db_host.split('.')[0]}"
             else:
                 logger.info("ユーザー名の自動修飾をスキップ: 既に修飾されているか、無効化されています")
-            
+
             # MySQLの接続文字列を生成
             encoded_password = quote_plus(db_password)
             connection_string = f"mysql+pymysql://{db_user}:{encoded_password}@{db_host}/{db_name}?charset=utf8mb4"
             logger.info("MySQLデータベース接続文字列を生成しました")
             return connection_string
-        
+
         # 接続情報が不足している場合はSQLiteにフォールバック
         logger.warning("MySQL接続情報が不足しています。SQLiteにフォールバックします")
         return None
@@ -213,73 +65,240 @@ def get_db_path():
     # 環境変数からSQLiteパスを取得
     sqlite_path = os.environ.get("SQLITE_PATH", "test.db")
     logger.info(f"SQLiteパス: {sqlite_path}")
-    
+
     # 絶対パスに変換
     if not os.path.isabs(sqlite_path):
         sqlite_path = os.path.join(os.getcwd(), sqlite_path)
         logger.info(f"SQLite絶対パス: {sqlite_path}")
-    
+
     return sqlite_path
 
-# データベースエンジンとセッションの作成
+def _env_int(name: str, default: str) -> int:
+    """整数の環境変数を取得（空文字は未設定として扱い、不正な値はエラーにする）"""
+    value = os.environ.get(name) or default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"環境変数{name}の値が不正です（整数を指定してください）: {value!r}") from None
+
+def get_mysql_engine_params() -> Dict[str, Any]:
+    """MySQLエンジンの接続・プール設定を取得"""
+    is_azure = os.getenv('WEBSITE_SITE_NAME') is not None
+
+    # SQLAlchemy接続オプション
+    connect_args = {
+        "connect_timeout": _env_int("DB_CONNECT_TIMEOUT", "10"),
+    }
+
+    # SSL設定
+    ssl_mode = os.environ.get("DB_SSL_MODE", "").lower()
+    if ssl_mode == "require" or ssl_mode == "preferred":
+        connect_args["ssl"] = {"ca": None}
+        logger.info("SSL接続を有効化しました (requireモード)")
+
+    # プール設定（Azureは接続数の上限が小さいため控えめに設定）
+    if is_azure:
+        pool_defaults = {"pool_size": "2", "max_overflow": "3", "pool_timeout": "60", "pool_recycle": "280"}
+    else:
+        pool_defaults = {"pool_size": "5", "max_overflow": "10", "pool_timeout": "30", "pool_recycle": "1800"}
+
+    return {
+        "connect_args": connect_args,
+        "echo": (os.environ.get("SQL_ECHO") or "false").lower() == "true",
+        "pool_pre_ping": True,  # 接続前にpingを送信して有効性を確認
+        "poolclass": InstrumentedQueuePool,  # 取得待ち時間を計測
+        "pool_size": _env_int("DB_POOL_SIZE", pool_defaults["pool_size"]),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", pool_defaults["max_overflow"]),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", pool_defaults["pool_timeout"]),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", pool_defaults["pool_recycle"]),
+    }
+
+def _probe_engine(engine: Engine) -> bool:
+    """エンジンで実際に接続できるか確認する"""
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        logger.error(f"データベース接続テスト失敗: {str(e)}")
+
+        # Azureでの特定のエラーを詳細にログ出力
+        if 'SSL connection error' in str(e):
+            logger.error("SSL接続エラー: Azureの設定を確認してください")
+        elif 'Access denied' in str(e):
+            logger.error("アクセス拒否エラー: ユーザー名とパスワードを確認してください")
+        elif 'Unknown MySQL server host' in str(e):
+            logger.error("ホスト名解決エラー: データベースホスト名を確認してください")
+        return False
+
+# データベースエンジンの作成
 def create_db_engine():
-    """データベースエンジンを作成"""
+    """データベースエンジンを作成（MySQLに接続できない場合はSQLiteにフォールバック）
+
+    接続・プール設定の値が不正な場合はフォールバックせずにValueErrorを送出する。
+    """
+    # 接続文字列の取得を試みる
+    connection_string = get_db_connection_string()
+    # 設定値の誤りでメモリ内SQLiteに切り替わらないよう、設定はtryの外で読み込む
+    engine_params = get_mysql_engine_params() if connection_string else None
+
     try:
-        # 接続文字列の取得を試みる
-        connection_string = get_db_connection_string()
-        
         # MySQL接続が可能な場合
         if connection_string:
             logger.info("MySQLエンジンを作成します")
-            
-            # SQLAlchemy接続オプション
-            connect_args = {
-                "connect_timeout": int(os.environ.get("DB_CONNECT_TIMEOUT", "10")),
-            }
-            
-            # SSL設定
-            ssl_mode = os.environ.get("DB_SSL_MODE", "").lower()
-            if ssl_mode == "require" or ssl_mode == "preferred":
-                connect_args["ssl"] = {"ca": None}
-                logger.info("SSL接続を有効化しました (requireモード)")
-            
-            # エンジンを作成して返す
-            return create_engine(
-                connection_string,
-                echo=os.environ.get("SQL_ECHO", "false").lower() == "true",
-                pool_pre_ping=True,
-                pool_recycle=3600,
-                connect_args=connect_args
-            )
-        
+            logger.info(f"データベース設定: { {k: v for k, v in engine_params.items() if k not in ('connect_args', 'poolclass')} }")
+
+            engine = create_engine(connection_string, **engine_params)
+
+            # 接続テストに成功した場合のみMySQLを使用
+            if _probe_engine(engine):
+                logger.info("MySQL接続成功: データベースエンジンを設定します")
+                return engine
+            engine.dispose()
+            logger.warning("MySQL接続に失敗しました。SQLiteにフォールバックします")
+
         # SQLiteにフォールバック
         logger.warning("SQLiteエンジンにフォールバックします")
-        
+
         # SQLiteのフォールバックを示す環境変数を設定
         os.environ["SQLITE_FALLBACK"] = "true"
-        
+
         # SQLiteファイルパスの取得
         sqlite_path = get_db_path()
-        
+
         # データベースファイルのディレクトリを確認
         db_dir = os.path.dirname(sqlite_path)
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir, exist_ok=True)
             logger.info(f"SQLiteディレクトリを作成しました: {db_dir}")
-        
+
         # SQLiteエンジンの作成
         sqlite_url = f"sqlite:///{sqlite_path}"
         logger.info(f"SQLite URL: {sqlite_url}")
-        return create_engine(sqlite_url, echo=False, connect_args={"check_same_thread": False})
-    
+        return create_engine(
+            sqlite_url,
+            echo=False,
+            poolclass=InstrumentedQueuePool,
+            connect_args={"check_same_thread": False}
+        )
+
     except Exception as e:
         logger.error(f"データベースエンジン作成エラー: {str(e)}")
         logger.error(traceback.format_exc())
-        
+
         # 最終的なフォールバック: メモリ内SQLite
         logger.warning("メモリ内SQLiteエンジンを作成します")
         return create_engine("sqlite:///:memory:", echo=False, connect_args={"check_same_thread": False})
 
+class EngineProvider:
+    """データベースエンジンを初回利用時に作成するプロバイダー
+
+    インポート時には接続しない。初回のget_engine()呼び出し、または
+    warm_up_in_background()で起動したスレッドでエンジンを作成する。
+    """
+
+    def __init__(self, factory: Callable[[], Engine] = create_db_engine):
+        self._factory = factory
+        self._engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+        self._ready_hooks: List[Callable[[Engine], None]] = []
+        self._ready = False
+        self.boot_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        # エンジン作成後、初期化フック（テーブル作成など）の完了までを含めて判定
+        return self._ready
+
+    def add_ready_hook(self, hook: Callable[[Engine], None]) -> None:
+        """エンジン作成直後に実行する処理を登録する（作成済みの場合は即座に実行）"""
+        with self._lock:
+            self._ready_hooks.append(hook)
+            engine = self._engine
+        if engine is not None:
+            self._run_hook(hook, engine)
+
+    def _run_hook(self, hook: Callable[[Engine], None], engine: Engine) -> None:
+        try:
+            hook(engine)
+        except Exception as e:
+            logger.error(f"データベース初期化フックのエラー: {str(e)}")
+            logger.error(traceback.format_exc())
+
+    def get_engine(self) -> Engine:
+        """エンジンを取得する（未作成の場合は作成し、作成中の場合は完了を待つ）"""
+        if self._engine is not None:
+            return self._engine
+        with self._lock:
+            if self._engine is None:
+                started = time.perf_counter()
+                engine = self._factory()
+                if DB_POOL_METRICS:
+                    instrument_engine(engine)
+                install_query_timing(engine)
+                SessionLocal.configure(bind=engine)
+                self._engine = engine
+                for hook in self._ready_hooks:
+                    self._run_hook(hook, engine)
+                self._ready = True
+                self.boot_seconds = time.perf_counter() - started
+                logger.info(f"データベースの初期化が完了しました: {engine.url.get_backend_name()} ({self.boot_seconds:.3f}秒)")
+        return self._engine
+
+    def warm_up_in_background(self) -> threading.Thread:
+        """別スレッドでエンジンを作成する（サーバーはその間もリクエストを受け付ける）"""
+        def _warm_up():
+            try:
+                self.get_engine()
+            except Exception as e:
+                self.error = str(e)
+                logger.error(f"データベースのウォームアップに失敗しました: {str(e)}")
+
+        thread = threading.Thread(target=_warm_up, name="db-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict[str, Any]:
+        """初期化状態を返す"""
+        return {
+            "ready": self.ready,
+            "backend": self._engine.url.get_backend_name() if self._engine is not None else None,
+            "boot_seconds": round(self.boot_seconds, 4) if self.boot_seconds is not None else None,
+            "error": self.error,
+        }
+
+class _LazySessionMaker(sessionmaker):
+    """セッション作成時にエンジンの初期化を保証するsessionmaker"""
+
+    def __call__(self, **local_kw):
+        engine_provider.get_engine()
+        return super().__call__(**local_kw)
+
+# セッションの作成（エンジンは初回利用時にbindされる）
+SessionLocal = _LazySessionMaker(autocommit=False, autoflush=False)
+
+engine_provider = EngineProvider()
+
+def get_engine() -> Engine:
+    """共有のデータベースエンジンを取得"""
+    return engine_provider.get_engine()
+
+def __getattr__(name):
+    # 互換性のため`from src.database import engine`をサポート（アクセス時に初期化）
+    if name == "engine":
+        return engine_provider.get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# データベースセッションの依存関係
+def get_db():
+    """APIリクエスト処理のためのデータベースセッションを提供"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 # MySQLへの接続確認
 def check_mysql_connection():
     """MySQLへの接続を確認する"""
@@ -287,7 +306,7 @@ def check_mysql_connection():
     if not connection_string:
         logger.warning("MySQLの接続情報が不足しています")
         return False
-    
+
     try:
         logger.info("MySQLへの接続確認を開始")
         # 一時的なエンジンを作成して接続テスト
@@ -297,10 +316,10 @@ def check_mysql_connection():
             pool_pre_ping=True,
             connect_args={"connect_timeout": 5}
         )
-        
+
         # 接続テスト
         with test_engine.connect() as connection:
-            result = connection.execute("SELECT 1")
+            result = connection.execute(text("SELECT 1"))
             logger.info("MySQLへの接続が成功しました")
             return True
     except Exception as e:
@@ -308,31 +327,13 @@ def check_mysql_connection():
         logger.error(traceback.format_exc())
         return False
 
-# データベースエンジンの作成
-engine = create_db_engine()
-
-# セッションの作成
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# モデルのベースクラス
-Base = declarative_base()
-
-# データベースセッションの依存関係
-def get_db():
-    """APIリクエスト処理のためのデータベースセッションを提供"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # テーブル生成
 def generate_tables_for_sqlite():
     """SQLiteデータベース用のテーブルを生成する"""
     if os.environ.get("SQLITE_FALLBACK", "false").lower() == "true":
         try:
             logger.info("SQLiteテーブルの生成を開始")
-            Base.metadata.create_all(bind=engine)
+            Base.metadata.create_all(bind=get_engine())
             logger.info("SQLiteテーブルの生成が完了しました")
             return True
         except Exception as e:
@@ -0,0 +1,136 @@
+import os
+import json
+import logging
+import traceback
+from typing import Iterable, List, Optional, Tuple
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# CORS設定（環境変数から取得）
+ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*")
+CORS_ALLOW_METHODS = os.getenv("CORS_ALLOW_METHODS", "GET, POST, PUT, DELETE, OPTIONS")
+CORS_ALLOW_HEADERS = os.getenv("CORS_ALLOW_HEADERS", "Content-Type, Authorization, X-Requested-With")
+CORS_EXPOSE_HEADERS = os.getenv("CORS_EXPOSE_HEADERS", "*")
+CORS_MAX_AGE = os.getenv("CORS_MAX_AGE", "3600")
+
+Header = Tuple[bytes, bytes]
+
+
+def parse_origins(value: str) -> List[str]:
+    """カンマ区切りのオリジン設定をリストに変換する"""
+    return [origin.strip() for origin in value.split(",") if origin.strip()]
+
+
+class CORSMiddleware:
+    """オリジンの判定とCORSヘッダーの付与を行うASGIミドルウェア
+
+    設定は生成時に一度だけ解釈し、付与するヘッダーもバイト列で事前に組み立てておく。
+    リクエストごとの処理はOriginヘッダーの照合とヘッダーの追加のみ。
+    OPTIONSリクエストはルーターに渡さずここで応答する。
+    リクエストのログはDEBUGレベルが有効な場合のみ出力する（判定は生成時に一度だけ）。
+    """
+
+    def __init__(
+        self,
+        app,
+        allow_origins: Optional[Iterable[str]] = None,
+        allow_methods: str = CORS_ALLOW_METHODS,
+        allow_headers: str = CORS_ALLOW_HEADERS,
+        expose_headers: str = CORS_EXPOSE_HEADERS,
+        max_age: str = CORS_MAX_AGE,
+    ):
+        self.app = app
+        origins = list(allow_origins) if allow_origins is not None else parse_origins(ALLOWED_ORIGINS)
+        self.allow_all = "*" in origins
+        self.allowed = frozenset(origin.encode("latin-1") for origin in origins if origin != "*")
+
+        # 実レスポンスに付与するヘッダー（Allow-Originは除く）
+        self.simple_headers: List[Header] = [
+            (b"access-control-allow-credentials", b"true"),
+            (b"access-control-allow-methods", allow_methods.encode("latin-1")),
+            (b"access-control-allow-headers", allow_headers.encode("latin-1")),
+            (b"access-control-max-age", max_age.encode("latin-1")),
+            (b"vary", b"Origin"),
+        ]
+        if expose_headers:
+            self.simple_headers.append((b"access-control-expose-headers", expose_headers.encode("latin-1")))
+
+        # プリフライト応答のヘッダー
+        self.preflight_headers: List[Header] = self.simple_headers + [
+            (b"content-type", b"application/json"),
+            (b"content-length", b"2"),
+        ]
+        self.wildcard_origin: Header = (b"access-control-allow-origin", b"*")
+        self.error_body = json.dumps({"detail": "Internal Server Error"}).encode("utf-8")
+        self.log_requests = logger.isEnabledFor(logging.DEBUG)
+
+        logger.info(
+            f"CORS設定: 許可オリジン={'*' if self.allow_all else sorted(o.decode() for o in self.allowed)}"
+        )
+
+    def _allow_origin_header(self, origin: Optional[bytes]) -> Optional[Header]:
+        """許可されたオリジンであればAllow-Originヘッダーを返す"""
+        if origin is None:
+            return self.wildcard_origin if self.allow_all else None
+        if self.allow_all or origin in self.allowed:
+            # 認証情報付きのリクエストに対応するため、具体的なオリジンを返す
+            return (b"access-control-allow-origin", origin)
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+                break
+        allow_origin = self._allow_origin_header(origin)
+
+        # プリフライトリクエスト
+        if scope["method"] == "OPTIONS":
+            if allow_origin is None:
+                await send({"type": "http.response.start", "status": 204, "headers": []})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [allow_origin] + self.preflight_headers,
+            })
+            await send({"type": "http.response.body", "body": b"{}"})
+            return
+
+        extra_headers = [allow_origin] + self.simple_headers if allow_origin is not None else []
+        response_started = False
+
+        async def send_with_cors(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                if extra_headers:
+                    message["headers"] = list(message.get("headers", [])) + extra_headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cors)
+        except Exception as e:
+            if response_started:
+                raise
+            logger.error(f"ミドルウェアエラー: {str(e)}")
+            logger.error(traceback.format_exc())
+            await send({
+                "type": "http.response.start",
+                "status": 500,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(self.error_body)).encode("latin-1")),
+                ] + extra_headers,
+            })
+            await send({"type": "http.response.body", "body": self.error_body})
+
+        if self.log_requests:
+            logger.debug(f"リクエスト処理完了: {scope['method']} {scope['path']}")
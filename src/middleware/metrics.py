@@ -0,0 +1,80 @@
+import time
+import logging
+
+from ..services.metrics import REQUEST_LATENCY, REQUEST_PHASE_LATENCY, REQUESTS_IN_FLIGHT, REQUESTS_TOTAL
+from ..services.request_timing import (
+    PHASE_RENDER,
+    SERVER_TIMING_ENABLED,
+    current_timing,
+    end_request_timing,
+    server_timing_header,
+    start_request_timing,
+)
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# ルートに一致しなかったリクエストのラベル（パスをそのまま使うとラベルが増え続けるため）
+UNMATCHED_ROUTE = "unmatched"
+
+
+def route_label(scope) -> str:
+    """ルーティング後のscopeからパステンプレート（例: /api/v1/frames/{frame_id}）を取得する"""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    if scope.get("path", "").startswith("/static/"):
+        return "/static"
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """ルートごとの処理時間・ステータス・処理中リクエスト数を記録するASGIミドルウェア
+
+    リクエストの計測コンテキストもここで開始し、DB時間などの処理区分別の時間を集計する。
+    集計した処理区分はServer-Timingヘッダーとしてレスポンスにも付与する。
+    """
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING_ENABLED):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        token = start_request_timing()
+        timing = current_timing()
+        status_code = 500
+        in_flight = REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+
+        async def send_with_metrics(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                now = time.perf_counter()
+                if timing.endpoint_finished is not None:
+                    # エンドポイント内のシリアライズ（span(PHASE_SERIALIZE)）とは別の区分として記録する
+                    timing.add(PHASE_RENDER, now - timing.endpoint_finished)
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing_header(timing, now)))
+                    message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - timing.started
+            in_flight.dec()
+            end_request_timing(token)
+
+            route = route_label(scope)
+            REQUEST_LATENCY.labels(method, route).observe(elapsed)
+            REQUESTS_TOTAL.labels(method, route, str(status_code)).inc()
+            for phase, seconds in timing.phases.items():
+                REQUEST_PHASE_LATENCY.labels(route, phase).observe(seconds)
@@ -0,0 +1,78 @@
+import hmac
+import asyncio
+import logging
+import threading
+
+from ..services.profiling import (
+    PROFILE_ID_HEADER,
+    PROFILING_DIR,
+    PROFILING_HEADER,
+    PROFILING_TOKEN,
+    current_profile,
+    end_profile,
+    start_profile,
+)
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+
+class ProfilingMiddleware:
+    """専用ヘッダーでトークンが送られたリクエストだけをcProfileで計測するASGIミドルウェア
+
+    計測結果はPROFILING_DIRに保存し、IDをX-Profile-Idヘッダーで返す。
+    ヘッダーのないリクエストでの処理はヘッダーの照合のみ。
+    cProfileはスレッド内で1つしか有効にできないため、同時に計測するのは1リクエストまで
+    （計測中に届いたリクエストは計測せずに処理する）。
+    イベントループ上の計測には、同時に処理された他のリクエストの処理も含まれる場合がある。
+    """
+
+    def __init__(self, app, token: str = PROFILING_TOKEN, header: str = PROFILING_HEADER, directory: str = PROFILING_DIR):
+        self.app = app
+        self.token = token.encode("latin-1")
+        self.header = header.lower().encode("latin-1")
+        self.directory = directory
+        self.id_header = PROFILE_ID_HEADER.lower().encode("latin-1")
+        self._busy = threading.Lock()
+        logger.info(f"リクエストのプロファイリングを有効化しました: ヘッダー={header}, 保存先={directory}")
+
+    def _requested(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == self.header:
+                return hmac.compare_digest(value, self.token)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not self._busy.acquire(blocking=False):
+            logger.warning(f"他のリクエストを計測中のためプロファイルしません: {scope['path']}")
+            await self.app(scope, receive, send)
+            return
+
+        token = start_profile()
+        profile = current_profile()
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((self.id_header, profile.profile_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            profile.loop_profiler.enable()
+            try:
+                await self.app(scope, receive, send_with_profile_id)
+            finally:
+                profile.loop_profiler.disable()
+        finally:
+            end_profile(token)
+            self._busy.release()
+            try:
+                path = await asyncio.to_thread(profile.save, self.directory)
+                logger.info(f"プロファイルを保存しました: {scope['method']} {scope['path']} -> {path}")
+            except Exception as e:
+                logger.error(f"プロファイルの保存に失敗しました: {str(e)}", exc_info=True)
@@ -1,15 +1,20 @@
 from fastapi import APIRouter, HTTPException, Body
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Dict, List, Optional, Union
 import logging
 from .. import schemas
+from ..services.explanation_template import generate_template_explanation
+from ..services.explanation_jobs import explanation_job_queue, QueueFullError
+from ..services.ai_service import MAX_EXPLANATION_FRAMES, generate_glasses_explanations
+from ..services.request_timing import TimedAPIRoute
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/api/v1/ai",
-    tags=["ai"]
+    tags=["ai"],
+    route_class=TimedAPIRoute
 )
 
 class FrameData(BaseModel):
@@ -32,6 +37,35 @@ class ExplanationResponse(BaseModel):
     status: str
     explanation: Dict[str, Union[str, List[str]]]
 
+# 複数フレームの説明をまとめて生成するリクエスト
+class BatchExplanationRequest(BaseModel):
+    frames: List[FrameData] = Field(..., min_length=1, max_length=MAX_EXPLANATION_FRAMES)
+    face_data: schemas.FaceData
+    style_preference: Optional[schemas.StyleData] = None
+    combined_prompt: bool = False  # Trueの場合は1回のプロンプトでまとめて生成
+
+class FrameExplanation(BaseModel):
+    frame_id: int
+    explanation: Dict[str, Union[str, List[str]]]
+
+class BatchExplanationResponse(BaseModel):
+    status: str
+    explanations: List[FrameExplanation]
+
+# 複数フレームの説明をまとめて事前生成するジョブ
+class ExplanationJobRequest(BaseModel):
+    frame_ids: List[int] = Field(..., min_length=1, max_length=20)
+    face_data: schemas.FaceData
+    style_preference: Optional[schemas.StyleData] = None
+
+class ExplanationJobResponse(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    completed: int
+    explanations: Dict[str, Dict[str, Union[str, List[str]]]] = {}
+    errors: Dict[str, str] = {}
+
 @router.post("/generate-explanation", response_model=ExplanationResponse)
 def generate_explanation(request: ExplanationRequest = Body(...)):
     """フレームと顔データに基づいた説明をAIで生成します"""
@@ -39,53 +73,15 @@ def generate_explanation(request: ExplanationRequest = Body(...)):
         logger.info(f"説明生成リクエスト受信: フレーム={request.frame.name}")
         
         # ここでは実際のAI処理はなく、テンプレート化した説明を生成
-        frame = request.frame
-        face_data = request.face_data
-        style = request.style_preference
-        
-        # フィット説明を生成
-        fit_explanation = f"{frame.brand}の{frame.name}は、あなたの顔幅({face_data.face_width:.1f}mm)と鼻の高さ({face_data.nose_height:.1f}mm)に適したサイズです。"
-        
-        if frame.shape.lower() == "round" or frame.shape.lower() == "ラウンド":
-            fit_explanation += " 丸みを帯びたフレームはあなたの顔の特徴を和らげ、柔らかい印象を与えます。"
-        elif frame.shape.lower() == "square" or frame.shape.lower() == "スクエア":
-            fit_explanation += " シャープなフレームはあなたの顔に知的で洗練された印象を加えます。"
-        else:
-            fit_explanation += f" {frame.shape}シェイプはあなたの顔立ちに調和します。"
-        
-        # スタイル説明を生成
-        style_explanation = f"{frame.style}スタイルの{frame.material}素材フレームは、"
-        
-        preferred_styles = []
-        if style and style.preferred_styles:
-            preferred_styles = style.preferred_styles
-            
-        if preferred_styles:
-            style_explanation += f"あなたが好む{', '.join(preferred_styles)}テイストに合致し、"
-            
-        if frame.style.lower() == "classic" or frame.style.lower() == "クラシック":
-            style_explanation += "時代を超えた上品さを提供します。"
-        elif frame.style.lower() == "modern" or frame.style.lower() == "モダン":
-            style_explanation += "洗練された現代的な印象を与えます。"
-        elif frame.style.lower() == "casual" or frame.style.lower() == "カジュアル":
-            style_explanation += "自然でリラックスした日常使いに最適です。"
-        else:
-            style_explanation += "あなたの個性を引き立てます。"
-        
-        # 特徴ハイライトを生成
-        feature_highlights = [
-            f"{frame.material}素材（軽量で耐久性があります）",
-            f"{frame.shape}シェイプ（あなたの顔型に適しています）",
-            f"{frame.color}カラー（あなたの肌色・髪色に調和します）"
-        ]
+        explanation = generate_template_explanation(
+            request.frame.model_dump(),
+            request.face_data.model_dump(),
+            request.style_preference.model_dump() if request.style_preference else None
+        )
         
         response = {
             "status": "success",
-            "explanation": {
-                "fit_explanation": fit_explanation,
-                "style_explanation": style_explanation,
-                "feature_highlights": feature_highlights
-            }
+            "explanation": explanation
         }
         
         logger.info(f"説明生成完了: {response}")
@@ -94,3 +90,50 @@ def generate_explanation(request: ExplanationRequest = Body(...)):
     except Exception as e:
         logger.error(f"説明生成処理エラー: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"説明の生成中にエラーが発生しました: {str(e)}")
+
+@router.post("/generate-explanations", response_model=BatchExplanationResponse)
+async def generate_explanations(request: BatchExplanationRequest = Body(...)):
+    """1つの顔・スタイル情報に対して複数フレームの説明を並行に生成します"""
+    try:
+        logger.info(f"一括説明生成リクエスト受信: フレーム数={len(request.frames)}, 結合プロンプト={request.combined_prompt}")
+        
+        explanations = await generate_glasses_explanations(
+            [frame.model_dump() for frame in request.frames],
+            request.face_data.model_dump(),
+            request.style_preference.model_dump() if request.style_preference else None,
+            combined_prompt=request.combined_prompt
+        )
+        
+        return {
+            "status": "success",
+            "explanations": [
+                {"frame_id": frame.id, "explanation": explanation}
+                for frame, explanation in zip(request.frames, explanations)
+            ]
+        }
+        
+    except Exception as e:
+        logger.error(f"一括説明生成処理エラー: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"説明の生成中にエラーが発生しました: {str(e)}")
+
+@router.post("/explanation-jobs", response_model=ExplanationJobResponse, status_code=202)
+async def create_explanation_job(request: ExplanationJobRequest = Body(...)):
+    """複数フレームの説明生成ジョブを登録し、ジョブIDを即座に返します"""
+    try:
+        job = explanation_job_queue.submit(
+            request.frame_ids,
+            request.face_data.model_dump(),
+            request.style_preference.model_dump() if request.style_preference else None
+        )
+        return job.to_dict()
+    except QueueFullError as e:
+        logger.warning(f"説明生成ジョブを受け付けられません: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.get("/explanation-jobs/{job_id}", response_model=ExplanationJobResponse)
+async def get_explanation_job(job_id: str):
+    """説明生成ジョブの進捗と、完了済みの説明を返します"""
+    job = explanation_job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"ジョブ {job_id} は見つかりませんでした")
+    return job.to_dict()
@@ -7,13 +7,16 @@ import logging
 from ..database import get_db
 from .. import crud, schemas
 from ..utils.csv_import import validate_frame_data
+from ..services.request_timing import PHASE_FETCH, TimedAPIRoute, span
+from ..services.static_images import fingerprint_urls
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/api/v1/frames",
-    tags=["frames"]
+    tags=["frames"],
+    route_class=TimedAPIRoute
 )
 
 @router.post("/import", response_model=List[schemas.Frame])
@@ -36,6 +39,9 @@ async def import_frames_from_csv(
             try:
                 # データの検証と変換
                 validated_data = validate_frame_data(row)
+                # 画像URLにはファイル内容のハッシュを含める（immutableで配信するため）
+                if validated_data.get("image_urls"):
+                    validated_data["image_urls"] = fingerprint_urls(validated_data["image_urls"])
                 
                 # フレームの作成
                 frame_create = schemas.FrameCreate(**validated_data)
@@ -60,33 +66,29 @@ def get_frames(
     color: Optional[str] = None,
     price_min: Optional[int] = None,
     price_max: Optional[int] = None,
-    db: Session = Depends(get_db),
-    response: Response = None
+    db: Session = Depends(get_db)
 ):
     """メガネフレームの一覧を取得します"""
-    # CORSヘッダーを追加
-    if response:
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        response.headers["Access-Control-Allow-Methods"] = "GET, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Requested-With"
-        response.headers["Access-Control-Max-Age"] = "3600"
-    
     try:
-        logger.info(f"フレーム一覧リクエスト: skip={skip}, limit={limit}, brand={brand}, style={style}, shape={shape}, color={color}, price_min={price_min}, price_max={price_max}")
-        
-        frames = crud.frame.get_frames(
-            db=db,
-            skip=skip,
-            limit=limit,
-            brand=brand,
-            style=style,
-            shape=shape,
-            color=color,
-            price_min=price_min,
-            price_max=price_max
+        logger.info(
+            "フレーム一覧リクエスト: skip=%s, limit=%s, brand=%s, style=%s, shape=%s, color=%s, price_min=%s, price_max=%s",
+            skip, limit, brand, style, shape, color, price_min, price_max
         )
         
-        logger.info(f"{len(frames)}件のフレームデータを取得しました")
+        with span(PHASE_FETCH):
+            frames = crud.frame.get_frames(
+                db=db,
+                skip=skip,
+                limit=limit,
+                brand=brand,
+                style=style,
+                shape=shape,
+                color=color,
+                price_min=price_min,
+                price_max=price_max
+            )
+        
+        logger.info("%d件のフレームデータを取得しました", len(frames))
         return frames
         
     except Exception as e:
@@ -99,28 +101,21 @@ def get_frames(
 @router.get("/{frame_id}", response_model=schemas.Frame)
 def get_frame(
     frame_id: int,
-    db: Session = Depends(get_db),
-    response: Response = None
+    db: Session = Depends(get_db)
 ):
     """指定されたIDのメガネフレームを取得します"""
-    # CORSヘッダーを追加
-    if response:
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        response.headers["Access-Control-Allow-Methods"] = "GET, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Requested-With"
-        response.headers["Access-Control-Max-Age"] = "3600"
-    
     try:
-        logger.info(f"フレーム詳細リクエスト: id={frame_id}")
+        logger.info("フレーム詳細リクエスト: id=%s", frame_id)
         
-        frame = crud.frame.get_frame(db=db, frame_id=frame_id)
+        with span(PHASE_FETCH):
+            frame = crud.frame.get_frame(db=db, frame_id=frame_id)
         if frame is None:
             raise HTTPException(
                 status_code=404,
                 detail=f"ID {frame_id} のフレームは見つかりませんでした"
             )
         
-        logger.info(f"フレームデータを取得しました: id={frame.id}, name={frame.name}")
+        logger.info("フレームデータを取得しました: id=%s, name=%s", frame.id, frame.name)
         return frame
         
     except HTTPException as he:
@@ -132,31 +127,3 @@ def get_frame(
             status_code=500,
             detail=f"フレームデータの取得中にエラーが発生しました: {str(e)}"
         )
-
-@router.options("")
-def options_frames():
-    """フレーム一覧エンドポイントのOPTIONSリクエストハンドラー"""
-    logger.info("フレーム一覧エンドポイントへのOPTIONSリクエスト受信")
-    return Response(
-        content="",
-        headers={
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-            "Access-Control-Max-Age": "3600",
-        },
-    )
-
-@router.options("/{frame_id}")
-def options_frame_detail(frame_id: int):
-    """フレーム詳細エンドポイントのOPTIONSリクエストハンドラー"""
-    logger.info(f"フレーム詳細エンドポイントへのOPTIONSリクエスト受信: id={frame_id}")
-    return Response(
-        content="",
-        headers={
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-            "Access-Control-Max-Age": "3600",
-        },
-    ) 
\ No newline at end of file
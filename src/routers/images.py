@@ -0,0 +1,106 @@
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import FileResponse, RedirectResponse
+from typing import Optional
+import asyncio
+import mimetypes
+import logging
+from ..services.image_derivatives import (
+    IMAGE_CACHE_MAX_AGE,
+    IMAGE_QUALITY,
+    MEDIA_TYPES,
+    avif_supported,
+    image_cache,
+    negotiate_format,
+    snap_width,
+)
+from ..services.static_images import (
+    FINGERPRINT_LENGTH,
+    IMAGE_URL_PREFIX,
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    add_fingerprint,
+    split_fingerprint,
+)
+from ..services.request_timing import TimedAPIRoute
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/api/v1/images",
+    tags=["images"],
+    route_class=TimedAPIRoute
+)
+
+# フレーム画像（Frame.image_urlsのURL）の配信
+static_router = APIRouter(
+    prefix=IMAGE_URL_PREFIX,
+    tags=["images"]
+)
+
+def _not_modified(if_none_match: Optional[str], etag: str) -> bool:
+    return bool(if_none_match) and etag in [tag.strip() for tag in if_none_match.split(",")]
+
+async def _resolve(image_path: str):
+    """（フィンガープリントを除いた相対パス, 元画像のパス, 内容のハッシュ, URLのフィンガープリント）を返す"""
+    relative, fingerprint = split_fingerprint(image_path)
+    source = image_cache.resolve_source(relative)
+    if source is None:
+        raise HTTPException(status_code=404, detail="画像が見つかりません")
+    digest = await asyncio.to_thread(image_cache.source_digest, source)
+    return relative, source, digest, fingerprint
+
+@router.get("/{image_path:path}")
+async def get_image(
+    image_path: str,
+    w: Optional[int] = Query(None, ge=1, le=4000, description="幅（生成する幅のいずれかに切り上げる）"),
+    format: str = Query("auto", pattern="^(auto|avif|webp|jpeg)$"),
+    q: int = Query(IMAGE_QUALITY, ge=30, le=95),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+):
+    """静的画像をリサイズ・再エンコードした派生画像を返します（初回のみ生成し、以降はキャッシュから返す）"""
+    _, source, digest, fingerprint = await _resolve(image_path)
+    fmt = negotiate_format(format, accept)
+    if fmt == "avif" and not avif_supported():
+        raise HTTPException(status_code=406, detail="AVIFでのエンコードに対応していません")
+    width = snap_width(w)
+
+    key = image_cache.derivative_key(digest, width, fmt, q)
+    etag = f'"{key[:32]}"'
+    # フィンガープリントが現在の内容と一致するURLは、内容が変わらないためimmutableで返す
+    if fingerprint == digest[:FINGERPRINT_LENGTH]:
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        cache_control = f"public, max-age={IMAGE_CACHE_MAX_AGE}"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if format == "auto":
+        headers["Vary"] = "Accept"
+    # ETagは元画像と生成条件から決まるため、一致すれば派生画像を生成せずに304を返せる
+    if _not_modified(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    path = await image_cache.ensure(source, key, width, fmt, q)
+    return FileResponse(path, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+@static_router.get("/{image_path:path}")
+async def get_static_image(image_path: str, if_none_match: Optional[str] = Header(None)):
+    """フレーム画像を返します（フィンガープリント付きのURLはimmutable、古いフィンガープリントは現在のURLへ転送）"""
+    relative, source, digest, fingerprint = await _resolve(image_path)
+    if fingerprint is not None and fingerprint != digest[:FINGERPRINT_LENGTH]:
+        # 画像が差し替えられた後に古いURLが参照された場合
+        return RedirectResponse(
+            f"{IMAGE_URL_PREFIX}/{add_fingerprint(relative, digest)}",
+            status_code=302,
+            headers={"Cache-Control": REVALIDATE_CACHE_CONTROL},
+        )
+
+    etag = f'"{digest[:32]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if fingerprint else REVALIDATE_CACHE_CONTROL,
+    }
+    if _not_modified(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    media_type = mimetypes.guess_type(source)[0] or "application/octet-stream"
+    return FileResponse(source, media_type=media_type, headers=headers)
@@ -0,0 +1,115 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import FileResponse
+from typing import Optional
+from datetime import datetime
+import time
+import hmac
+import os
+import logging
+from sqlalchemy.orm import Session
+from ..database import engine_provider, get_db
+from .. import crud
+from ..services.pool_metrics import pool_metrics
+from ..services.metrics import render_metrics
+from ..services.profiling import profile_path
+from ..services.stack_sampler import stack_sampler
+from ..services.loop_monitor import loop_monitor
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# 内部エンドポイント用のトークン（X-Internal-Tokenヘッダーで指定）
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
+# トークンなしで内部エンドポイントを公開するかどうか（ローカル開発用、明示的に有効にした場合のみ）
+INTERNAL_API_OPEN = os.getenv("INTERNAL_API_OPEN", "false").lower() == "true"
+
+if not INTERNAL_API_TOKEN and not INTERNAL_API_OPEN:
+    logger.info("INTERNAL_API_TOKENが未設定のため、内部エンドポイントは無効です")
+
+def verify_internal_token(x_internal_token: Optional[str] = Header(None)):
+    """内部エンドポイントへのアクセスを検証する（トークン未設定の場合は存在しないものとして扱う）"""
+    if not INTERNAL_API_TOKEN:
+        if INTERNAL_API_OPEN:
+            return
+        raise HTTPException(status_code=404, detail="Not Found")
+    # トークンの比較は一定時間で行う（src.middleware.profilingと同様）
+    if x_internal_token is None or not hmac.compare_digest(
+        x_internal_token.encode("utf-8"), INTERNAL_API_TOKEN.encode("utf-8")
+    ):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"],
+    dependencies=[Depends(verify_internal_token)],
+    include_in_schema=False
+)
+
+# Prometheusのスクレイプ用（パスは慣例に合わせて/metrics）
+metrics_router = APIRouter(
+    tags=["internal"],
+    dependencies=[Depends(verify_internal_token)],
+    include_in_schema=False
+)
+
+@metrics_router.get("/metrics")
+def get_metrics():
+    """Prometheusのテキスト形式でメトリクスを返します"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@router.get("/metrics/db-pool")
+async def get_db_pool_metrics():
+    """コネクションプールの利用状況と待ち時間の集計を返します"""
+    return {
+        "database": engine_provider.status(),
+        "pool": pool_metrics.snapshot(),
+    }
+
+@router.get("/metrics/event-loop")
+async def get_event_loop_metrics():
+    """イベントループ遅延のパーセンタイルと、ブロックを検出した際のスタックを返します"""
+    return loop_monitor.status()
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, format: str = Query("prof", pattern="^(prof|txt)$")):
+    """保存済みのリクエストプロファイル（pstats形式、またはテキストの集計）を返します"""
+    path = profile_path(profile_id, suffix=f".{format}")
+    if path is None:
+        raise HTTPException(status_code=404, detail="プロファイルが見つかりません")
+    media_type = "text/plain; charset=utf-8" if format == "txt" else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=path.name)
+
+@router.get("/profiler/status")
+def get_profiler_status():
+    """サンプリングプロファイラーの状態とオーバーヘッドを返します"""
+    return stack_sampler.status()
+
+@router.get("/profiler/stacks")
+def get_profiler_stacks(reset: bool = False):
+    """集計したスタックをfolded形式（flamegraph.pl・speedscope用）で返します"""
+    if not stack_sampler.running and not stack_sampler.samples:
+        raise HTTPException(status_code=404, detail="サンプリングプロファイラーは無効です（STACK_SAMPLER_ENABLED）")
+    return Response(content=stack_sampler.folded(reset=reset), media_type="text/plain; charset=utf-8")
+
+@router.get("/catalog/snapshot")
+def get_catalog_snapshot_status():
+    """読み込み済みのカタログスナップショットのバージョンと件数を返します"""
+    from ..services.catalog_snapshot import get_catalog_snapshot
+    snapshot = get_catalog_snapshot()
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="カタログスナップショットは読み込まれていません（CATALOG_SNAPSHOT_ON_STARTUP）")
+    return snapshot.info()
+
+@router.get("/analytics/face-shapes")
+def get_face_shape_distribution(since: Optional[datetime] = None, db: Session = Depends(get_db)):
+    """face_measurementsテーブル全体（sinceを指定した場合はそれ以降）の顔型の分布を返します"""
+    started = time.perf_counter()
+    counts = crud.count_face_shapes_in_measurements(db, since=since)
+    total = sum(counts.values())
+    return {
+        "total": total,
+        "counts": counts,
+        "ratios": {label: round(count / total, 4) if total else 0.0 for label, count in counts.items()},
+        "seconds": round(time.perf_counter() - started, 3),
+    }
@@ -4,34 +4,28 @@ from typing import List, Dict, Any
 import logging
 import os
 from ..database import get_db
+from ..utils.logging_config import log_payload
 from .. import crud, schemas
+from ..services.request_timing import TimedAPIRoute
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/api/v1/questionnaire",
-    tags=["questionnaire"]
+    tags=["questionnaire"],
+    route_class=TimedAPIRoute
 )
 
 @router.post("/submit")
 def submit_questionnaire(
     responses: schemas.QuestionnaireSubmission,
-    db: Session = Depends(get_db),
-    response: Response = None
+    db: Session = Depends(get_db)
 ):
     """アンケートの回答を送信します"""
-    # CORSヘッダーを追加
-    if response:
-        # 許可されたオリジンを環境変数から取得
-        allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        response.headers["Access-Control-Allow-Methods"] = "POST, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Requested-With"
-        response.headers["Access-Control-Max-Age"] = "3600"
-    
     try:
-        logger.info(f"受信したデータ: {responses}")
+        logger.info("アンケート回答を受信: 回答数=%d", len(responses.responses))
+        log_payload(logger, "受信したデータ: %s", responses)
         # 仮のユーザーID（本来はログインユーザーのIDを使用）
         temporary_user_id = 1
         
@@ -66,21 +60,12 @@ def submit_questionnaire(
 @router.post("/face-measurements/submit", response_model=schemas.FaceMeasurement)
 def submit_face_measurements(
     measurements: schemas.FaceMeasurementCreate,
-    db: Session = Depends(get_db),
-    response: Response = None
+    db: Session = Depends(get_db)
 ):
     """顔の測定データを送信します"""
-    # CORSヘッダーを追加
-    if response:
-        # 許可されたオリジンを環境変数から取得
-        allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        response.headers["Access-Control-Allow-Methods"] = "POST, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Requested-With"
-        response.headers["Access-Control-Max-Age"] = "3600"
-    
     try:
-        logger.info(f"受信した顔測定データ: {measurements}")
+        logger.info("顔測定データを受信")
+        log_payload(logger, "受信した顔測定データ: %s", measurements)
         try:
             # 顔測定データを保存
             db_measurement = crud.face_measurement.create_face_measurement(
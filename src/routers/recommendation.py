@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
 from sqlalchemy.orm import Session
+from pydantic import Field
 from typing import List, Optional
 from ..database import get_db
+from ..utils.logging_config import log_payload
 from .. import models, schemas, crud
 from ..services.frame_recommendation import FrameRecommendationService
+from ..services.request_timing import PHASE_FETCH, PHASE_REASON, PHASE_SCORE, PHASE_SERIALIZE, TimedAPIRoute, span
 import logging
 
 # ロガーの設定
@@ -11,12 +14,19 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/api/v1/recommendations",
-    tags=["recommendations"]
+    tags=["recommendations"],
+    route_class=TimedAPIRoute
 )
 
+# 推薦に使う顔の測定値（顔型の判定・フィットスコアで割る値のため、0以下は受け付けない）
+class RecommendationFaceData(schemas.FaceMeasurement):
+    face_width: float = Field(gt=0)
+    eye_distance: float = Field(gt=0)
+    nose_height: float = Field(gt=0)
+
 # 推薦リクエストのスキーマ
 class RecommendationRequest(schemas.BaseModel):
-    face_data: schemas.FaceMeasurement
+    face_data: RecommendationFaceData
     style_preference: Optional[schemas.StylePreference] = None
 
 # 顔データに基づいてメガネフレームを推薦するエンドポイント
@@ -27,26 +37,36 @@ def recommend_glasses(
 ):
     """顔の測定データとスタイル好みに基づいてメガネフレームを推薦します"""
     try:
-        logger.info(f"メガネフレーム推薦リクエスト受信: {request}")
+        logger.info("メガネフレーム推薦リクエスト受信")
+        log_payload(logger, "推薦リクエストの内容: %s", request)
         
         # 顔測定データを取得
         face_data = request.face_data
         style_preference = request.style_preference
 
+        # 顔の形状を決定
+        face_shape = crud.recommendation.analyze_face_shape(face_data)
+
         # データベースからフレームを取得
-        frames = crud.frame.get_recommended_frames(
-            db=db,
-            face_width=face_data.face_width,
-            nose_height=face_data.nose_height,
-            personal_color=style_preference.personal_color if style_preference else None,
-            style_preferences=style_preference.preferred_styles if style_preference else [],
-            limit=10
-        )
-        
-        if not frames:
-            # フレームがない場合は全てのフレームから選択
-            logger.warning("条件に合うフレームが見つからないため、全てのフレームから選択します")
-            frames = crud.frame.get_frames(db=db, limit=10)
+        with span(PHASE_FETCH):
+            # カタログスナップショットがある場合は、カタログ全体のスコア上位を候補にする
+            frames = crud.recommendation.get_catalog_candidates(
+                db, face_data, face_shape, style_preference, limit=10
+            )
+            if frames is None:
+                frames = crud.frame.get_recommended_frames(
+                    db=db,
+                    face_width=face_data.face_width,
+                    nose_height=face_data.nose_height,
+                    personal_color=style_preference.personal_color if style_preference else None,
+                    style_preferences=style_preference.preferred_styles if style_preference else [],
+                    limit=10
+                )
+            
+            if not frames:
+                # フレームがない場合は全てのフレームから選択
+                logger.warning("条件に合うフレームが見つからないため、全てのフレームから選択します")
+                frames = crud.frame.get_frames(db=db, limit=10)
             
         if not frames:
             raise HTTPException(status_code=404, detail="推薦可能なフレームが見つかりませんでした")
@@ -83,7 +103,6 @@ def recommend_glasses(
                 ))
         
         # サービスを使用してフレームをランク付け
-        ranked_frames = []
         face_measurement = models.FaceMeasurement(
             face_width=face_data.face_width,
             eye_distance=face_data.eye_distance,
@@ -92,16 +111,17 @@ def recommend_glasses(
             temple_position=face_data.temple_position
         )
         
-        for frame in frames:
-            recommendation = FrameRecommendationService.calculate_total_score(
-                frame=frame,
-                face_measurement=face_measurement,
-                user_preferences=user_preferences
+        # スコアリング（類似度計算・評価・並べ替え）
+        with span(PHASE_SCORE):
+            # スタイルの説明文とフレームとの意味的な類似度
+            # ベクトル検索（numpy）は初回利用時に読み込む
+            from ..services.vector_index import build_style_query, semantic_similarities
+            similarities = semantic_similarities(frames, build_style_query(style_preference))
+            
+            # 全フレームを評価し、総合スコアで降順に並べる
+            ranked_frames = FrameRecommendationService.rank_frames(
+                frames, face_measurement, user_preferences, similarities
             )
-            ranked_frames.append(recommendation)
-        
-        # スコアで降順ソート
-        ranked_frames.sort(key=lambda x: x.total_score, reverse=True)
         
         # 最もスコアの高いフレームを主要推薦として選択
         primary_recommendation = ranked_frames[0] if ranked_frames else None
@@ -109,47 +129,43 @@ def recommend_glasses(
         # 残りのフレームを代替推薦として選択
         alternative_recommendations = ranked_frames[1:5] if len(ranked_frames) > 1 else []
         
-        # 顔の形状を決定
-        face_shape = "楕円型"  # デフォルト値
-        if face_data.face_width > 140:
-            face_shape = "丸型"
-        elif face_data.face_width < 130:
-            face_shape = "細長型"
-            
-        # スタイルカテゴリを決定
-        style_category = style_preference.preferred_styles[0] if style_preference and style_preference.preferred_styles else "クラシック"
+        # 推薦理由・詳細の文字列を生成
+        with span(PHASE_REASON):
+            # スタイルカテゴリを決定
+            style_category = style_preference.preferred_styles[0] if style_preference and style_preference.preferred_styles else "クラシック"
         
-        # フィット説明を生成
-        fit_explanation = f"あなたの顔幅({face_data.face_width}mm)と鼻の高さ({face_data.nose_height}mm)に適したフレームを選びました。"
+            # フィット説明を生成
+            fit_explanation = f"あなたの顔幅({face_data.face_width}mm)と鼻の高さ({face_data.nose_height}mm)に適したフレームを選びました。"
         
-        # スタイル説明を生成
-        style_explanation = "お好みのスタイルに合わせたデザインを選びました。"
-        if style_preference and style_preference.preferred_styles:
-            style_tags = ", ".join(style_preference.preferred_styles)
-            style_explanation = f"あなたの好みの{style_tags}スタイルに合ったデザインを選びました。"
+            # スタイル説明を生成
+            style_explanation = "お好みのスタイルに合わせたデザインを選びました。"
+            if style_preference and style_preference.preferred_styles:
+                style_tags = ", ".join(style_preference.preferred_styles)
+                style_explanation = f"あなたの好みの{style_tags}スタイルに合ったデザインを選びました。"
         
-        # 特徴ハイライトを生成
-        feature_highlights = [
-            f"{primary_recommendation.frame.material}素材",
-            f"{primary_recommendation.frame.shape}シェイプ",
-            f"{primary_recommendation.frame.color}カラー"
-        ]
+            # 特徴ハイライトを生成
+            feature_highlights = [
+                f"{primary_recommendation.frame.material}素材",
+                f"{primary_recommendation.frame.shape}シェイプ",
+                f"{primary_recommendation.frame.color}カラー"
+            ]
         
-        # レスポンスを作成
-        response = schemas.RecommendationResponse(
-            primary_recommendation=primary_recommendation,
-            alternative_recommendations=alternative_recommendations,
-            face_analysis=schemas.FaceAnalysis(
-                face_shape=face_shape,
-                style_category=style_category,
-                demo_mode=False
-            ),
-            recommendation_details=schemas.RecommendationDetails(
-                fit_explanation=fit_explanation,
-                style_explanation=style_explanation,
-                feature_highlights=feature_highlights
+        with span(PHASE_SERIALIZE):
+            # レスポンスを作成
+            response = schemas.RecommendationResponse(
+                primary_recommendation=primary_recommendation,
+                alternative_recommendations=alternative_recommendations,
+                face_analysis=schemas.FaceAnalysis(
+                    face_shape=face_shape,
+                    style_category=style_category,
+                    demo_mode=False
+                ),
+                recommendation_details=schemas.RecommendationDetails(
+                    fit_explanation=fit_explanation,
+                    style_explanation=style_explanation,
+                    feature_highlights=feature_highlights
+                )
             )
-        )
         
         logger.info(f"メガネフレーム推薦レスポンス生成完了: 主要推薦={response.primary_recommendation.frame.name}, "
                    f"代替推薦数={len(response.alternative_recommendations)}")
@@ -159,16 +175,3 @@ def recommend_glasses(
     except Exception as e:
         logger.error(f"メガネフレーム推薦処理エラー: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"推薦の処理中にエラーが発生しました: {str(e)}")
-
-# OPTIONSメソッドのハンドラを追加
-@router.options("/glasses")
-def options_glasses_recommendation():
-    """メガネ推薦エンドポイントのOPTIONSリクエストハンドラー"""
-    logger.info("メガネ推薦エンドポイントへのOPTIONSリクエスト受信")
-    return {
-        "Allow": "POST, OPTIONS",
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Methods": "POST, OPTIONS",
-        "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-        "Access-Control-Max-Age": "3600"
-    }
@@ -10,6 +10,7 @@ class StylePreference(BaseModel):
     preferred_shapes: List[str] = []
     preferred_materials: List[str] = []
     preferred_colors: List[str] = []
+    style_description: Optional[str] = None  # 「知的で落ち着いた印象」などの自由記述
 
 class FaceAnalysis(BaseModel):
     """顔分析の結果"""
@@ -5,6 +5,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from src.database import SessionLocal
 from src.utils.data_converter import convert_csv_to_frames
 from src.models.user import Frame
+from src.services.static_images import fingerprint_urls
 from sqlalchemy.exc import SQLAlchemyError
 
 def import_frames():
@@ -27,8 +28,9 @@ def import_frames():
             # 既存のフレームデータをクリア
             db.query(Frame).delete()
             
-            # 新しいフレームデータの挿入
+            # 新しいフレームデータの挿入（画像URLにはファイル内容のハッシュを含める）
             for frame_data in frames_data:
+                frame_data['image_urls'] = fingerprint_urls(frame_data.get('image_urls') or [])
                 frame = Frame(**frame_data)
                 db.add(frame)
             
@@ -0,0 +1,249 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+import logging
+import sqlite3
+import traceback
+from pathlib import Path
+
+from sqlalchemy import text
+
+from src.database import Base, get_db_path, get_engine
+from src import models  # noqa: F401  全モデルをメタデータに登録
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+def _ensure_sqlite_tables(engine):
+    """SQLiteにフォールバックした場合に主要なテーブルが存在するか確認し、不足していれば再作成する"""
+    if not str(engine.url).startswith('sqlite'):
+        return
+    logger.info("SQLite環境を検出 - テーブルの存在を確認します")
+    with engine.connect() as conn:
+        # 主要なテーブルの存在をチェック
+        tables = ['users', 'user_responses', 'face_measurements', 'frames', 'style_questions', 'preferences']
+        missing_tables = []
+        for table in tables:
+            try:
+                result = conn.execute(text(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table}'"))
+                if not result.fetchone():
+                    missing_tables.append(table)
+            except Exception as table_e:
+                logger.error(f"テーブル確認エラー: {str(table_e)}")
+
+        if missing_tables:
+            logger.warning(f"次のテーブルが見つかりません: {', '.join(missing_tables)}。再作成を試みます。")
+            # 明示的に全テーブルを作成 (SQLiteの場合IF NOT EXISTSが適用される)
+            Base.metadata.create_all(bind=engine)
+            logger.info("SQLiteテーブルの再作成が完了しました")
+
+def initialize_database(engine, force=False):
+    """データベーステーブルを初期化する（force=Trueの場合はAzureでもAPPLY_MIGRATIONSを確認しない）"""
+    is_azure = os.getenv('WEBSITE_SITE_NAME') is not None
+
+    # Azureの場合、環境変数に基づいてマイグレーションを実行
+    if is_azure:
+        apply_migrations = force or os.getenv('APPLY_MIGRATIONS', '').lower() == 'true'
+        if not apply_migrations:
+            logger.info("Azure環境を検出 - APPLY_MIGRATIONS=true が設定されていないため、データベース初期化をスキップします")
+            return
+        try:
+            logger.info("Azure環境 - APPLY_MIGRATIONS=true が設定されています。データベースマイグレーションを実行します...")
+            # SQLiteではなくAzure MySQLに対してテーブル作成を実行
+            Base.metadata.create_all(bind=engine)
+            logger.info("Azure環境 - データベーステーブルを正常に作成しました")
+            _ensure_sqlite_tables(engine)
+        except Exception as e:
+            logger.error(f"Azure環境 - データベースマイグレーションエラー: {str(e)}")
+            logger.error(traceback.format_exc())
+            # エラーをログに記録するだけで、起動は続行
+            logger.warning("データベースエラーが発生しましたが、アプリケーションは起動を続行します")
+    else:
+        try:
+            # ローカル環境でのみテーブル作成を実行
+            logger.info("ローカル環境 - データベーステーブルを作成しています...")
+            Base.metadata.create_all(bind=engine)
+            logger.info("データベーステーブルを正常に作成しました")
+            _ensure_sqlite_tables(engine)
+        except Exception as e:
+            logger.error(f"データベース初期化エラー: {str(e)}")
+            logger.error(traceback.format_exc())
+            # エラーをログに記録するだけで、起動は続行
+            logger.warning("データベースエラーが発生しましたが、アプリケーションは起動を続行します")
+
+
+# SQLiteテーブル存在確認関数
+def check_sqlite_tables():
+    """SQLiteデータベースに必要なテーブルが存在するか確認し、存在しない場合は作成を試みる"""
+    db_path = get_db_path()
+    logger.info(f"SQLiteテーブル確認を開始: {db_path}")
+    
+    if not os.path.exists(db_path):
+        logger.warning(f"SQLiteデータベースファイルが存在しません: {db_path}")
+        try:
+            # ファイルの作成を試みる
+            Path(db_path).touch()
+            logger.info(f"SQLiteデータベースファイルを作成しました: {db_path}")
+            os.chmod(db_path, 0o666)  # 読み書き権限を設定
+        except Exception as e:
+            logger.error(f"SQLiteデータベースファイル作成エラー: {str(e)}")
+            return False
+    
+    try:
+        # データベース接続
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        # 必要なテーブル名のリスト
+        required_tables = [
+            "users", "style_questions", "preferences",
+            "user_responses", "face_measurements", "frames"
+        ]
+        
+        # 現在のテーブル一覧を取得
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+        existing_tables = [row[0] for row in cursor.fetchall()]
+        logger.info(f"既存のSQLiteテーブル: {existing_tables}")
+        
+        # 不足しているテーブルを特定
+        missing_tables = [table for table in required_tables if table not in existing_tables]
+        
+        if missing_tables:
+            logger.warning(f"不足しているテーブル: {missing_tables}")
+            # モデルからテーブルを作成
+            try:
+                logger.info("SQLAlchemyモデルからテーブルを作成します")
+                Base.metadata.create_all(bind=get_engine())
+                logger.info("テーブル作成が完了しました")
+                
+                # 作成後に再確認
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+                updated_tables = [row[0] for row in cursor.fetchall()]
+                logger.info(f"テーブル作成後のテーブル一覧: {updated_tables}")
+                
+                # それでも不足しているテーブルがある場合はSQL文で作成を試みる
+                still_missing = [table for table in required_tables if table not in updated_tables]
+                if still_missing:
+                    logger.warning(f"まだ不足しているテーブル: {still_missing}")
+                    # SQL文での作成を実行
+                    create_tables_with_sql(conn, cursor, still_missing)
+            except Exception as e:
+                logger.error(f"テーブル作成エラー: {str(e)}")
+                logger.error(traceback.format_exc())
+                return False
+        else:
+            logger.info("すべての必要なテーブルが存在します")
+        
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        logger.error(f"SQLiteテーブル確認エラー: {str(e)}")
+        logger.error(traceback.format_exc())
+        return False
+
+# SQL文でテーブルを作成する関数
+def create_tables_with_sql(conn, cursor, missing_tables):
+    """SQL文を使用して不足しているテーブルを作成する"""
+    logger.info("SQL文でテーブルを作成します")
+    
+    sql_statements = {
+        "users": """
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                email TEXT UNIQUE,
+                hashed_password TEXT,
+                is_active BOOLEAN DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """,
+        "style_questions": """
+            CREATE TABLE IF NOT EXISTS style_questions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question_text TEXT NOT NULL,
+                options TEXT NOT NULL,
+                category TEXT NOT NULL,
+                order_index INTEGER
+            );
+        """,
+        "preferences": """
+            CREATE TABLE IF NOT EXISTS preferences (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                preference_data TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            );
+        """,
+        "user_responses": """
+            CREATE TABLE IF NOT EXISTS user_responses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                question_id INTEGER,
+                response TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id),
+                FOREIGN KEY (question_id) REFERENCES style_questions (id)
+            );
+        """,
+        "face_measurements": """
+            CREATE TABLE IF NOT EXISTS face_measurements (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                face_width REAL,
+                face_height REAL,
+                pupillary_distance REAL,
+                temple_width REAL,
+                bridge_width REAL,
+                image_path TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            );
+        """,
+        "frames": """
+            CREATE TABLE IF NOT EXISTS frames (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                description TEXT,
+                image_path TEXT,
+                frame_width REAL,
+                frame_height REAL,
+                bridge_width REAL,
+                temple_length REAL,
+                style TEXT,
+                material TEXT,
+                color TEXT,
+                shape TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """
+    }
+    
+    for table in missing_tables:
+        if table in sql_statements:
+            try:
+                logger.info(f"{table}テーブルをSQL文で作成します")
+                cursor.execute(sql_statements[table])
+                logger.info(f"{table}テーブル作成完了")
+            except Exception as e:
+                logger.error(f"{table}テーブル作成エラー: {str(e)}")
+        else:
+            logger.warning(f"{table}テーブルのSQL文が定義されていません")
+    
+    conn.commit()
+
+def init_database():
+    """スキーマの確認・作成を明示的に実行します"""
+    engine = get_engine()
+    print(f"データベース: {engine.url.get_backend_name()}")
+    initialize_database(engine, force=True)
+    if str(engine.url).startswith('sqlite') and engine.url.database not in (None, "", ":memory:"):
+        if not check_sqlite_tables():
+            print("Error: SQLiteテーブルの確認に失敗しました")
+            sys.exit(1)
+    print("データベースの初期化が完了しました")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    init_database()
@@ -1,9 +1,13 @@
 import os
-import openai
-import numpy as np
+import re
+import asyncio
+import threading
+import weakref
 from dotenv import load_dotenv
 import logging
 from typing import Dict, Any, List, Optional
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .explanation_template import generate_template_explanation
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
@@ -11,28 +15,74 @@ logger = logging.getLogger(__name__)
 # 環境変数の読み込み
 load_dotenv()
 
-# Azure OpenAI設定
-openai.api_type = "azure"
-openai.api_base = os.getenv("AZURE_OPENAI_ENDPOINT")
-openai.api_version = "2023-05-15"  # バージョンは適宜更新
-openai.api_key = os.getenv("AZURE_OPENAI_API_KEY")
+# openaiモジュールは読み込みが重いため、初回のAPI呼び出し時に読み込んで設定する
+_openai = None
+_openai_lock = threading.Lock()
+
+def get_openai():
+    """Azure OpenAI用に設定済みのopenaiモジュールを取得する"""
+    global _openai
+    if _openai is None:
+        with _openai_lock:
+            if _openai is None:
+                if os.getenv("AZURE_OPENAI_FAKE", "false").lower() == "true":
+                    # オフラインの負荷試験用に、同じAPIの形を持つ代替を使う
+                    from .fake_openai import FakeAzureOpenAI
+
+                    logger.warning("Azure OpenAIの代替（AZURE_OPENAI_FAKE）を使用します")
+                    _openai = FakeAzureOpenAI()
+                    return _openai
+
+                import openai
+
+                # Azure OpenAI設定
+                openai.api_type = "azure"
+                openai.api_base = os.getenv("AZURE_OPENAI_ENDPOINT")
+                openai.api_version = "2023-05-15"  # バージョンは適宜更新
+                openai.api_key = os.getenv("AZURE_OPENAI_API_KEY")
+                _openai = openai
+    return _openai
 
 # デプロイメント名
 CHAT_DEPLOYMENT = os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME", "gpt-4o-mini")
 EMBEDDING_DEPLOYMENT = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME", "text-embedding-3-large")
 
+# チャットAPI用サーキットブレーカーの設定
+LLM_LATENCY_BUDGET = float(os.getenv("LLM_LATENCY_BUDGET", "8"))  # 1リクエストあたりの待ち時間上限（秒）
+llm_circuit_breaker = CircuitBreaker(
+    name="azure-openai-chat",
+    failure_threshold=int(os.getenv("LLM_CB_FAILURE_THRESHOLD", "5")),
+    recovery_timeout=float(os.getenv("LLM_CB_RECOVERY_TIMEOUT", "30")),
+    half_open_max_calls=int(os.getenv("LLM_CB_HALF_OPEN_MAX_CALLS", "1")),
+    latency_budget=LLM_LATENCY_BUDGET,
+)
+
+# チャットAPIの同時呼び出し数の上限
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# まとめて説明を生成できるフレーム数の上限と、結合プロンプトの最大トークン数
+MAX_EXPLANATION_FRAMES = int(os.getenv("MAX_EXPLANATION_FRAMES", "5"))
+LLM_COMBINED_MAX_TOKENS = int(os.getenv("LLM_COMBINED_MAX_TOKENS", "1600"))
+
+SYSTEM_PROMPT = "あなたはプロのメガネ店員です。お客様に最適なメガネを提案します。「メガネと顔の黄金比」の専門知識を持っています。簡潔に回答してください。"
+
+# イベントループごとのセマフォ
+_llm_semaphores: "weakref.WeakKeyDictionary[Any, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """テキストのエンベディングを同期的に取得する（失敗時はフォールバック先を利用）"""
+    from .embedding_backends import get_embedding_backends
+
+    for backend in get_embedding_backends():
+        try:
+            return backend.embed(texts).tolist()
+        except Exception as e:
+            logger.error(f"エンベディング取得エラー({backend.name}): {str(e)}")
+    # ダミーの埋め込みを返す
+    return [[0.0] * 1536 for _ in range(len(texts))]
+
 async def get_embeddings(texts: List[str]) -> List[List[float]]:
     """テキストのエンベディングを取得する"""
-    try:
-        response = openai.Embedding.create(
-            input=texts,
-            engine=EMBEDDING_DEPLOYMENT
-        )
-        return [item.embedding for item in response.data]
-    except Exception as e:
-        logger.error(f"エンベディング取得エラー: {str(e)}")
-        # ダミーの埋め込みを返す
-        return [[0.0] * 1536 for _ in range(len(texts))]
+    return embed_texts(texts)
 
 async def generate_glasses_explanation(
     frame_data: Dict[str, Any],
@@ -85,11 +135,10 @@ async def generate_glasses_explanation(
         ただし、各項目は簡潔に2-3文程度で簡潔に説明してください。
         """
         
-        # Azure OpenAI APIの呼び出し
-        response = openai.ChatCompletion.create(
-            engine=CHAT_DEPLOYMENT,
+        # Azure OpenAI APIの呼び出し（同時実行数の上限とサーキットブレーカー経由）
+        response = await _chat_completion(
             messages=[
-                {"role": "system", "content": "あなたはプロのメガネ店員です。お客様に最適なメガネを提案します。「メガネと顔の黄金比」の専門知識を持っています。簡潔に回答してください。"},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             max_tokens=400,
@@ -104,10 +153,23 @@ async def generate_glasses_explanation(
         
         return explanation
     
+    except CircuitOpenError:
+        # プロバイダ障害中はAPIを待たずにテンプレートの説明を即座に返す
+        logger.warning("サーキットブレーカーがopenのため、テンプレートの説明を返します")
+        return generate_template_explanation(frame_data, face_data, style_preference)
+    
     except Exception as e:
         logger.error(f"Azure OpenAI API呼び出しエラー: {str(e)}")
         # エラー時のフォールバック
-        return {
+        return _fallback_explanation(frame_data, face_data, style_text)
+
+def _fallback_explanation(
+    frame_data: Dict[str, Any],
+    face_data: Dict[str, Any],
+    style_text: str
+) -> Dict[str, Any]:
+    """API呼び出しエラー時の説明を返す"""
+    return {
             "fit_explanation": f"""
             メガネと顔の黄金比の観点から見ると、この{frame_data.get('shape', '丸型')}シェイプのフレームはあなたの顔幅({face_data.get('face_width', 0)}mm)に適しています。
             フレームの縦幅は眉からアゴまでの長さの1/3以内に収まり、横幅も顔幅とバランスが取れています。
@@ -121,6 +183,134 @@ async def generate_glasses_explanation(
             "feature_highlights": []
         }
 
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    """実行中のイベントループ用のセマフォを取得する"""
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        _llm_semaphores[loop] = semaphore
+    return semaphore
+
+async def _chat_completion(**kwargs) -> Any:
+    """同時実行数の上限内でサーキットブレーカー経由のチャットAPIを呼び出す"""
+    async with _get_llm_semaphore():
+        return await llm_circuit_breaker.call(_create_chat_completion, **kwargs)
+
+async def generate_glasses_explanations(
+    frames_data: List[Dict[str, Any]],
+    face_data: Dict[str, Any],
+    style_preference: Optional[Dict[str, Any]] = None,
+    combined_prompt: bool = False
+) -> List[Dict[str, Any]]:
+    """複数フレームの解説をまとめて生成する（結果はframes_dataと同じ順序）
+
+    通常はフレームごとの呼び出しを同時実行数の上限内で並行に行う。
+    combined_promptを指定した場合は1回の呼び出しでフレームごとの節に分けて生成する。
+    """
+    frames_data = frames_data[:MAX_EXPLANATION_FRAMES]
+    if not combined_prompt or len(frames_data) <= 1:
+        return list(await asyncio.gather(*(
+            generate_glasses_explanation(frame_data, face_data, style_preference)
+            for frame_data in frames_data
+        )))
+    return await _generate_combined_explanations(frames_data, face_data, style_preference)
+
+async def _generate_combined_explanations(
+    frames_data: List[Dict[str, Any]],
+    face_data: Dict[str, Any],
+    style_preference: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """1回のプロンプトで複数フレームの解説を生成する"""
+    style_text = "特になし"
+    if style_preference and style_preference.get("preferred_styles"):
+        style_text = "、".join(style_preference.get("preferred_styles", []))
+    
+    try:
+        # フレームごとの情報
+        frame_sections = []
+        for i, frame_data in enumerate(frames_data, start=1):
+            frame_sections.append(f"""【フレーム{i}】
+・ブランド: {frame_data.get('brand', 'ブランド不明')}
+・モデル名: {frame_data.get('name', '名前不明')}
+・スタイル: {frame_data.get('style', 'スタイル不明')}
+・形状: {frame_data.get('shape', '形状不明')}
+・素材: {frame_data.get('material', '素材不明')}
+・色: {frame_data.get('color', '色不明')}
+・フレーム幅: {frame_data.get('frame_width', 0)}mm
+・レンズ幅: {frame_data.get('lens_width', 0)}mm
+・ブリッジ幅: {frame_data.get('bridge_width', 0)}mm
+・レンズ高さ: {frame_data.get('lens_height', 0)}mm""")
+        
+        # プロンプト作成
+        prompt = f"""あなたは20年以上の経験を持つプロのメガネ店員です。お客様に合うメガネフレームについて丁寧かつ専門的に説明してください。
+専門知識を用いて「メガネと顔の黄金比」の観点から、以下の{len(frames_data)}本のフレームそれぞれについて解説してください。
+
+【お客様の情報】
+・顔幅: {face_data.get('face_width', 0)}mm
+・目の間隔: {face_data.get('eye_distance', 0)}mm
+・鼻の高さ: {face_data.get('nose_height', 0)}mm
+・好みのスタイル: {style_text}
+
+{chr(10).join(frame_sections)}
+
+【解説の指示】
+フレームごとに「### フレーム番号」（例: ### フレーム1）の見出しを付け、その下を次の2つの項目に分けて日本語で説明してください:
+
+1. フィット感について
+- フレームの縦幅・横幅と顔のバランス、瞳孔の位置（レンズの縦横2/5の交差点が黄金比）
+
+2. スタイルについて
+- デザインがお客様の好みや印象にどう合っているか、フレームのトップラインと眉のバランス
+
+丁寧で専門的、かつ温かみのある接客トーンで、各項目は2-3文程度で簡潔に説明してください。"""
+        
+        response = await _chat_completion(
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=min(400 * len(frames_data), LLM_COMBINED_MAX_TOKENS),
+            temperature=0.7,
+        )
+        sections = parse_combined_explanations(response.choices[0].message.content)
+        
+        # 解析できなかったフレームはテンプレートで補完
+        explanations = []
+        for i, frame_data in enumerate(frames_data, start=1):
+            explanation = sections.get(i)
+            if not explanation or not explanation["fit_explanation"]:
+                logger.warning(f"結合プロンプトの応答にフレーム{i}の節がありません")
+                explanation = generate_template_explanation(frame_data, face_data, style_preference)
+            explanations.append(explanation)
+        return explanations
+    
+    except CircuitOpenError:
+        logger.warning("サーキットブレーカーがopenのため、テンプレートの説明を返します")
+        return [generate_template_explanation(f, face_data, style_preference) for f in frames_data]
+    
+    except Exception as e:
+        logger.error(f"Azure OpenAI API呼び出しエラー: {str(e)}")
+        return [_fallback_explanation(f, face_data, style_text) for f in frames_data]
+
+def parse_combined_explanations(text: str) -> Dict[int, Dict[str, Any]]:
+    """結合プロンプトの応答をフレーム番号ごとに解析する"""
+    parts = re.split(r"^#+\s*フレーム\s*(\d+).*$", text, flags=re.MULTILINE)
+    # parts = [前置き, 番号1, 本文1, 番号2, 本文2, ...]
+    return {
+        int(number): parse_explanation(body)
+        for number, body in zip(parts[1::2], parts[2::2])
+    }
+
+async def _create_chat_completion(**kwargs) -> Any:
+    """同期のチャットAPIをスレッドで実行する（イベントループをブロックしない）"""
+    return await asyncio.to_thread(
+        get_openai().ChatCompletion.create,
+        engine=CHAT_DEPLOYMENT,
+        request_timeout=LLM_LATENCY_BUDGET,
+        **kwargs
+    )
+
 def parse_explanation(text: str) -> Dict[str, Any]:
     """APIレスポンスを解析して構造化する"""
     sections = text.split("\n\n")
@@ -0,0 +1,214 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .catalog_snapshot import CatalogSnapshot
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# 全カタログのスコアリングの設定（環境変数から取得）
+# 有効な場合、推薦の候補を読み込み済みのカタログスナップショット全体のスコア上位から選ぶ
+CATALOG_SCORING_ENABLED = os.getenv("CATALOG_SCORING_ENABLED", "false").lower() == "true"
+# シャードに分けてスコアを計算するプロセス数（0の場合は常に1プロセスで計算する）
+CATALOG_SCORING_WORKERS = int(os.getenv("CATALOG_SCORING_WORKERS", "0"))
+# 1シャードあたりの最小件数（これに満たない分割はプロセス間通信の方が高くつくため、シャード数を減らす）
+CATALOG_SCORING_MIN_SHARD_ROWS = int(os.getenv("CATALOG_SCORING_MIN_SHARD_ROWS", "100000"))
+
+# crud.recommendationのスコアの重み
+FIT_WEIGHT = 0.6
+STYLE_WEIGHT = 0.4
+
+
+def build_query(
+    snapshot: CatalogSnapshot,
+    face_width: float,
+    nose_height: float,
+    recommended_shapes: Optional[List[str]],
+    personal_color: Optional[str] = None,
+    preferred_styles: Optional[List[str]] = None,
+    preferred_materials: Optional[List[str]] = None,
+    preferred_colors: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """スコアの計算条件を、スナップショットの辞書・タグの番号に変換する（プロセスプールに渡せる形）
+
+    recommended_shapesがNoneの場合は、すべての形状を顔型に合う形状として扱う。
+    """
+    def codes(name: str, values: Optional[List[str]]) -> List[int]:
+        dictionary = snapshot.manifest["dictionaries"][name]
+        return [dictionary.index(value) for value in values or [] if value in dictionary]
+
+    tag_positions = {tag: i for i, tag in enumerate(snapshot.tag_vocabulary["style_tags"])}
+    return {
+        "face_width": float(face_width),
+        "nose_height": float(nose_height),
+        "shape_codes": None if recommended_shapes is None else codes("shape", recommended_shapes),
+        # 辞書にないパーソナルカラーは一致するフレームがないため、存在しない番号にする
+        "personal_color_code": (codes("personal_color_season", [personal_color]) or [-2])[0] if personal_color else None,
+        "style_tag_positions": sorted({tag_positions[tag] for tag in preferred_styles or [] if tag in tag_positions}),
+        "material_codes": codes("material", preferred_materials),
+        "color_codes": codes("color", preferred_colors),
+    }
+
+
+def _range_score(value: float, low: np.ndarray, high: np.ndarray, penalty: float, bonus: float) -> np.ndarray:
+    """推奨範囲に対するスコアの増減（crud.recommendation.calculate_fit_scoreと同じ計算）"""
+    low = low.astype(np.float64)
+    high = high.astype(np.float64)
+    # 範囲が未設定（NULLまたは0）のフレームは増減なし
+    valid = np.nan_to_num(low) != 0
+    valid &= np.nan_to_num(high) != 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        below = (low - value) / low * -penalty
+        above = (value - high) / high * -penalty
+        inside = (1 - np.abs(value - (low + high) / 2) / (high - low)) * bonus
+    adjustment = np.where(value < low, below, np.where(value > high, above, np.nan_to_num(inside)))
+    return np.where(valid, adjustment, 0.0)
+
+
+def score_range(snapshot: CatalogSnapshot, query: Dict[str, Any], start: int, end: int) -> np.ndarray:
+    """行[start, end)の総合スコア（crud.recommendation.rank_framesの意味的な類似度を除いた値）"""
+    numeric = snapshot.numeric
+    rows = slice(start, end)
+
+    fit = 100.0 + _range_score(
+        query["face_width"], numeric["recommended_face_width_min"][rows],
+        numeric["recommended_face_width_max"][rows], 30, 10,
+    )
+    fit += _range_score(
+        query["nose_height"], numeric["recommended_nose_height_min"][rows],
+        numeric["recommended_nose_height_max"][rows], 20, 5,
+    )
+    np.clip(fit, 0, 100, out=fit)
+
+    style = np.full(end - start, 70.0)
+    if query["shape_codes"] is None:
+        style += 15
+    else:
+        style += np.isin(snapshot.codes["shape"][rows], query["shape_codes"]) * 15.0
+    if query["personal_color_code"] is not None:
+        style += (snapshot.codes["personal_color_season"][rows] == query["personal_color_code"]) * 10.0
+    if query["style_tag_positions"]:
+        bits = snapshot.tag_bits["style_tags"][rows]
+        matches = np.zeros(end - start)
+        for position in query["style_tag_positions"]:
+            matches += (bits[:, position // 8] >> (position % 8)) & 1
+        style += np.minimum(matches * 5, 15)
+    if query["material_codes"]:
+        style += np.isin(snapshot.codes["material"][rows], query["material_codes"]) * 5.0
+    if query["color_codes"]:
+        style += np.isin(snapshot.codes["color"][rows], query["color_codes"]) * 5.0
+    np.clip(style, 0, 100, out=style)
+
+    return fit * FIT_WEIGHT + style * STYLE_WEIGHT
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """スコア上位k件の（行番号, スコア）を降順で返す（同点は行番号の昇順）"""
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    if k < len(scores):
+        # argpartitionは同点の選び方が不定のため、k番目のスコアと同点の行は行番号の小さい順に選ぶ
+        # （シャードごとの上位k件を統合した結果が、1プロセスでの計算と一致するように）
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:k - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(len(scores))
+    order = np.lexsort((candidates, -scores[candidates]))
+    rows = candidates[order]
+    return rows, scores[rows]
+
+
+@lru_cache(maxsize=4)
+def _open_snapshot(path: str) -> CatalogSnapshot:
+    # プロセスプール内では、同じファイルをmmapすることで親プロセスとページを共有する
+    return CatalogSnapshot(path)
+
+
+def _score_shard(path: str, query: Dict[str, Any], start: int, end: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """プロセスプールで1シャード分のスコアを計算し、シャード内の上位k件を返す"""
+    rows, scores = top_k(score_range(_open_snapshot(path), query, start, end), k)
+    return rows + start, scores
+
+
+class CatalogScorer:
+    """カタログスナップショット全体のスコアを計算し、上位k件を返す
+
+    件数が多い場合は行をシャードに分けてプロセスプールで計算し、各シャードの上位k件を統合する。
+    プロセスには配列を渡さず、各プロセスが同じスナップショットのファイルをmmapするため、
+    配列はOSのページキャッシュを介して共有され、プロセス間でやり取りするのは条件と上位k件のみになる。
+    シャードあたりの件数がCATALOG_SCORING_MIN_SHARD_ROWSに満たない場合は1プロセスで計算する。
+    """
+
+    def __init__(self, workers: int = CATALOG_SCORING_WORKERS, min_shard_rows: int = CATALOG_SCORING_MIN_SHARD_ROWS):
+        self.workers = workers
+        self.min_shard_rows = max(min_shard_rows, 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def shard_count(self, rows: int) -> int:
+        return max(1, min(self.workers, rows // self.min_shard_rows))
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # forkはスレッドを使うサーバープロセスでは安全でないため、spawnで起動する
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def top_k(self, snapshot: CatalogSnapshot, query: Dict[str, Any], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """スコア上位k件の（行番号, スコア）を降順で返す"""
+        started = time.perf_counter()
+        shards = self.shard_count(len(snapshot))
+        if shards > 1:
+            try:
+                result = self._sharded_top_k(snapshot, query, k, shards)
+                logger.debug(
+                    f"カタログのスコアを{shards}シャードで計算しました: {len(snapshot)}件 "
+                    f"{(time.perf_counter() - started) * 1000:.1f}ms"
+                )
+                return result
+            except BrokenProcessPool:
+                logger.error("スコア計算のプロセスが異常終了したため、1プロセスで計算します")
+                with self._lock:
+                    self._executor = None
+        return top_k(score_range(snapshot, query, 0, len(snapshot)), k)
+
+    def _sharded_top_k(
+        self, snapshot: CatalogSnapshot, query: Dict[str, Any], k: int, shards: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        bounds = np.linspace(0, len(snapshot), shards + 1).astype(int)
+        executor = self._get_executor()
+        futures = [
+            executor.submit(_score_shard, snapshot.path, query, int(start), int(end), k)
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+        results = [future.result() for future in futures]
+        rows = np.concatenate([shard_rows for shard_rows, _ in results])
+        scores = np.concatenate([shard_scores for _, shard_scores in results])
+        # 各シャードの上位k件には全体の上位k件が必ず含まれる
+        merged, merged_scores = top_k(scores, k)
+        return rows[merged], merged_scores
+
+    def shutdown(self) -> None:
+        """スコア計算用のプロセスプールを停止する"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# アプリケーション全体で共有するスコア計算
+catalog_scorer = CatalogScorer()
@@ -0,0 +1,328 @@
+import os
+import json
+import mmap
+import time
+import shutil
+import hashlib
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func, select
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# カタログスナップショットの設定（環境変数から取得）
+CATALOG_SNAPSHOT_DIR = os.getenv("CATALOG_SNAPSHOT_DIR", "snapshots/catalog")
+# 残しておく過去のバージョン数（現在のバージョンを含む）
+CATALOG_SNAPSHOT_KEEP = int(os.getenv("CATALOG_SNAPSHOT_KEEP", "3"))
+
+# スナップショットの形式を変更した場合に上げる
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+# 最新のバージョン名を書いたファイル
+CURRENT_FILE = "CURRENT"
+EXPORT_CHUNK_SIZE = 50_000
+
+# 数値の列（NULLは浮動小数点の列のみNaNで表す）
+NUMERIC_COLUMNS = {
+    "id": "int64",
+    "price": "int32",
+    "frame_width": "float32",
+    "lens_width": "float32",
+    "bridge_width": "float32",
+    "temple_length": "float32",
+    "lens_height": "float32",
+    "weight": "float32",
+    "recommended_face_width_min": "float32",
+    "recommended_face_width_max": "float32",
+    "recommended_nose_height_min": "float32",
+    "recommended_nose_height_max": "float32",
+}
+# 種類の少ない文字列の列（辞書の番号で保持し、NULLは-1）
+DICTIONARY_COLUMNS = ("brand", "style", "shape", "material", "color", "personal_color_season")
+# 行ごとに異なる文字列の列（UTF-8を連結したバイト列と各行の開始位置で保持する。image_urlsはJSON）
+TEXT_COLUMNS = ("name", "image_urls")
+# タグの列（語彙の番号ごとのビットを行ごとに詰めたビットセット）
+TAG_COLUMNS = ("face_shape_types", "style_tags")
+
+
+def catalog_version(conn) -> str:
+    """フレームの件数・最大ID・最終更新日時から決まるカタログのバージョン"""
+    from ..models.frame import Frame
+
+    count, max_id, max_updated, max_created = conn.execute(
+        select(func.count(Frame.id), func.max(Frame.id), func.max(Frame.updated_at), func.max(Frame.created_at))
+    ).one()
+    key = f"{count}:{max_id}:{max_updated}:{max_created}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _dictionary_encode(values: List[Optional[str]]):
+    dictionary = sorted({str(v) for v in values if v is not None})
+    position = {value: i for i, value in enumerate(dictionary)}
+    dtype = np.int16 if len(dictionary) < np.iinfo(np.int16).max else np.int32
+    codes = np.fromiter((-1 if v is None else position[str(v)] for v in values), dtype=dtype, count=len(values))
+    return codes, dictionary
+
+
+def _encode_text(values: List[Optional[str]]):
+    encoded = [(v or "").encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+
+def _encode_tags(values: List[Optional[List[str]]]):
+    lists = [v if isinstance(v, list) else json.loads(v) if v else [] for v in values]
+    vocabulary = sorted({str(tag) for tags in lists for tag in tags})
+    position = {tag: i for i, tag in enumerate(vocabulary)}
+    matrix = np.zeros((len(lists), max(len(vocabulary), 1)), dtype=bool)
+    rows = [row for row, tags in enumerate(lists) for _ in tags]
+    columns = [position[str(tag)] for tags in lists for tag in tags]
+    matrix[rows, columns] = True
+    return np.packbits(matrix, axis=1, bitorder="little"), vocabulary
+
+
+def export_snapshot(engine, directory: str = CATALOG_SNAPSHOT_DIR, force: bool = False) -> Dict[str, Any]:
+    """framesテーブルを列ごとのファイルに書き出し、<directory>/<バージョン>/に配置する
+
+    同じバージョンが既に存在する場合は（forceでない限り）書き出さずにそのマニフェストを返す。
+    一時ディレクトリに書き出してから置き換えるため、読み込み中のワーカーが不完全なファイルを見ることはない。
+    """
+    from ..database import Base
+    from .. import models  # noqa: F401  テーブル定義を登録する
+
+    table = Base.metadata.tables["frames"]
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        version = catalog_version(conn)
+        target = os.path.join(directory, version)
+        if not force and os.path.exists(os.path.join(target, MANIFEST_FILE)):
+            logger.info(f"カタログスナップショットは最新です: バージョン={version}")
+            _write_current(directory, version)
+            with open(os.path.join(target, MANIFEST_FILE), encoding="utf-8") as f:
+                return json.load(f)
+
+        names = list(NUMERIC_COLUMNS) + list(DICTIONARY_COLUMNS) + list(TEXT_COLUMNS) + list(TAG_COLUMNS)
+        columns: Dict[str, List[Any]] = {name: [] for name in names}
+        result = conn.execution_options(yield_per=EXPORT_CHUNK_SIZE).execute(
+            select(*[table.c[name] for name in names]).order_by(table.c.id)
+        )
+        for partition in result.partitions():
+            for name, values in zip(names, zip(*partition)):
+                columns[name].extend(values)
+
+    tmp_dir = os.path.join(directory, f".{version}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    manifest: Dict[str, Any] = {
+        "format": FORMAT_VERSION,
+        "catalog_version": version,
+        "rows": len(columns["id"]),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "numeric": NUMERIC_COLUMNS,
+        "dictionaries": {},
+        "text": list(TEXT_COLUMNS),
+        "tags": {},
+    }
+    for name, dtype in NUMERIC_COLUMNS.items():
+        values = [np.nan if v is None else v for v in columns[name]]
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), np.array(values, dtype=dtype))
+    for name in DICTIONARY_COLUMNS:
+        codes, dictionary = _dictionary_encode(columns[name])
+        np.save(os.path.join(tmp_dir, f"{name}.codes.npy"), codes)
+        manifest["dictionaries"][name] = dictionary
+    for name in TEXT_COLUMNS:
+        values = columns[name]
+        if name == "image_urls":
+            values = [v if isinstance(v, str) or v is None else json.dumps(v, ensure_ascii=False) for v in values]
+        offsets, data = _encode_text(values)
+        np.save(os.path.join(tmp_dir, f"{name}.offsets.npy"), offsets)
+        with open(os.path.join(tmp_dir, f"{name}.bin"), "wb") as f:
+            f.write(data)
+    for name in TAG_COLUMNS:
+        bits, vocabulary = _encode_tags(columns[name])
+        np.save(os.path.join(tmp_dir, f"{name}.bits.npy"), bits)
+        manifest["tags"][name] = vocabulary
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp_dir, target)
+    _write_current(directory, version)
+    _prune(directory, version)
+    logger.info(
+        f"カタログスナップショットを書き出しました: バージョン={version}, {manifest['rows']}件, "
+        f"{time.perf_counter() - started:.2f}秒"
+    )
+    return manifest
+
+
+def _write_current(directory: str, version: str) -> None:
+    tmp_path = os.path.join(directory, f".{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(directory, CURRENT_FILE))
+
+
+def _prune(directory: str, current: str) -> None:
+    """古いバージョンのスナップショットを削除する（読み込み済みのワーカーのmmapは削除後も有効）"""
+    versions = [
+        entry for entry in os.scandir(directory)
+        if entry.is_dir() and not entry.name.startswith(".") and entry.name != current
+    ]
+    versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in versions[max(CATALOG_SNAPSHOT_KEEP - 1, 0):]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+class CatalogSnapshot:
+    """mmapで読み込んだ列指向のカタログスナップショット（読み取り専用）
+
+    開く処理はマニフェストの読み込みとファイルのmmapのみで、件数によらず一定時間で終わる。
+    ページはアクセス時にOSのページキャッシュから読み込まれ、同じファイルを開いた全プロセスで共有される。
+    行の順序はIDの昇順。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest["format"] != FORMAT_VERSION:
+            raise ValueError(f"対応していないスナップショットの形式です: {self.manifest['format']}")
+        self.version: str = self.manifest["catalog_version"]
+        self.rows: int = self.manifest["rows"]
+
+        self.numeric = {name: self._load(f"{name}.npy") for name in self.manifest["numeric"]}
+        self.codes = {name: self._load(f"{name}.codes.npy") for name in self.manifest["dictionaries"]}
+        # 末尾のNoneはコード-1（NULL）に対応する
+        self.dictionaries = {
+            name: np.array(values + [None], dtype=object) for name, values in self.manifest["dictionaries"].items()
+        }
+        self._text = {
+            name: (self._load(f"{name}.offsets.npy"), self._load_bytes(f"{name}.bin"))
+            for name in self.manifest["text"]
+        }
+        self.tag_vocabulary: Dict[str, List[str]] = self.manifest["tags"]
+        self._tag_position = {
+            name: {tag: i for i, tag in enumerate(vocabulary)} for name, vocabulary in self.tag_vocabulary.items()
+        }
+        self.tag_bits = {name: self._load(f"{name}.bits.npy") for name in self.tag_vocabulary}
+
+    def _load(self, filename: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, filename), mmap_mode="r")
+
+    def _load_bytes(self, filename: str) -> np.ndarray:
+        path = os.path.join(self.path, filename)
+        # 長さ0のファイルはmmapできない
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=np.uint8)
+        return np.memmap(path, dtype=np.uint8, mode="r")
+
+    def arrays(self) -> List[np.ndarray]:
+        """mmapしている全ての配列"""
+        text_arrays = [array for pair in self._text.values() for array in pair]
+        return [*self.numeric.values(), *self.codes.values(), *self.tag_bits.values(), *text_arrays]
+
+    def warm(self) -> int:
+        """全ページを1バイトずつ読んでページキャッシュに載せる（読み込んだバイト数を返す）"""
+        total = 0
+        for array in self.arrays():
+            flat = np.ascontiguousarray(array).reshape(-1).view(np.uint8)
+            flat[::mmap.PAGESIZE].sum()
+            total += flat.nbytes
+        return total
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.numeric["id"]
+
+    def row_of(self, frame_id: int) -> Optional[int]:
+        """フレームIDの行番号（存在しない場合はNone）"""
+        row = int(np.searchsorted(self.ids, frame_id))
+        return row if row < self.rows and self.ids[row] == frame_id else None
+
+    def strings(self, name: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """辞書符号化した列の値（rowsを省略した場合は全行）"""
+        codes = self.codes[name] if rows is None else self.codes[name][rows]
+        return self.dictionaries[name][codes]
+
+    def text(self, name: str, row: int) -> str:
+        offsets, data = self._text[name]
+        return bytes(data[offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def tag_mask(self, name: str, tag: str) -> np.ndarray:
+        """タグを持つ行のマスク"""
+        position = self._tag_position[name].get(tag)
+        if position is None:
+            return np.zeros(self.rows, dtype=bool)
+        return (self.tag_bits[name][:, position // 8] >> (position % 8)) & 1 == 1
+
+    def tags(self, name: str, row: int) -> List[str]:
+        vocabulary = self.tag_vocabulary[name]
+        bits = np.unpackbits(self.tag_bits[name][row], bitorder="little")[:len(vocabulary)]
+        return [vocabulary[i] for i in np.flatnonzero(bits)]
+
+    def frame(self, row: int) -> Dict[str, Any]:
+        """1行分をFrameの列名の辞書として返す（タグは語彙の順）"""
+        record: Dict[str, Any] = {}
+        for name, values in self.numeric.items():
+            value = values[row]
+            if values.dtype.kind != "f":
+                record[name] = value.item()
+            elif np.isnan(value):
+                record[name] = None
+            else:
+                # float32の最短表現を経由し、137.8が137.80000305...にならないようにする
+                record[name] = float(str(value))
+        for name in self.codes:
+            record[name] = self.dictionaries[name][self.codes[name][row]]
+        record["name"] = self.text("name", row)
+        image_urls = self.text("image_urls", row)
+        record["image_urls"] = json.loads(image_urls) if image_urls else []
+        for name in self.tag_bits:
+            record[name] = self.tags(name, row)
+        return record
+
+    def info(self) -> Dict[str, Any]:
+        size = sum(entry.stat().st_size for entry in os.scandir(self.path) if entry.is_file())
+        return {
+            "catalog_version": self.version,
+            "rows": self.rows,
+            "created_at": self.manifest["created_at"],
+            "path": self.path,
+            "bytes": size,
+        }
+
+
+_snapshot: Optional[CatalogSnapshot] = None
+
+
+def load_current_snapshot(directory: str = CATALOG_SNAPSHOT_DIR) -> Optional[CatalogSnapshot]:
+    """CURRENTが指すバージョンのスナップショットを開き、プロセス全体で共有する"""
+    global _snapshot
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), encoding="utf-8") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        logger.warning(f"カタログスナップショットがありません: {directory}")
+        return None
+    started = time.perf_counter()
+    snapshot = CatalogSnapshot(os.path.join(directory, version))
+    _snapshot = snapshot
+    logger.info(
+        f"カタログスナップショットを読み込みました: バージョン={version}, {snapshot.rows}件, "
+        f"{(time.perf_counter() - started) * 1000:.1f}ms"
+    )
+    return snapshot
+
+
+def get_catalog_snapshot() -> Optional[CatalogSnapshot]:
+    """読み込み済みのスナップショット（読み込んでいない場合はNone）"""
+    return _snapshot
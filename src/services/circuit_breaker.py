@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """サーキットが開いているため呼び出しを行わなかったことを示す例外"""
+
+
+class CircuitBreaker:
+    """外部API呼び出し用のサーキットブレーカー
+
+    - closed: 通常どおり呼び出す。連続失敗がしきい値に達するとopenへ
+    - open: 呼び出さずに即座にCircuitOpenErrorを送出。復旧待ち時間の経過後half_openへ
+    - half_open: 限られた数の試行呼び出しのみ許可し、成功でclosed、失敗でopenへ戻る
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        latency_budget: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.latency_budget = latency_budget
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+        # 統計情報
+        self._total_calls = 0
+        self._total_failures = 0
+        self._total_rejected = 0
+        self._total_timeouts = 0
+
+    def _refresh_state(self) -> None:
+        """復旧待ち時間が経過していればhalf_openへ遷移する（ロック取得済みで呼ぶ）"""
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+            logger.info(f"サーキットブレーカー[{self.name}]: half_openに移行しました")
+
+    def _open(self) -> None:
+        """サーキットを開く（ロック取得済みで呼ぶ）"""
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self._half_open_calls = 0
+        logger.warning(f"サーキットブレーカー[{self.name}]: openに移行しました（連続失敗={self._failures}）")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def allow_request(self) -> bool:
+        """呼び出しを許可するかどうかを判定し、half_open中は試行枠を確保する"""
+        with self._lock:
+            self._refresh_state()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            self._total_rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """呼び出し成功を記録する"""
+        with self._lock:
+            self._total_calls += 1
+            self._failures = 0
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._half_open_calls = 0
+                logger.info(f"サーキットブレーカー[{self.name}]: closedに復帰しました")
+
+    def record_failure(self, timeout: bool = False) -> None:
+        """呼び出し失敗を記録する"""
+        with self._lock:
+            self._total_calls += 1
+            self._total_failures += 1
+            if timeout:
+                self._total_timeouts += 1
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open()
+
+    def _release(self) -> None:
+        """結果を記録せずにhalf_openの試行枠を返却する（キャンセル時）"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """サーキットブレーカーとレイテンシ予算を適用してコルーチン関数を呼び出す"""
+        if not self.allow_request():
+            raise CircuitOpenError(f"サーキット[{self.name}]がopenのため呼び出しをスキップしました")
+
+        try:
+            if self.latency_budget:
+                result = await asyncio.wait_for(func(*args, **kwargs), timeout=self.latency_budget)
+            else:
+                result = await func(*args, **kwargs)
+        except asyncio.TimeoutError:
+            self.record_failure(timeout=True)
+            raise
+        except asyncio.CancelledError:
+            self._release()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+
+        self.record_success()
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """現在の状態と統計情報を返す"""
+        with self._lock:
+            self._refresh_state()
+            return {
+                "name": self.name,
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "recovery_timeout": self.recovery_timeout,
+                "latency_budget": self.latency_budget,
+                "total_calls": self._total_calls,
+                "total_failures": self._total_failures,
+                "total_timeouts": self._total_timeouts,
+                "total_rejected": self._total_rejected,
+            }
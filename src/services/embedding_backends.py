@@ -0,0 +1,145 @@
+import os
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# バックエンド設定（環境変数から取得）
+# azure: Azure OpenAI / local: HashingVectorizerによるオフライン実装
+EMBEDDING_BACKEND = os.getenv(
+    "EMBEDDING_BACKEND",
+    "azure" if os.getenv("AZURE_OPENAI_API_KEY") or os.getenv("AZURE_OPENAI_FAKE", "false").lower() == "true" else "local"
+).lower()
+EMBEDDING_FALLBACK_LOCAL = os.getenv("EMBEDDING_FALLBACK_LOCAL", "true").lower() == "true"
+EMBEDDING_TIMEOUT = float(os.getenv("EMBEDDING_TIMEOUT", "5"))
+LOCAL_EMBEDDING_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", "512"))
+
+
+class EmbeddingBackend:
+    """エンベディングバックエンドの共通インターフェース"""
+
+    # バックエンドの識別名（ベクトル空間ごとに一意）
+    name = "base"
+
+    @property
+    def dim(self) -> Optional[int]:
+        """出力ベクトルの次元数（不明な場合はNone）"""
+        return None
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """テキストのリストを(件数, 次元)のfloat32行列に変換する"""
+        raise NotImplementedError
+
+
+class AzureOpenAIEmbeddingBackend(EmbeddingBackend):
+    """Azure OpenAIのエンベディングAPIを利用するバックエンド（openai v1のクライアント）"""
+
+    # Azure OpenAIのAPIバージョン（ai_serviceと同じ）
+    api_version = "2023-05-15"
+
+    def __init__(self, deployment: Optional[str] = None, timeout: float = EMBEDDING_TIMEOUT):
+        self.deployment = deployment or os.getenv(
+            "AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME", "text-embedding-3-large"
+        )
+        self.timeout = timeout
+        self.name = f"azure:{self.deployment}"
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def _get_client(self):
+        """クライアントを初回利用時に作成する（AZURE_OPENAI_FAKEの場合はオフラインの代替）"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    if os.getenv("AZURE_OPENAI_FAKE", "false").lower() == "true":
+                        from .ai_service import get_openai
+
+                        self._client = get_openai()
+                    else:
+                        import httpx
+                        from openai import AzureOpenAI
+
+                        # タイムアウト後はローカルにフォールバックするため、クライアント側の再試行はしない
+                        # （openai 1.16の既定のHTTPクライアントはhttpx 0.28以降で作成できないため、明示的に渡す）
+                        self._client = AzureOpenAI(
+                            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+                            api_version=self.api_version,
+                            timeout=self.timeout,
+                            max_retries=0,
+                            http_client=httpx.Client(timeout=self.timeout),
+                        )
+        return self._client
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Azure OpenAIでエンベディングを取得する（失敗・タイムアウト時は例外を送出）"""
+        response = self._get_client().embeddings.create(
+            input=texts,
+            model=self.deployment,
+            timeout=self.timeout,
+        )
+        return np.asarray([item.embedding for item in response.data], dtype=np.float32)
+
+
+class LocalHashingEmbeddingBackend(EmbeddingBackend):
+    """HashingVectorizerの文字n-gramによる決定的なオフラインバックエンド
+
+    分かち書き不要の文字n-gramを使うため日本語でもそのまま動作し、
+    語彙の学習や外部通信なしで同じテキストから常に同じベクトルを生成する。
+    """
+
+    def __init__(self, n_features: int = LOCAL_EMBEDDING_DIM, ngram_range=(1, 3)):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.n_features = n_features
+        self.name = f"local:hashing-{n_features}"
+        self._vectorizer = HashingVectorizer(
+            analyzer="char",
+            ngram_range=ngram_range,
+            n_features=n_features,
+            alternate_sign=False,
+            norm="l2",
+            lowercase=True,
+        )
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self.n_features
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """文字n-gramのハッシュでエンベディングを生成する"""
+        return self._vectorizer.transform(texts).toarray().astype(np.float32)
+
+
+# 生成済みバックエンドのキャッシュ
+_backends: Dict[str, EmbeddingBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(kind: str) -> EmbeddingBackend:
+    """種類名からバックエンドを取得する（プロセス内で共有）"""
+    kind = kind.lower()
+    with _backends_lock:
+        backend = _backends.get(kind)
+        if backend is None:
+            if kind == "azure":
+                backend = AzureOpenAIEmbeddingBackend()
+            elif kind == "local":
+                backend = LocalHashingEmbeddingBackend()
+            else:
+                raise ValueError(f"不明なエンベディングバックエンドです: {kind}")
+            _backends[kind] = backend
+            logger.info(f"エンベディングバックエンドを初期化しました: {backend.name}")
+        return backend
+
+
+def get_embedding_backends() -> List[EmbeddingBackend]:
+    """優先順に並べたバックエンドのリストを返す（先頭が主、以降はフォールバック）"""
+    backends = [get_backend(EMBEDDING_BACKEND)]
+    if EMBEDDING_FALLBACK_LOCAL and EMBEDDING_BACKEND != "local":
+        backends.append(get_backend("local"))
+    return backends
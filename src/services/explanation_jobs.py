@@ -0,0 +1,201 @@
+import os
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# ジョブキューの設定（環境変数から取得）
+EXPLANATION_WORKERS = int(os.getenv("EXPLANATION_WORKERS", "4"))
+EXPLANATION_QUEUE_SIZE = int(os.getenv("EXPLANATION_QUEUE_SIZE", "200"))
+EXPLANATION_JOB_TTL = float(os.getenv("EXPLANATION_JOB_TTL", "600"))  # 完了後の保持時間（秒）
+EXPLANATION_MAX_JOBS = int(os.getenv("EXPLANATION_MAX_JOBS", "1000"))
+
+# フレームの説明生成に使う属性
+FRAME_FIELDS = [
+    "id", "name", "brand", "price", "style", "shape", "material", "color",
+    "frame_width", "lens_width", "bridge_width", "temple_length", "lens_height", "weight",
+]
+
+
+class QueueFullError(Exception):
+    """キューが満杯でジョブを受け付けられないことを示す例外"""
+
+
+class ExplanationJob:
+    """複数フレーム分の説明生成ジョブ"""
+
+    def __init__(
+        self,
+        frame_ids: List[int],
+        face_data: Dict[str, Any],
+        style_preference: Optional[Dict[str, Any]] = None,
+    ):
+        self.id = uuid.uuid4().hex
+        self.frame_ids = frame_ids
+        self.face_data = face_data
+        self.style_preference = style_preference
+        self.explanations: Dict[int, Dict[str, Any]] = {}
+        self.errors: Dict[int, str] = {}
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def done_count(self) -> int:
+        return len(self.explanations) + len(self.errors)
+
+    @property
+    def status(self) -> str:
+        if self.done_count >= len(self.frame_ids):
+            return "completed"
+        if self.done_count > 0:
+            return "running"
+        return "pending"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """ポーリング用のレスポンス形式に変換する"""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.frame_ids),
+            "completed": self.done_count,
+            "explanations": {str(frame_id): e for frame_id, e in self.explanations.items()},
+            "errors": {str(frame_id): e for frame_id, e in self.errors.items()},
+        }
+
+
+def load_frame_data(frame_id: int) -> Optional[Dict[str, Any]]:
+    """フレームをデータベースから読み込み、説明生成用の辞書に変換する"""
+    from .. import crud
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        frame = crud.frame.get_frame(db, frame_id)
+        if frame is None:
+            return None
+        return {field: getattr(frame, field, None) for field in FRAME_FIELDS}
+    finally:
+        db.close()
+
+
+async def _default_generate(
+    frame_data: Dict[str, Any],
+    face_data: Dict[str, Any],
+    style_preference: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    from .ai_service import generate_glasses_explanation
+
+    return await generate_glasses_explanation(frame_data, face_data, style_preference)
+
+
+class ExplanationJobQueue:
+    """説明生成ジョブのキューと固定数のワーカー
+
+    ジョブはフレーム単位のタスクに分割してキューに積み、ワーカーが並行に処理する。
+    結果はプロセス内に保持するため、ポーリングは同じワーカープロセスで受ける必要がある。
+    """
+
+    def __init__(
+        self,
+        workers: int = EXPLANATION_WORKERS,
+        queue_size: int = EXPLANATION_QUEUE_SIZE,
+        job_ttl: float = EXPLANATION_JOB_TTL,
+        max_jobs: int = EXPLANATION_MAX_JOBS,
+        generate: Callable[..., Awaitable[Dict[str, Any]]] = _default_generate,
+        load_frame: Callable[[int], Optional[Dict[str, Any]]] = load_frame_data,
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.job_ttl = job_ttl
+        self.max_jobs = max_jobs
+        self._generate = generate
+        self._load_frame = load_frame
+
+        self._jobs: Dict[str, ExplanationJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def _ensure_started(self) -> None:
+        """実行中のイベントループ上でワーカーを起動する（初回のみ）"""
+        if self._worker_tasks and not all(task.done() for task in self._worker_tasks):
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        logger.info(f"説明生成ワーカーを起動しました: {self.workers}件")
+
+    def _purge_expired(self) -> None:
+        """保持期限を過ぎた完了ジョブを削除する"""
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.job_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(
+        self,
+        frame_ids: List[int],
+        face_data: Dict[str, Any],
+        style_preference: Optional[Dict[str, Any]] = None,
+    ) -> ExplanationJob:
+        """ジョブを登録してキューに積む（処理の完了は待たない）"""
+        self._ensure_started()
+        self._purge_expired()
+
+        frame_ids = list(dict.fromkeys(frame_ids))  # 重複を除去（順序は保持）
+        if len(self._jobs) >= self.max_jobs:
+            raise QueueFullError("保持できるジョブ数の上限に達しました")
+        if self._queue.qsize() + len(frame_ids) > self.queue_size:
+            raise QueueFullError("説明生成キューが満杯です")
+
+        job = ExplanationJob(frame_ids, face_data, style_preference)
+        self._jobs[job.id] = job
+        for frame_id in frame_ids:
+            self._queue.put_nowait((job, frame_id))
+        logger.info(f"説明生成ジョブを登録しました: job_id={job.id}, フレーム数={len(frame_ids)}")
+        return job
+
+    def get(self, job_id: str) -> Optional[ExplanationJob]:
+        """ジョブを取得する"""
+        self._purge_expired()
+        return self._jobs.get(job_id)
+
+    async def _worker(self, worker_id: int) -> None:
+        """キューからタスクを取り出して説明を生成する"""
+        while True:
+            job, frame_id = await self._queue.get()
+            try:
+                frame_data = await asyncio.to_thread(self._load_frame, frame_id)
+                if frame_data is None:
+                    job.errors[frame_id] = "フレームが見つかりませんでした"
+                else:
+                    job.explanations[frame_id] = await self._generate(
+                        frame_data, job.face_data, job.style_preference
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"説明生成ジョブのエラー: job_id={job.id}, frame_id={frame_id}, {str(e)}")
+                job.errors[frame_id] = str(e)
+            finally:
+                if job.status == "completed" and job.finished_at is None:
+                    job.finished_at = time.time()
+                self._queue.task_done()
+
+    async def shutdown(self) -> None:
+        """ワーカーを停止する"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+
+# プロセス内で共有するジョブキュー
+explanation_job_queue = ExplanationJobQueue()
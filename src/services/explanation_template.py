@@ -0,0 +1,60 @@
+from typing import Dict, Any, Optional
+
+def generate_template_explanation(
+    frame_data: Dict[str, Any],
+    face_data: Dict[str, Any],
+    style_preference: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """AIを使わずにテンプレートから説明を生成する"""
+    # フレームの項目はNULLの場合があるため、空文字として扱う
+    brand = frame_data.get('brand') or ''
+    name = frame_data.get('name') or ''
+    shape = frame_data.get('shape') or ''
+    style = frame_data.get('style') or ''
+    material = frame_data.get('material') or ''
+    color = frame_data.get('color') or ''
+    
+    # フィット説明を生成
+    # 測定値もNoneの場合があるため、0として扱う
+    face_width = face_data.get('face_width') or 0
+    nose_height = face_data.get('nose_height') or 0
+    fit_explanation = f"{brand}の{name}は、あなたの顔幅({face_width:.1f}mm)と鼻の高さ({nose_height:.1f}mm)に適したサイズです。"
+    
+    if shape.lower() == "round" or shape.lower() == "ラウンド":
+        fit_explanation += " 丸みを帯びたフレームはあなたの顔の特徴を和らげ、柔らかい印象を与えます。"
+    elif shape.lower() == "square" or shape.lower() == "スクエア":
+        fit_explanation += " シャープなフレームはあなたの顔に知的で洗練された印象を加えます。"
+    else:
+        fit_explanation += f" {shape}シェイプはあなたの顔立ちに調和します。"
+    
+    # スタイル説明を生成
+    style_explanation = f"{style}スタイルの{material}素材フレームは、"
+    
+    preferred_styles = []
+    if style_preference and style_preference.get("preferred_styles"):
+        preferred_styles = style_preference.get("preferred_styles")
+        
+    if preferred_styles:
+        style_explanation += f"あなたが好む{', '.join(preferred_styles)}テイストに合致し、"
+        
+    if style.lower() == "classic" or style.lower() == "クラシック":
+        style_explanation += "時代を超えた上品さを提供します。"
+    elif style.lower() == "modern" or style.lower() == "モダン":
+        style_explanation += "洗練された現代的な印象を与えます。"
+    elif style.lower() == "casual" or style.lower() == "カジュアル":
+        style_explanation += "自然でリラックスした日常使いに最適です。"
+    else:
+        style_explanation += "あなたの個性を引き立てます。"
+    
+    # 特徴ハイライトを生成
+    feature_highlights = [
+        f"{material}素材（軽量で耐久性があります）",
+        f"{shape}シェイプ（あなたの顔型に適しています）",
+        f"{color}カラー（あなたの肌色・髪色に調和します）"
+    ]
+    
+    return {
+        "fit_explanation": fit_explanation,
+        "style_explanation": style_explanation,
+        "feature_highlights": feature_highlights
+    }
@@ -0,0 +1,69 @@
+# 顔型のラベル（配列のインデックスが顔型のコード）
+FACE_SHAPE_LABELS = ("丸顔", "四角顔", "逆三角顔", "卵型顔", "楕円顔", "ダイヤモンド顔")
+ROUND, SQUARE, INVERTED_TRIANGLE, EGG, OVAL, DIAMOND = range(len(FACE_SHAPE_LABELS))
+
+# 判定のしきい値
+# 顔幅/鼻の高さがこれより大きければ横長、NARROW_RATIOより小さければ縦長
+WIDE_RATIO = 1.1
+NARROW_RATIO = 0.9
+# 頬の面積/(顔幅×鼻の高さ)がこれより大きければ丸みのある顔
+CHEEK_FACTOR_THRESHOLD = 0.3
+# こめかみの位置/顔幅がこれより大きければ上部の広い顔
+TEMPLE_FACTOR_THRESHOLD = 0.6
+
+
+def classify_face_shape(face_width: float, nose_height: float, cheek_area: float, temple_position: float) -> str:
+    """1件の測定値の顔型のラベル（リクエストごとの判定用で、numpyを使わない）
+
+    判定はclassify_face_shapesと同じで、縦横比（顔幅/鼻の高さ）で横長・縦長・中間に分け、
+    横長と中間は頬の面積の比率、縦長はこめかみの位置の比率でさらに分ける。
+    顔幅・鼻の高さが0以下（またはNaN）の測定値は判定できないため、ダイヤモンド顔とする。
+    """
+    if not (face_width > 0 and nose_height > 0):
+        return FACE_SHAPE_LABELS[DIAMOND]
+
+    # 除算の順序はclassify_face_shapesと同じにする（浮動小数点の結果を一致させるため）
+    width_to_height_ratio = face_width / nose_height
+    cheek_factor = cheek_area / face_width / nose_height
+    temple_factor = temple_position / face_width
+
+    if width_to_height_ratio > WIDE_RATIO:  # 横長の顔
+        code = ROUND if cheek_factor > CHEEK_FACTOR_THRESHOLD else SQUARE
+    elif width_to_height_ratio < NARROW_RATIO:  # 縦長の顔
+        code = INVERTED_TRIANGLE if temple_factor > TEMPLE_FACTOR_THRESHOLD else EGG
+    else:  # バランスの取れた顔
+        code = OVAL if cheek_factor > CHEEK_FACTOR_THRESHOLD else DIAMOND
+    return FACE_SHAPE_LABELS[code]
+
+
+def classify_face_shapes(face_width, nose_height, cheek_area, temple_position):
+    """測定値の配列から顔型のコード（FACE_SHAPE_LABELSのインデックス、int8の配列）を求める
+
+    判定はclassify_face_shapeと同じ（顔幅・鼻の高さが0以下またはNaNの行はダイヤモンド顔）。
+    """
+    import numpy as np
+
+    face_width = np.asarray(face_width, dtype=np.float64)
+    nose_height = np.asarray(nose_height, dtype=np.float64)
+    valid = (face_width > 0) & (nose_height > 0)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        width_to_height_ratio = face_width / nose_height
+        cheek_factor = np.asarray(cheek_area, dtype=np.float64) / face_width / nose_height
+        temple_factor = np.asarray(temple_position, dtype=np.float64) / face_width
+
+    wide = valid & (width_to_height_ratio > WIDE_RATIO)
+    narrow = valid & (width_to_height_ratio < NARROW_RATIO)
+    rounded = valid & (cheek_factor > CHEEK_FACTOR_THRESHOLD)
+    codes = np.select(
+        [wide & rounded, wide, narrow & (temple_factor > TEMPLE_FACTOR_THRESHOLD), narrow, rounded],
+        [ROUND, SQUARE, INVERTED_TRIANGLE, EGG, OVAL],
+        default=DIAMOND,
+    )
+    return codes.astype(np.int8)
+
+
+def face_shape_labels(codes):
+    """顔型のコードの配列をラベルの配列に変換する"""
+    import numpy as np
+
+    return np.array(FACE_SHAPE_LABELS, dtype=object)[np.asarray(codes)]
@@ -0,0 +1,350 @@
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import argparse
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# 代替サーバーの設定（環境変数から取得）
+AZURE_OPENAI_FAKE = os.getenv("AZURE_OPENAI_FAKE", "false").lower() == "true"
+# 最初のトークンまでの遅延の分布（fixed:秒 / uniform:最小,最大 / normal:平均,標準偏差 / lognormal:中央値,σ）
+FAKE_OPENAI_LATENCY = os.getenv("FAKE_OPENAI_LATENCY", "lognormal:0.6,0.5")
+# 生成速度（トークン/秒、0の場合は生成時間なし）
+FAKE_OPENAI_TOKENS_PER_SECOND = float(os.getenv("FAKE_OPENAI_TOKENS_PER_SECOND", "80"))
+# レート制限（429）とサーバーエラーを返す割合
+FAKE_OPENAI_RATE_LIMIT_RATE = float(os.getenv("FAKE_OPENAI_RATE_LIMIT_RATE", "0"))
+FAKE_OPENAI_ERROR_RATE = float(os.getenv("FAKE_OPENAI_ERROR_RATE", "0"))
+FAKE_OPENAI_SEED = int(os.getenv("FAKE_OPENAI_SEED", "0"))
+FAKE_OPENAI_EMBEDDING_DIM = int(os.getenv("FAKE_OPENAI_EMBEDDING_DIM", "1536"))
+
+FAULT_RATE_LIMIT = "rate_limit"
+FAULT_ERROR = "error"
+
+
+class RateLimitError(Exception):
+    """レート制限（429）の代替"""
+
+    http_status = 429
+
+    def __init__(self, message: str = "Rate limit is exceeded. Try again later.", retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class APIError(Exception):
+    """サーバーエラー（500）の代替"""
+
+    http_status = 500
+
+
+def parse_latency(spec: str) -> Tuple[str, List[float]]:
+    """遅延の分布の設定（例: "lognormal:0.6,0.5"）を解析する"""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v.strip()]
+    expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+    if kind not in expected or len(values) != expected[kind]:
+        raise ValueError(f"遅延の分布の設定が不正です: {spec}")
+    return kind, values
+
+
+class FakeBehavior:
+    """呼び出しごとの遅延と障害をシード付きの乱数で決める"""
+
+    def __init__(
+        self,
+        latency: str = FAKE_OPENAI_LATENCY,
+        tokens_per_second: float = FAKE_OPENAI_TOKENS_PER_SECOND,
+        rate_limit_rate: float = FAKE_OPENAI_RATE_LIMIT_RATE,
+        error_rate: float = FAKE_OPENAI_ERROR_RATE,
+        seed: int = FAKE_OPENAI_SEED,
+        embedding_dim: int = FAKE_OPENAI_EMBEDDING_DIM,
+    ):
+        self.latency_kind, self.latency_params = parse_latency(latency)
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.embedding_dim = embedding_dim
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def sample(self) -> Tuple[float, Optional[str]]:
+        """1回の呼び出しの（最初のトークンまでの遅延, 障害の種類）"""
+        with self._lock:
+            self.calls += 1
+            rng = self._rng
+            if self.latency_kind == "fixed":
+                latency = self.latency_params[0]
+            elif self.latency_kind == "uniform":
+                latency = rng.uniform(*self.latency_params)
+            elif self.latency_kind == "normal":
+                latency = rng.gauss(*self.latency_params)
+            else:
+                median, sigma = self.latency_params
+                latency = median * rng.lognormvariate(0.0, sigma)
+            roll = rng.random()
+        fault = None
+        if roll < self.rate_limit_rate:
+            fault = FAULT_RATE_LIMIT
+        elif roll < self.rate_limit_rate + self.error_rate:
+            fault = FAULT_ERROR
+        return max(0.0, latency), fault
+
+    def token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def raise_fault(self, fault: Optional[str]) -> None:
+        if fault == FAULT_RATE_LIMIT:
+            raise RateLimitError()
+        if fault == FAULT_ERROR:
+            raise APIError("The server had an error while processing your request.")
+
+    def embedding(self, text: str) -> List[float]:
+        """テキストから決まる単位ベクトル"""
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        vector = [rng.gauss(0.0, 1.0) for _ in range(self.embedding_dim)]
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+
+def _last_user_message(messages: List[Dict[str, str]]) -> str:
+    for message in reversed(messages or []):
+        if message.get("role") == "user":
+            return message.get("content", "")
+    return ""
+
+
+def generate_reply(messages: List[Dict[str, str]]) -> str:
+    """ai_service.parse_explanation / parse_combined_explanationsで解析できる形式の応答"""
+    prompt = _last_user_message(messages)
+    frame_numbers = [int(n) for n in re.findall(r"【フレーム(\d+)】", prompt)]
+    body = (
+        "1. フィット感について\n"
+        "フレームの横幅がお顔の幅とほぼ同じで、バランスよくお掛けいただけます。"
+        "瞳孔の位置もレンズの黄金比の位置に近く、自然な印象です。\n\n"
+        "2. スタイルについて\n"
+        "落ち着いたデザインがお客様の雰囲気によく合っています。"
+        "フレームのトップラインが眉に沿い、表情をすっきりと見せます。"
+    )
+    if not frame_numbers:
+        return body
+    return "\n\n".join(f"### フレーム{n}\n{body}" for n in frame_numbers)
+
+
+def _tokens(text: str) -> List[str]:
+    """ストリーミング用にテキストを分割する（おおよそのトークン単位）"""
+    return re.findall(r"\s+|[A-Za-z0-9]+|.", text)
+
+
+def _chat_response(deployment: str, content: str, prompt: str) -> Dict[str, Any]:
+    return {
+        "id": f"chatcmpl-fake-{hashlib.md5(content.encode('utf-8')).hexdigest()[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": deployment,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {
+            "prompt_tokens": len(_tokens(prompt)),
+            "completion_tokens": len(_tokens(content)),
+            "total_tokens": len(_tokens(prompt)) + len(_tokens(content)),
+        },
+    }
+
+
+def _chunk(deployment: str, delta: Dict[str, str], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "id": "chatcmpl-fake-stream",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": deployment,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def _embedding_response(behavior: FakeBehavior, deployment: str, texts: List[str]) -> Dict[str, Any]:
+    return {
+        "object": "list",
+        "model": deployment,
+        "data": [
+            {"object": "embedding", "index": i, "embedding": behavior.embedding(text)}
+            for i, text in enumerate(texts)
+        ],
+        "usage": {"prompt_tokens": sum(len(_tokens(t)) for t in texts), "total_tokens": sum(len(_tokens(t)) for t in texts)},
+    }
+
+
+def _to_namespace(value: Any) -> Any:
+    """openaiのレスポンスオブジェクトと同様に属性でアクセスできるよう変換する"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _to_namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_to_namespace(v) for v in value]
+    return value
+
+
+class _ChatCompletion:
+    def __init__(self, behavior: FakeBehavior):
+        self.behavior = behavior
+
+    def create(self, messages: List[Dict[str, str]], engine: str = "fake", stream: bool = False, **kwargs):
+        latency, fault = self.behavior.sample()
+        time.sleep(latency)
+        self.behavior.raise_fault(fault)
+        content = generate_reply(messages)
+        if stream:
+            return self._stream(engine, content)
+        time.sleep(len(_tokens(content)) * self.behavior.token_delay())
+        return _to_namespace(_chat_response(engine, content, _last_user_message(messages)))
+
+    def _stream(self, engine: str, content: str) -> Iterator[SimpleNamespace]:
+        delay = self.behavior.token_delay()
+        yield _to_namespace(_chunk(engine, {"role": "assistant"}))
+        for token in _tokens(content):
+            time.sleep(delay)
+            yield _to_namespace(_chunk(engine, {"content": token}))
+        yield _to_namespace(_chunk(engine, {}, "stop"))
+
+    async def acreate(self, messages: List[Dict[str, str]], engine: str = "fake", **kwargs):
+        return await asyncio.to_thread(self.create, messages, engine, **kwargs)
+
+
+class _Embedding:
+    def __init__(self, behavior: FakeBehavior):
+        self.behavior = behavior
+
+    def create(self, input: Any, engine: str = "fake", model: Optional[str] = None, **kwargs):
+        # openai v1のclient.embeddings.create(model=...)の形でも呼び出せる
+        engine = model or engine
+        latency, fault = self.behavior.sample()
+        time.sleep(latency)
+        self.behavior.raise_fault(fault)
+        texts = [input] if isinstance(input, str) else list(input)
+        return _to_namespace(_embedding_response(self.behavior, engine, texts))
+
+    async def acreate(self, input: Any, engine: str = "fake", **kwargs):
+        return await asyncio.to_thread(self.create, input, engine, **kwargs)
+
+
+class FakeAzureOpenAI:
+    """openaiモジュールの代わりにai_serviceへ渡すAzure OpenAIの代替（オフラインでの負荷試験用）
+
+    ai_serviceが利用するAPIの形（ChatCompletion.create / Embedding.create・embeddings.create、レスポンスの
+    choices[0].message.content・data[i].embedding）を再現し、遅延の分布・トークンのストリーミング・
+    レート制限（429）・エラーを環境変数で設定できる。シードを固定すれば同じ順序の呼び出しに
+    対して同じ遅延と障害を返す。
+    HTTPで提供する場合は `python -m src.services.fake_openai --port 8089` で
+    Azure OpenAIのREST API（/openai/deployments/{deployment}/chat/completions・/embeddings）を起動する。
+    """
+
+    RateLimitError = RateLimitError
+    APIError = APIError
+
+    def __init__(self, behavior: Optional[FakeBehavior] = None):
+        self.behavior = behavior or FakeBehavior()
+        self.api_type = "azure"
+        self.api_base = "fake://azure-openai"
+        self.api_version = "2023-05-15"
+        self.api_key = "fake"
+        self.ChatCompletion = _ChatCompletion(self.behavior)
+        self.Embedding = _Embedding(self.behavior)
+        # エンベディングのバックエンド（openai v1のクライアント）と同じ属性名
+        self.embeddings = self.Embedding
+
+
+def create_app(behavior: Optional[FakeBehavior] = None):
+    """Azure OpenAIのREST APIを再現するFastAPIアプリ"""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    behavior = behavior or FakeBehavior()
+    app = FastAPI(title="Fake Azure OpenAI")
+
+    def _fault_response(fault: str) -> JSONResponse:
+        if fault == FAULT_RATE_LIMIT:
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"code": "429", "message": "Rate limit is exceeded. Try again later."}},
+                headers={"Retry-After": "1"},
+            )
+        return JSONResponse(
+            status_code=500,
+            content={"error": {"code": "InternalServerError", "message": "The server had an error."}},
+        )
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def chat_completions(deployment: str, request: Request):
+        payload = await request.json()
+        latency, fault = behavior.sample()
+        await asyncio.sleep(latency)
+        if fault:
+            return _fault_response(fault)
+        messages = payload.get("messages", [])
+        content = generate_reply(messages)
+        delay = behavior.token_delay()
+
+        if payload.get("stream"):
+            async def events():
+                yield f"data: {json.dumps(_chunk(deployment, {'role': 'assistant'}), ensure_ascii=False)}\n\n"
+                for token in _tokens(content):
+                    await asyncio.sleep(delay)
+                    yield f"data: {json.dumps(_chunk(deployment, {'content': token}), ensure_ascii=False)}\n\n"
+                yield f"data: {json.dumps(_chunk(deployment, {}, 'stop'))}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(len(_tokens(content)) * delay)
+        return _chat_response(deployment, content, _last_user_message(messages))
+
+    @app.post("/openai/deployments/{deployment}/embeddings")
+    async def embeddings(deployment: str, request: Request):
+        payload = await request.json()
+        latency, fault = behavior.sample()
+        await asyncio.sleep(latency)
+        if fault:
+            return _fault_response(fault)
+        texts = payload.get("input", [])
+        return _embedding_response(behavior, deployment, [texts] if isinstance(texts, str) else texts)
+
+    @app.get("/fake/stats")
+    async def stats():
+        return {"calls": behavior.calls}
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Azure OpenAIの代替サーバーを起動します")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default=FAKE_OPENAI_LATENCY)
+    parser.add_argument("--tokens-per-second", type=float, default=FAKE_OPENAI_TOKENS_PER_SECOND)
+    parser.add_argument("--rate-limit-rate", type=float, default=FAKE_OPENAI_RATE_LIMIT_RATE)
+    parser.add_argument("--error-rate", type=float, default=FAKE_OPENAI_ERROR_RATE)
+    parser.add_argument("--seed", type=int, default=FAKE_OPENAI_SEED)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    behavior = FakeBehavior(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(behavior), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -48,12 +48,14 @@ class FrameRecommendationService:
     def calculate_design_score(
         frame: Frame,
         face_measurement: FaceMeasurement,
-        user_preferences: List[UserResponse]
+        user_preferences: List[UserResponse],
+        semantic_similarity: Optional[float] = None
     ) -> float:
         """
         デザインフィットスコアの計算（30%）
         - フレーム形状と顔型の相性（15%）
         - スタイルの適合性（15%）
+        - 意味的なスタイル一致度（指定時は3項目を均等に重み付け）
         """
         # フレーム形状スコアの計算
         shape_score = FrameRecommendationService._calculate_shape_compatibility(
@@ -67,6 +69,10 @@ class FrameRecommendationService:
             user_preferences
         )
 
+        # 意味的な一致度がある場合は3項目を均等に重み付け
+        if semantic_similarity is not None:
+            return (shape_score + style_score + semantic_similarity) / 3
+
         # 両スコアを均等に重み付け
         return (shape_score + style_score) / 2
 
@@ -220,12 +226,15 @@ class FrameRecommendationService:
         cls,
         frame: Frame,
         face_measurement: FaceMeasurement,
-        user_preferences: List[UserResponse]
+        user_preferences: List[UserResponse],
+        semantic_similarity: Optional[float] = None
     ) -> FrameRecommendationResponse:
         """総合スコアを計算"""
         # 各スコアを計算
         fit_score = cls.calculate_fit_score(frame, face_measurement)
-        design_score = cls.calculate_design_score(frame, face_measurement, user_preferences)
+        design_score = cls.calculate_design_score(
+            frame, face_measurement, user_preferences, semantic_similarity
+        )
         comfort_score = cls.calculate_comfort_score(frame, face_measurement)
         
         # 重み付けした総合スコアを計算
@@ -249,4 +258,25 @@ class FrameRecommendationService:
             style_score=design_score,
             total_score=total_score,
             recommendation_reason=recommendation_reason
-        ) 
\ No newline at end of file
+        ) 
+    @classmethod
+    def rank_frames(
+        cls,
+        frames: List[Frame],
+        face_measurement: FaceMeasurement,
+        user_preferences: List[UserResponse],
+        similarities: Optional[Dict[int, float]] = None
+    ) -> List[FrameRecommendationResponse]:
+        """全フレームの総合スコアを計算し、降順に並べる"""
+        similarities = similarities or {}
+        ranked_frames = [
+            cls.calculate_total_score(
+                frame=frame,
+                face_measurement=face_measurement,
+                user_preferences=user_preferences,
+                semantic_similarity=similarities.get(frame.id)
+            )
+            for frame in frames
+        ]
+        ranked_frames.sort(key=lambda x: x.total_score, reverse=True)
+        return ranked_frames
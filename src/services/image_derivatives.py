@@ -0,0 +1,275 @@
+import io
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from .metrics import record_cache
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# 派生画像（リサイズ・再エンコード）の設定（環境変数から取得）
+IMAGE_SOURCE_DIR = os.getenv("IMAGE_SOURCE_DIR", os.getenv("STORAGE_PATH", "static/images"))
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "cache/images")
+IMAGE_CACHE_MAX_BYTES = int(float(os.getenv("IMAGE_CACHE_MAX_MB", "512")) * 1024 * 1024)
+# 生成する幅（指定された幅以上で最小のものに丸め、キャッシュの種類を抑える）
+IMAGE_WIDTHS = sorted(int(w) for w in os.getenv("IMAGE_WIDTHS", "160,320,480,640,960,1280").split(",") if w.strip())
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+# 生成に使うプロセス数（0の場合はスレッドで生成する）
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+# レスポンスのCache-Controlのmax-age（秒）
+IMAGE_CACHE_MAX_AGE = int(os.getenv("IMAGE_CACHE_MAX_AGE", str(30 * 24 * 3600)))
+
+# 生成処理を変更した場合に上げる（キャッシュのキーに含める）
+PIPELINE_VERSION = 1
+SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+PILLOW_FORMATS = {"avif": "AVIF", "webp": "WEBP", "jpeg": "JPEG"}
+# 容量の上限を超えた場合に、この割合まで削除する
+EVICT_TARGET_RATIO = 0.9
+# EXIFの向き（90度回転を含む値）
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+@lru_cache(maxsize=None)
+def avif_supported() -> bool:
+    """AVIFでエンコードできるか（Pillow 11.2以降、またはpillow-avif-pluginが必要）"""
+    from PIL import features
+
+    if "avif" in features.modules and features.check_module("avif"):
+        return True
+    try:
+        import pillow_avif  # noqa: F401  プラグインの登録
+        return True
+    except ImportError:
+        return False
+
+
+def negotiate_format(requested: str, accept: Optional[str]) -> str:
+    """要求された形式（autoの場合はAcceptヘッダー）から出力形式を決める"""
+    if requested != "auto":
+        return requested
+    accept = accept or ""
+    if "image/avif" in accept and avif_supported():
+        return "avif"
+    if "image/webp" in accept:
+        return "webp"
+    return "jpeg"
+
+
+def snap_width(width: Optional[int]) -> int:
+    """要求された幅を生成する幅のいずれかに丸める"""
+    if width is None:
+        return IMAGE_WIDTHS[-1]
+    for candidate in IMAGE_WIDTHS:
+        if candidate >= width:
+            return candidate
+    return IMAGE_WIDTHS[-1]
+
+
+def file_digest(path: str) -> str:
+    """ファイルの内容のSHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def render_derivative(source_path: str, width: int, fmt: str, quality: int) -> bytes:
+    """元画像を幅widthに縮小してfmtでエンコードする（プロセスプールで実行する）"""
+    from PIL import Image, ImageOps
+
+    if fmt == "avif":
+        avif_supported()
+    with Image.open(source_path) as image:
+        # JPEGはdraftで縮小しながら読み込むため、回転している場合は縦横を入れ替えて指定する
+        box = (width, width * 10)
+        if image.getexif().get(0x0112) in ROTATED_ORIENTATIONS:
+            box = (width * 10, width)
+        image.thumbnail(box, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        image = ImageOps.exif_transpose(image)
+        if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        options = {"quality": quality}
+        if fmt == "webp":
+            options["method"] = 4
+        elif fmt == "jpeg":
+            options.update(optimize=True, progressive=True)
+        buffer = io.BytesIO()
+        image.save(buffer, PILLOW_FORMATS[fmt], **options)
+    return buffer.getvalue()
+
+
+class ImageDerivativeCache:
+    """静的画像の派生画像を生成し、内容アドレスのディスクキャッシュに保存する
+
+    キャッシュのキーは元画像の内容のハッシュと生成条件（幅・形式・品質・PIPELINE_VERSION）から作るため、
+    元画像が差し替わると別のキーになり、古い派生画像が返ることはない。キーはETagにも使う。
+    生成はプロセスプールで行い、同じキーへの同時リクエストは1回の生成を待ち合わせる。
+    合計サイズが上限を超えた場合は、最終利用日時（参照時に更新するmtime）の古いものから削除する。
+    """
+
+    def __init__(
+        self,
+        source_dir: str = IMAGE_SOURCE_DIR,
+        cache_dir: str = IMAGE_CACHE_DIR,
+        max_bytes: int = IMAGE_CACHE_MAX_BYTES,
+        workers: int = IMAGE_WORKERS,
+    ):
+        self.source_dir = os.path.realpath(source_dir)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # 元画像のパス -> (mtime_ns, サイズ, ハッシュ)
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._total_bytes: Optional[int] = None
+
+    def resolve_source(self, relative_path: str) -> Optional[str]:
+        """元画像の絶対パス（ディレクトリ外・対象外の拡張子・存在しない場合はNone）"""
+        path = os.path.realpath(os.path.join(self.source_dir, relative_path))
+        if not path.startswith(self.source_dir + os.sep) or not path.lower().endswith(SOURCE_EXTENSIONS):
+            return None
+        return path if os.path.isfile(path) else None
+
+    def source_digest(self, path: str) -> str:
+        """元画像の内容のハッシュ（更新日時とサイズが変わらない間はメモリから返す）"""
+        stat = os.stat(path)
+        cached = self._digests.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        digest = file_digest(path)
+        self._digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    @staticmethod
+    def derivative_key(digest: str, width: int, fmt: str, quality: int) -> str:
+        """元画像のハッシュと生成条件から派生画像のキーを作る"""
+        return hashlib.sha256(f"{digest}:{width}:{fmt}:{quality}:{PIPELINE_VERSION}".encode()).hexdigest()
+
+    def cache_path(self, key: str, fmt: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{fmt}")
+
+    async def ensure(self, source: str, key: str, width: int, fmt: str, quality: int) -> str:
+        """派生画像のパスを返す（キャッシュになければ生成する）"""
+        path = self.cache_path(key, fmt)
+        if await asyncio.to_thread(self._touch, path):
+            record_cache("image_derivatives", hits=1)
+            return path
+        record_cache("image_derivatives", misses=1)
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._generate(source, path, width, fmt, quality))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # 待っているリクエストが切断されても、生成自体は続ける
+        await asyncio.shield(future)
+        return path
+
+    @staticmethod
+    def _touch(path: str) -> bool:
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # forkはスレッドを使うサーバープロセスでは安全でないため、spawnで起動する
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def _generate(self, source: str, path: str, width: int, fmt: str, quality: int) -> None:
+        started = time.perf_counter()
+        executor = self._get_executor()
+        try:
+            data = await asyncio.get_running_loop().run_in_executor(
+                executor, render_derivative, source, width, fmt, quality
+            )
+        except BrokenProcessPool:
+            logger.error("派生画像の生成プロセスが異常終了したため、プロセスプールを作り直します")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+        await asyncio.to_thread(self._store, path, data)
+        logger.info(
+            f"派生画像を生成しました: {os.path.basename(source)} 幅={width} 形式={fmt} "
+            f"{len(data) / 1024:.1f}KB ({(time.perf_counter() - started) * 1000:.0f}ms)"
+        )
+
+    def _store(self, path: str, data: bytes) -> None:
+        """一時ファイルに書き込んでから置き換える（読み込み中のリクエストが不完全なファイルを読まないよう）"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_total()
+            else:
+                self._total_bytes += len(data)
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self._evict()
+
+    def _entries(self):
+        for directory in os.scandir(self.cache_dir):
+            if directory.is_dir():
+                for entry in os.scandir(directory.path):
+                    if entry.is_file() and not entry.name.endswith(".tmp"):
+                        yield entry
+
+    def _scan_total(self) -> int:
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def _evict(self) -> None:
+        """最終利用日時の古いものから、合計が上限のEVICT_TARGET_RATIO以下になるまで削除する"""
+        files = sorted(
+            ((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in self._entries()),
+        )
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        removed = 0
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        with self._lock:
+            self._total_bytes = total
+        logger.info(f"派生画像のキャッシュから{removed}件を削除しました: 合計={total / 1024 / 1024:.1f}MB")
+
+    def shutdown(self) -> None:
+        """生成用のプロセスプールを停止する"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# アプリケーション全体で共有するキャッシュ
+image_cache = ImageDerivativeCache()
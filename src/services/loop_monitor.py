@@ -0,0 +1,171 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+from .metrics import EVENT_LOOP_BLOCKED, EVENT_LOOP_LAG, EVENT_LOOP_LAG_QUANTILE
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# イベントループ遅延の監視設定（環境変数から取得）
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+# 遅延を計測する間隔（ミリ秒）
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "50"))
+# この時間を超えてループが応答しない場合にスタックを記録する（ミリ秒）
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+# パーセンタイルを計算する直近のサンプル数
+LOOP_LAG_WINDOW = int(os.getenv("LOOP_LAG_WINDOW", "1200"))
+
+QUANTILES = (0.5, 0.95, 0.99)
+# 記録しておくブロックの件数
+MAX_OFFENDERS = 20
+# 記録するスタックの最大フレーム数（ループ側の内部フレームは除く）
+MAX_STACK_FRAMES = 30
+
+
+class LoopLagMonitor:
+    """イベントループのスケジューリング遅延を計測し、ブロックしている処理のスタックを記録する
+
+    ループ上のタスクが一定間隔でスリープし、予定より遅れて再開した時間を遅延として記録する。
+    ループがブロックされている間はこのタスクも動けないため、別スレッドの監視役が
+    ハートビートの途絶を検出し、その時点のループスレッドのスタックと実行中のタスクを記録する。
+    """
+
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_INTERVAL_MS / 1000,
+        threshold: float = LOOP_LAG_THRESHOLD_MS / 1000,
+        window: int = LOOP_LAG_WINDOW,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self._lags: Deque[float] = deque(maxlen=window)
+        self._offenders: Deque[Dict] = deque(maxlen=MAX_OFFENDERS)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._heartbeat = time.monotonic()
+        # 現在のブロックについて記録済みのエントリ（ループ再開時に最終的な遅延を書き込む）
+        self._pending: Optional[Dict] = None
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """監視を開始する（イベントループ上から呼ぶ）"""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = self._loop.create_task(self._measure(), name="loop-lag-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(
+            f"イベントループ遅延の監視を開始しました: 間隔={self.interval * 1000:.0f}ms, "
+            f"しきい値={self.threshold * 1000:.0f}ms"
+        )
+
+    async def stop(self) -> None:
+        """監視を停止する"""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+
+    async def _measure(self) -> None:
+        loop = asyncio.get_running_loop()
+        ticks = 0
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._heartbeat = time.monotonic()
+            EVENT_LOOP_LAG.observe(lag)
+            with self._lock:
+                self._lags.append(lag)
+                if self._pending is not None:
+                    self._pending["lag_ms"] = round(lag * 1000, 1)
+                    self._pending = None
+            ticks += 1
+            # パーセンタイルは約1秒ごとに更新する
+            if ticks * self.interval >= 1.0:
+                ticks = 0
+                for quantile, value in self.percentiles().items():
+                    EVENT_LOOP_LAG_QUANTILE.labels(quantile).set(value)
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        while not self._stop.wait(self.interval):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked > self.threshold and heartbeat != reported_heartbeat:
+                reported_heartbeat = heartbeat
+                self._report(blocked)
+
+    def _report(self, blocked: float) -> None:
+        """ブロック中のループスレッドのスタックと実行中のタスクを記録する"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = [line.rstrip() for line in traceback.format_stack(frame)][-MAX_STACK_FRAMES:]
+        frame = None
+        task = asyncio.current_task(self._loop)
+        offender = {
+            "detected_at": datetime.now().isoformat(timespec="seconds"),
+            "blocked_ms": round(blocked * 1000, 1),
+            "lag_ms": None,
+            "task": task.get_name() if task is not None else None,
+            "coroutine": getattr(task.get_coro(), "__qualname__", None) if task is not None else None,
+            "stack": stack,
+        }
+        with self._lock:
+            self._offenders.append(offender)
+            self._pending = offender
+        EVENT_LOOP_BLOCKED.inc()
+        logger.warning(
+            "イベントループが%.0fms以上ブロックされています: タスク=%s\n%s",
+            blocked * 1000, offender["coroutine"] or offender["task"], "\n".join(stack)
+        )
+
+    def percentiles(self) -> Dict[str, float]:
+        """直近の遅延のパーセンタイル（秒）"""
+        with self._lock:
+            lags = sorted(self._lags)
+        if not lags:
+            return {str(q): 0.0 for q in QUANTILES}
+        return {str(q): lags[min(len(lags) - 1, int(q * len(lags)))] for q in QUANTILES}
+
+    def status(self) -> Dict:
+        with self._lock:
+            offenders: List[Dict] = list(self._offenders)
+            samples = len(self._lags)
+            max_lag = max(self._lags) if self._lags else 0.0
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "samples": samples,
+            "lag_ms": {q: round(v * 1000, 2) for q, v in self.percentiles().items()},
+            "max_lag_ms": round(max_lag * 1000, 2),
+            "offenders": offenders,
+        }
+
+
+# アプリケーション全体で共有するモニター
+loop_monitor = LoopLagMonitor()
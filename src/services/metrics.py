@@ -0,0 +1,97 @@
+import os
+import logging
+from typing import Tuple
+
+# prometheus_clientは環境変数の有無だけでマルチプロセスモードを判定するため、
+# 空の値（.env.exampleの空のキーなど）はインポート前に削除して未設定として扱う
+# （空のままだとカレントディレクトリに集計されない*.dbファイルが書き出される）
+for _name in ("PROMETHEUS_MULTIPROC_DIR", "prometheus_multiproc_dir"):
+    if os.environ.get(_name) == "":
+        del os.environ[_name]
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# gunicornの複数ワーカーで集計する場合の共有ディレクトリ
+# prometheus_clientの仕様により、この環境変数はプロセス起動時（インポート前）に設定しておく必要がある
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0, 30.0)
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PHASE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REQUEST_LATENCY = Histogram(
+    "eyesmile_http_request_duration_seconds",
+    "リクエストの処理時間",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_PHASE_LATENCY = Histogram(
+    "eyesmile_http_request_phase_duration_seconds",
+    "リクエスト内の処理区分（db/score/serialize/render）ごとの所要時間",
+    ["route", "phase"],
+    buckets=PHASE_BUCKETS,
+)
+REQUESTS_TOTAL = Counter(
+    "eyesmile_http_requests_total",
+    "ステータスコード別のリクエスト数",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "eyesmile_http_requests_in_flight",
+    "処理中のリクエスト数",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+CACHE_REQUESTS = Counter(
+    "eyesmile_cache_requests_total",
+    "キャッシュの参照結果（hit/miss）",
+    ["cache", "result"],
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "eyesmile_event_loop_lag_seconds",
+    "イベントループのスケジューリング遅延",
+    buckets=LOOP_LAG_BUCKETS,
+)
+EVENT_LOOP_LAG_QUANTILE = Gauge(
+    "eyesmile_event_loop_lag_quantile_seconds",
+    "直近のイベントループ遅延のパーセンタイル",
+    ["quantile"],
+    multiprocess_mode="max",
+)
+EVENT_LOOP_BLOCKED = Counter(
+    "eyesmile_event_loop_blocked_total",
+    "しきい値を超えてイベントループがブロックされた回数",
+)
+
+
+def record_cache(cache: str, hits: int = 0, misses: int = 0) -> None:
+    """キャッシュのヒット・ミス件数を記録する"""
+    if hits:
+        CACHE_REQUESTS.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(cache, "miss").inc(misses)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheusのテキスト形式でメトリクスを出力する（マルチプロセス時は全ワーカー分を集計）"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
@@ -0,0 +1,188 @@
+import os
+import bisect
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool, QueuePool
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# 計測の有効化（環境変数から取得）
+DB_POOL_METRICS = os.getenv("DB_POOL_METRICS", "true").lower() == "true"
+
+# 待ち時間・保持時間のバケット（秒）
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+HOLD_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 180.0)
+
+
+class Histogram:
+    """固定バケットの累積ヒストグラム"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # 末尾は+Inf
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            if value > self._max:
+                self._max = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total, max_value = self._sum, self._max
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative[str(bound)] = running
+        running += counts[-1]
+        cumulative["+Inf"] = running
+        return {
+            "count": running,
+            "sum": round(total, 6),
+            "max": round(max_value, 6),
+            "buckets": cumulative,
+        }
+
+
+class PoolMetrics:
+    """コネクションプールのイベントを集計する"""
+
+    COUNTERS = (
+        "connects", "checkouts", "checkins", "invalidations", "soft_invalidations",
+        "pre_ping_failures", "checkout_timeouts",
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {name: 0 for name in self.COUNTERS}
+        self.checkout_wait = Histogram(WAIT_BUCKETS)
+        self.connection_hold = Histogram(HOLD_BUCKETS)
+        self._pool: Optional[Pool] = None
+        self._checked_out = 0
+        self._max_checked_out = 0
+        self._max_overflow = 0
+
+    def increment(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def on_checkout(self) -> None:
+        with self._lock:
+            self._counters["checkouts"] += 1
+            self._checked_out += 1
+            if self._checked_out > self._max_checked_out:
+                self._max_checked_out = self._checked_out
+            if isinstance(self._pool, QueuePool):
+                overflow = max(self._pool.overflow(), 0)
+                if overflow > self._max_overflow:
+                    self._max_overflow = overflow
+
+    def on_checkin(self) -> None:
+        with self._lock:
+            self._counters["checkins"] += 1
+            self._checked_out = max(self._checked_out - 1, 0)
+
+    def reset(self) -> None:
+        """集計値を初期化する（ベンチマーク用）"""
+        with self._lock:
+            self._counters = {name: 0 for name in self.COUNTERS}
+            self._max_checked_out = self._checked_out
+            self._max_overflow = 0
+        self.checkout_wait = Histogram(WAIT_BUCKETS)
+        self.connection_hold = Histogram(HOLD_BUCKETS)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """現在のプール状態と集計値を返す"""
+        pool = self._pool
+        with self._lock:
+            result: Dict[str, Any] = dict(self._counters)
+            result["max_checked_out"] = self._max_checked_out
+            result["max_overflow_in_use"] = self._max_overflow
+
+        result["pool_class"] = type(pool).__name__ if pool is not None else None
+        if isinstance(pool, QueuePool):
+            result.update({
+                "pool_size": pool.size(),
+                "pool_timeout": pool.timeout(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow_in_use": max(pool.overflow(), 0),
+            })
+        else:
+            result["checked_out"] = self._checked_out
+        result["checkout_wait_seconds"] = self.checkout_wait.snapshot()
+        result["connection_hold_seconds"] = self.connection_hold.snapshot()
+        return result
+
+
+# プロセス内で共有する集計値
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """コネクション取得の待ち時間を計測するQueuePool
+
+    プールのイベントはコネクションを取得した後にしか発火しないため、
+    空きを待っている時間は取得処理そのものを計測する。
+    dispose()による再作成後も同じクラスが使われる。
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.increment("checkout_timeouts")
+            raise
+        finally:
+            pool_metrics.checkout_wait.observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """エンジンのプールにイベントフックを登録する"""
+    pool = engine.pool
+    pool_metrics._pool = pool
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        pool_metrics.increment("connects")
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        pool_metrics.on_checkout()
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            pool_metrics.connection_hold.observe(time.perf_counter() - checked_out_at)
+            pool_metrics.on_checkin()
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        pool_metrics.increment("invalidations")
+
+    @event.listens_for(pool, "soft_invalidate")
+    def _on_soft_invalidate(dbapi_connection, connection_record, exception):
+        pool_metrics.increment("soft_invalidations")
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        if context.is_pre_ping:
+            pool_metrics.increment("pre_ping_failures")
+            logger.warning(f"プールのpre-pingに失敗しました: {context.original_exception}")
+
+    logger.info(f"コネクションプールの計測を開始しました: {type(pool).__name__}")
@@ -0,0 +1,59 @@
+import os
+import resource
+from typing import Dict, List, Optional
+
+# /proc/<pid>/smaps_rollupの項目名 -> 返す値の名前
+SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+}
+
+
+def memory_usage(pid: Optional[int] = None) -> Dict[str, int]:
+    """プロセスのメモリ使用量（バイト）
+
+    Linuxでは/proc/<pid>/smaps_rollupからRSS・PSS（共有ページをプロセス数で按分した値）・共有・専有を返す。
+    フォーク後も共有されているページ（コピーオンライトで複製されていないページ）はsharedに計上される。
+    smaps_rollupがない環境では、自プロセスの最大RSSのみを返す。
+    """
+    pid = pid or os.getpid()
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as f:
+            lines = f.readlines()
+    except OSError:
+        if pid != os.getpid():
+            return {}
+        # ru_maxrssはLinuxではKB単位（macOSではバイト単位）
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss": maxrss if os.uname().sysname == "Darwin" else maxrss * 1024}
+
+    usage: Dict[str, int] = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        if name in SMAPS_FIELDS:
+            usage[SMAPS_FIELDS[name]] = int(value.split()[0]) * 1024
+    usage["shared"] = usage.get("shared_clean", 0) + usage.get("shared_dirty", 0)
+    usage["private"] = usage.get("private_clean", 0) + usage.get("private_dirty", 0)
+    return usage
+
+
+def child_pids(pid: int) -> List[int]:
+    """子プロセスのPID（gunicornのワーカーの列挙に使う）"""
+    children: List[int] = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children", encoding="ascii") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        return []
+    return sorted(children)
+
+
+def format_memory(usage: Dict[str, int]) -> str:
+    """ログ用の「RSS=…MB PSS=…MB 共有=…MB 専有=…MB」形式"""
+    labels = (("rss", "RSS"), ("pss", "PSS"), ("shared", "共有"), ("private", "専有"))
+    return " ".join(f"{label}={usage[key] / 1024 / 1024:.1f}MB" for key, label in labels if key in usage)
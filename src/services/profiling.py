@@ -0,0 +1,103 @@
+import os
+import re
+import time
+import uuid
+import pstats
+import cProfile
+import logging
+import threading
+import contextvars
+from pathlib import Path
+from typing import Callable, List, Optional
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# プロファイリング設定（環境変数から取得）
+# PROFILING_TOKENが未設定の場合は機能自体を無効にする（ミドルウェアも追加しない）
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILING_HEADER = os.getenv("PROFILING_HEADER", "X-Profile-Token")
+PROFILING_DIR = os.getenv("PROFILING_DIR", "profiles")
+# 保存しておくプロファイルの最大件数（古いものから削除）
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "50"))
+# プロファイルのIDを返すレスポンスヘッダー
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+_PROFILE_ID_PATTERN = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$")
+
+
+class RequestProfile:
+    """1リクエスト分のcProfileの計測結果をまとめる
+
+    イベントループ上の処理とスレッドプールで実行される同期エンドポイントは
+    別スレッドになるため、スレッドごとにProfileを作り、保存時に統合する。
+    """
+
+    def __init__(self):
+        self.profile_id = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:8]
+        self.loop_profiler = cProfile.Profile()
+        self._thread_profilers: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def run_sync(self, call: Callable, *args, **kwargs):
+        """同期関数を呼び出し元スレッドでプロファイルしながら実行する"""
+        profiler = cProfile.Profile()
+        with self._lock:
+            self._thread_profilers.append(profiler)
+        profiler.enable()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            profiler.disable()
+
+    def save(self, directory: str = PROFILING_DIR) -> Path:
+        """pstats形式（.prof）と上位関数の一覧（.txt）を保存する"""
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        stats = pstats.Stats(self.loop_profiler)
+        for profiler in self._thread_profilers:
+            stats.add(profiler)
+        prof_path = path / f"{self.profile_id}.prof"
+        stats.dump_stats(str(prof_path))
+        with open(path / f"{self.profile_id}.txt", "w", encoding="utf-8") as f:
+            stats.stream = f
+            stats.sort_stats("cumulative").print_stats(40)
+        _prune(path)
+        return prof_path
+
+
+def _prune(path: Path, max_files: int = PROFILING_MAX_FILES) -> None:
+    """保存件数の上限を超えた古いプロファイルを削除する"""
+    profiles = sorted(path.glob("*.prof"))
+    for old in profiles[:-max_files] if max_files > 0 else []:
+        for file in (old, old.with_suffix(".txt")):
+            try:
+                file.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def profile_path(profile_id: str, suffix: str = ".prof", directory: str = PROFILING_DIR) -> Optional[Path]:
+    """IDに対応する保存済みプロファイルのパスを返す（不正なIDや未保存の場合はNone）"""
+    if not _PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = Path(directory) / f"{profile_id}{suffix}"
+    return path if path.is_file() else None
+
+
+# 処理中のリクエストのプロファイル（プロファイル対象外のリクエストではNone）
+_current_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "request_profile", default=None
+)
+
+
+def start_profile() -> "contextvars.Token":
+    return _current_profile.set(RequestProfile())
+
+
+def end_profile(token: "contextvars.Token") -> None:
+    _current_profile.reset(token)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current_profile.get()
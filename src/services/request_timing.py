@@ -0,0 +1,174 @@
+import os
+import time
+import asyncio
+import functools
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .profiling import current_profile
+
+# Server-Timingヘッダーを付与する場合はtrue（内部の処理時間がクライアントに見えるため、既定では付与しない）
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+# 計測する処理区分
+PHASE_DB = "db"
+PHASE_FETCH = "fetch"
+PHASE_SCORE = "score"
+PHASE_REASON = "reason"
+PHASE_SERIALIZE = "serialize"
+# エンドポイント関数が戻ってからレスポンス開始まで（レスポンスモデルの検証とJSONへの変換）
+PHASE_RENDER = "render"
+# Server-Timingでのアプリ全体の処理時間（レスポンス開始まで）
+PHASE_TOTAL = "total"
+
+# Server-Timingのdesc（ブラウザの開発者ツールに表示される。ヘッダー値のためASCIIのみ）
+PHASE_DESCRIPTIONS = {
+    PHASE_DB: "SQL",
+    PHASE_FETCH: "Frame fetch",
+    PHASE_SCORE: "Scoring",
+    PHASE_REASON: "Reason and details",
+    PHASE_SERIALIZE: "Serialization",
+    PHASE_RENDER: "Response rendering",
+    PHASE_TOTAL: "App total",
+}
+
+
+class RequestTiming:
+    """1リクエスト内の処理区分ごとの所要時間（秒）を集計する"""
+
+    __slots__ = ("started", "phases", "endpoint_finished")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        # エンドポイント関数が戻った時刻（以降レスポンス開始までをレスポンスの生成時間とする）
+        self.endpoint_finished: Optional[float] = None
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+# 処理中のリクエストの計測値（スレッドプールで実行される同期エンドポイントにも引き継がれる）
+_current_timing: contextvars.ContextVar[Optional[RequestTiming]] = contextvars.ContextVar(
+    "request_timing", default=None
+)
+
+
+def start_request_timing() -> "contextvars.Token":
+    """リクエストの計測を開始する（ミドルウェアから呼ぶ）"""
+    return _current_timing.set(RequestTiming())
+
+
+def end_request_timing(token: "contextvars.Token") -> None:
+    _current_timing.reset(token)
+
+
+def current_timing() -> Optional[RequestTiming]:
+    return _current_timing.get()
+
+
+def record_phase(phase: str, seconds: float) -> None:
+    """処理中のリクエストに所要時間を加算する（リクエスト外では何もしない）"""
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.add(phase, seconds)
+
+
+@contextmanager
+def span(phase: str) -> Iterator[None]:
+    """with文の範囲の所要時間を処理中のリクエストに加算する
+
+    同じ区分を複数回使った場合は合算される。区分どうしは重なってもよい
+    （fetchはその中のdbを含む）。
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - started)
+
+
+def server_timing_header(timing: RequestTiming, now: Optional[float] = None) -> bytes:
+    """計測値をServer-Timingヘッダーの値（例: db;dur=1.2, score;dur=0.4）に変換する"""
+    if now is None:
+        now = time.perf_counter()
+    entries = list(timing.phases.items())
+    entries.append((PHASE_TOTAL, now - timing.started))
+    parts = []
+    for phase, seconds in entries:
+        description = PHASE_DESCRIPTIONS.get(phase)
+        if description:
+            parts.append(f'{phase};desc="{description}";dur={seconds * 1000:.2f}')
+        else:
+            parts.append(f"{phase};dur={seconds * 1000:.2f}")
+    return ", ".join(parts).encode("latin-1")
+
+
+def install_query_timing(engine: Engine) -> None:
+    """SQLの実行時間をリクエストのDB時間として集計するイベントを登録する"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        record_phase(PHASE_DB, time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        conn = context.connection
+        if conn is not None and conn.info.get("query_started"):
+            started = conn.info["query_started"].pop()
+            record_phase(PHASE_DB, time.perf_counter() - started)
+
+
+def _mark_endpoint_finished() -> None:
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.endpoint_finished = time.perf_counter()
+
+
+def _wrap_endpoint(call: Callable) -> Callable:
+    """エンドポイント関数が戻った時刻を記録するラッパー（同期/非同期の別は保つ）
+
+    同期関数はスレッドプールで実行されるため、プロファイル対象のリクエストでは
+    実行スレッド側でもプロファイラーを有効にする。
+    """
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def timed_call(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                _mark_endpoint_finished()
+    else:
+        @functools.wraps(call)
+        def timed_call(*args, **kwargs):
+            try:
+                profile = current_profile()
+                if profile is not None:
+                    return profile.run_sync(call, *args, **kwargs)
+                return call(*args, **kwargs)
+            finally:
+                _mark_endpoint_finished()
+    timed_call._timed_endpoint = True
+    return timed_call
+
+
+class TimedAPIRoute(APIRoute):
+    """エンドポイント関数の終了時刻を記録し、レスポンスの生成時間を計測できるようにするルート
+
+    APIRouter(route_class=TimedAPIRoute)で指定する。
+    """
+
+    def get_route_handler(self) -> Callable:
+        if not getattr(self.dependant.call, "_timed_endpoint", False):
+            self.dependant.call = _wrap_endpoint(self.dependant.call)
+        return super().get_route_handler()
@@ -0,0 +1,168 @@
+import os
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Dict, Optional, Tuple
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# サンプリングプロファイラーの設定（環境変数から取得）
+STACK_SAMPLER_ENABLED = os.getenv("STACK_SAMPLER_ENABLED", "false").lower() == "true"
+# サンプリング間隔（ミリ秒）
+STACK_SAMPLER_INTERVAL_MS = float(os.getenv("STACK_SAMPLER_INTERVAL_MS", "10"))
+# 1スタックあたりの最大フレーム数（深い部分は切り捨てる）
+STACK_SAMPLER_MAX_DEPTH = int(os.getenv("STACK_SAMPLER_MAX_DEPTH", "64"))
+# 集計するスタックの種類の上限（超えた分は1つにまとめる）
+STACK_SAMPLER_MAX_STACKS = int(os.getenv("STACK_SAMPLER_MAX_STACKS", "20000"))
+
+OVERFLOW_STACK = "[other]"
+
+# 待機中とみなす関数（スレッドの最上位フレームがこれらの場合はサンプルに含めない）
+IDLE_FUNCTIONS = frozenset([
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("handlers.py", "dequeue"),
+    ("socketserver.py", "serve_forever"),
+])
+
+StackKey = Tuple[str, Tuple[int, ...]]
+
+
+class StackSampler:
+    """sys._current_frames()を一定間隔で取得し、スタックごとの出現回数を集計する
+
+    集計のキーはコードオブジェクトのid()のタプルで、文字列への変換は出力時にのみ行う
+    （コードオブジェクトのハッシュはキャッシュされず計算コストが高いため）。
+    idの再利用を防ぐため、出現したコードオブジェクトへの参照は保持しておく。
+    出力はflamegraph.plやspeedscopeで読めるfolded形式（"a;b;c 件数"）。
+    サンプラー自身のCPU時間を計測し、オーバーヘッド（経過時間に対する割合）として公開する。
+    """
+
+    def __init__(
+        self,
+        interval: float = STACK_SAMPLER_INTERVAL_MS / 1000,
+        max_depth: int = STACK_SAMPLER_MAX_DEPTH,
+        max_stacks: int = STACK_SAMPLER_MAX_STACKS,
+        include_idle: bool = False,
+    ):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self.include_idle = include_idle
+        self._counts: Counter = Counter()
+        self._overflow = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._codes: Dict[int, CodeType] = {}
+        self._labels: Dict[int, str] = {}
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.sampler_cpu_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """サンプリングスレッドを開始する"""
+        if self.running:
+            return
+        self._stop.clear()
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        logger.info(f"スタックサンプラーを開始しました: 間隔={self.interval * 1000:.1f}ms")
+
+    def stop(self) -> None:
+        """サンプリングスレッドを停止する"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _is_idle(self, frame: FrameType) -> bool:
+        code = frame.f_code
+        return (os.path.basename(code.co_filename), code.co_name) in IDLE_FUNCTIONS
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        codes_by_id = self._codes
+        while not self._stop.wait(self.interval):
+            cpu_started = time.thread_time()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (not self.include_idle and self._is_idle(frame)):
+                    continue
+                code_ids = []
+                depth = 0
+                while frame is not None and depth < self.max_depth:
+                    code = frame.f_code
+                    code_id = id(code)
+                    if code_id not in codes_by_id:
+                        codes_by_id[code_id] = code
+                    code_ids.append(code_id)
+                    frame = frame.f_back
+                    depth += 1
+                code_ids.reverse()
+                self._record((names.get(thread_id, str(thread_id)), tuple(code_ids)))
+            frame = None
+            self.samples += 1
+            self.sampler_cpu_seconds += time.thread_time() - cpu_started
+
+    def _record(self, key: StackKey) -> None:
+        with self._lock:
+            if key in self._counts or len(self._counts) < self.max_stacks:
+                self._counts[key] += 1
+            else:
+                self._overflow += 1
+
+    def _label(self, code_id: int) -> str:
+        label = self._labels.get(code_id)
+        if label is None:
+            code = self._codes[code_id]
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            # folded形式の区切り文字（;と空白）は置き換える
+            label = f"{module}:{code.co_name}:{code.co_firstlineno}".replace(";", ":").replace(" ", "_")
+            self._labels[code_id] = label
+        return label
+
+    def folded(self, reset: bool = False) -> str:
+        """集計結果をfolded形式の文字列で返す"""
+        with self._lock:
+            counts = self._counts
+            overflow = self._overflow
+            if reset:
+                self._counts = Counter()
+                self._overflow = 0
+        lines = []
+        for (thread_name, code_ids), count in counts.most_common():
+            frames = [thread_name.replace(";", ":").replace(" ", "_")] + [self._label(code_id) for code_id in code_ids]
+            lines.append(f"{';'.join(frames)} {count}")
+        if overflow:
+            lines.append(f"{OVERFLOW_STACK} {overflow}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def status(self) -> Dict:
+        """サンプラーの状態とオーバーヘッド"""
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        with self._lock:
+            distinct = len(self._counts)
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "distinct_stacks": distinct,
+            "sampler_cpu_seconds": round(self.sampler_cpu_seconds, 4),
+            "overhead_ratio": round(self.sampler_cpu_seconds / elapsed, 5) if elapsed else 0.0,
+        }
+
+
+# アプリケーション全体で共有するサンプラー
+stack_sampler = StackSampler()
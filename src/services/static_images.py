@@ -0,0 +1,55 @@
+import os
+import re
+import logging
+from typing import List, Optional, Tuple
+
+from .image_derivatives import image_cache
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# フレーム画像のURLの接頭辞（IMAGE_SOURCE_DIR以下のファイルに対応する）
+IMAGE_URL_PREFIX = os.getenv("IMAGE_URL_PREFIX", "/images").rstrip("/")
+
+# URLに埋め込む内容のハッシュの桁数
+FINGERPRINT_LENGTH = 12
+# フィンガープリント付きのURLは内容が変わらないため、1年間再検証せずに使わせる
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# フィンガープリントのないURLは毎回ETagで再検証させる
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+_FINGERPRINT_PATTERN = re.compile(
+    rf"^(?P<stem>.+)\.(?P<fingerprint>[0-9a-f]{{{FINGERPRINT_LENGTH}}})(?P<ext>\.[A-Za-z0-9]+)$"
+)
+
+
+def split_fingerprint(path: str) -> Tuple[str, Optional[str]]:
+    """「name.<ハッシュ>.jpg」を（name.jpg, ハッシュ）に分ける（フィンガープリントがなければ (path, None)）"""
+    match = _FINGERPRINT_PATTERN.match(path)
+    if match is None:
+        return path, None
+    return f"{match.group('stem')}{match.group('ext')}", match.group("fingerprint")
+
+
+def add_fingerprint(path: str, digest: str) -> str:
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+
+def fingerprint_url(url: str) -> str:
+    """IMAGE_URL_PREFIX以下の画像URLを、現在のファイル内容のハッシュを含むURLに変換する
+
+    すでにフィンガープリントが付いている場合は付け直す。外部のURLや、ファイルが見つからない場合はそのまま返す。
+    """
+    if not url.startswith(IMAGE_URL_PREFIX + "/"):
+        return url
+    relative, _ = split_fingerprint(url[len(IMAGE_URL_PREFIX) + 1:])
+    source = image_cache.resolve_source(relative)
+    if source is None:
+        logger.warning(f"画像ファイルが見つからないため、フィンガープリントを付けません: {url}")
+        return url
+    return f"{IMAGE_URL_PREFIX}/{add_fingerprint(relative, image_cache.source_digest(source))}"
+
+
+def fingerprint_urls(urls: List[str]) -> List[str]:
+    return [fingerprint_url(url) for url in urls]
@@ -0,0 +1,398 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import event
+
+from ..models import Frame
+from .embedding_backends import EmbeddingBackend, get_embedding_backends
+from .metrics import record_cache
+
+# ロガーの設定
+logger = logging.getLogger(__name__)
+
+# インデックス設定（環境変数から取得）
+# flat: 全件の行列積 / ivf: パーティション分割 / auto: 件数に応じて自動切替
+VECTOR_INDEX_MODE = os.getenv("VECTOR_INDEX_MODE", "auto").lower()
+VECTOR_INDEX_IVF_THRESHOLD = int(os.getenv("VECTOR_INDEX_IVF_THRESHOLD", "20000"))
+VECTOR_INDEX_IVF_LISTS = int(os.getenv("VECTOR_INDEX_IVF_LISTS", "0"))  # 0の場合はsqrt(件数)
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "8"))
+# スタイルのクエリ文のエンベディングを保持する件数（0の場合はキャッシュしない）
+VECTOR_QUERY_CACHE_SIZE = int(os.getenv("VECTOR_QUERY_CACHE_SIZE", "1024"))
+
+# k-meansの反復回数と乱数シード
+_KMEANS_ITERATIONS = 10
+_KMEANS_SEED = 42
+
+
+def build_frame_description(frame: Any) -> str:
+    """フレームの属性からエンベディング用の説明文を生成する"""
+    parts = [
+        f"{frame.brand or ''} {frame.name or ''}".strip(),
+        f"{frame.style}スタイル" if frame.style else "",
+        f"{frame.shape}シェイプ" if frame.shape else "",
+        f"{frame.material}素材" if frame.material else "",
+        f"{frame.color}カラー" if frame.color else "",
+    ]
+    if frame.style_tags:
+        parts.append("タグ: " + "、".join(str(tag) for tag in frame.style_tags))
+    return "。".join(part for part in parts if part)
+
+
+def build_style_query(style_preference: Any) -> Optional[str]:
+    """スタイル好みから意味検索用のクエリ文を生成する"""
+    if not style_preference:
+        return None
+    if getattr(style_preference, "style_description", None):
+        return style_preference.style_description
+    if style_preference.preferred_styles:
+        return "、".join(style_preference.preferred_styles)
+    return None
+
+
+def _normalize_rows(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """行ベクトルをL2正規化し、ノルムが0でない行のマスクと共に返す"""
+    norms = np.linalg.norm(vectors, axis=1)
+    valid = norms > 0
+    normalized = np.zeros_like(vectors)
+    normalized[valid] = vectors[valid] / norms[valid, None]
+    return normalized, valid
+
+
+class FrameVectorIndex:
+    """フレーム説明文エンベディングのコサイン類似度インデックス
+
+    正規化済みベクトルを連続したfloat32行列に保持し、行列積による全件探索で
+    top-kを求める。件数が多い場合はk-meansで分割したIVF方式で探索対象を絞る。
+    """
+
+    def __init__(
+        self,
+        mode: str = VECTOR_INDEX_MODE,
+        ivf_threshold: int = VECTOR_INDEX_IVF_THRESHOLD,
+        n_lists: int = VECTOR_INDEX_IVF_LISTS,
+        n_probe: int = VECTOR_INDEX_NPROBE,
+    ):
+        self.mode = mode
+        self.ivf_threshold = ivf_threshold
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+
+        self._lock = threading.RLock()
+        self._dim: Optional[int] = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._size = 0
+        self._row_of: Dict[int, int] = {}
+        self._digests: Dict[int, str] = {}
+
+        # IVF用の状態
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self._dim
+
+    def _use_ivf(self) -> bool:
+        """IVF方式で探索するかどうかを判定"""
+        if self.mode == "ivf":
+            return self._size > 0
+        if self.mode == "auto":
+            return self._size >= self.ivf_threshold
+        return False
+
+    def _ensure_capacity(self, required: int) -> None:
+        """行列の容量を確保する（倍々で拡張し、再確保の回数を抑える）"""
+        capacity = self._matrix.shape[0]
+        if required <= capacity:
+            return
+        new_capacity = max(required, capacity * 2, 64)
+        matrix = np.zeros((new_capacity, self._dim), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        ids = np.zeros(new_capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        assignments = np.zeros(new_capacity, dtype=np.int32)
+        assignments[:self._size] = self._assignments[:self._size]
+        self._matrix, self._ids, self._assignments = matrix, ids, assignments
+
+    def upsert(
+        self,
+        frame_ids: Sequence[int],
+        vectors: Any,
+        digests: Optional[Sequence[str]] = None,
+    ) -> int:
+        """ベクトルを追加または更新する（ノルム0のベクトルは登録しない）"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(frame_ids) != vectors.shape[0]:
+            raise ValueError("frame_idsとvectorsの件数が一致しません")
+        if len(frame_ids) == 0:
+            return 0
+
+        normalized, valid = _normalize_rows(vectors)
+        # すべてノルム0の場合（エンベディング取得失敗時のダミーなど）は、次元を確定・検証しない
+        if not valid.any():
+            return 0
+
+        with self._lock:
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+                self._matrix = np.zeros((0, self._dim), dtype=np.float32)
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"ベクトルの次元が一致しません: {vectors.shape[1]} != {self._dim}")
+
+            self._ensure_capacity(self._size + int(valid.sum()))
+
+            added = 0
+            for i, frame_id in enumerate(frame_ids):
+                frame_id = int(frame_id)
+                if not valid[i]:
+                    continue
+                row = self._row_of.get(frame_id)
+                if row is None:
+                    row = self._size
+                    self._row_of[frame_id] = row
+                    self._ids[row] = frame_id
+                    self._size += 1
+                self._matrix[row] = normalized[i]
+                if self._centroids is not None:
+                    self._assignments[row] = int(np.argmax(self._centroids @ normalized[i]))
+                if digests is not None:
+                    self._digests[frame_id] = digests[i]
+                added += 1
+
+            self._maybe_train()
+            return added
+
+    def remove(self, frame_ids: Iterable[int]) -> int:
+        """ベクトルを削除する（末尾の行と入れ替えて行列の連続性を保つ）"""
+        removed = 0
+        with self._lock:
+            for frame_id in frame_ids:
+                frame_id = int(frame_id)
+                self._digests.pop(frame_id, None)
+                row = self._row_of.pop(frame_id, None)
+                if row is None:
+                    continue
+                last = self._size - 1
+                if row != last:
+                    moved_id = int(self._ids[last])
+                    self._matrix[row] = self._matrix[last]
+                    self._ids[row] = moved_id
+                    self._assignments[row] = self._assignments[last]
+                    self._row_of[moved_id] = row
+                self._size -= 1
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        """インデックスを空にする"""
+        with self._lock:
+            self._dim = None
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+            self._ids = np.zeros(0, dtype=np.int64)
+            self._assignments = np.zeros(0, dtype=np.int32)
+            self._size = 0
+            self._row_of.clear()
+            self._digests.clear()
+            self._centroids = None
+            self._trained_size = 0
+
+    def _maybe_train(self) -> None:
+        """IVFのセントロイドを必要に応じて（再）学習する"""
+        if not self._use_ivf():
+            return
+        # 前回の学習時から件数が倍増した場合のみ再学習
+        if self._centroids is not None and self._size < self._trained_size * 2:
+            return
+        self._train_centroids()
+
+    def _train_centroids(self) -> None:
+        """球面k-meansでセントロイドを学習し、各行のリストを割り当てる"""
+        data = self._matrix[:self._size]
+        n_lists = self.n_lists or int(np.sqrt(self._size))
+        n_lists = max(1, min(n_lists, self._size))
+
+        rng = np.random.default_rng(_KMEANS_SEED)
+        centroids = data[rng.choice(self._size, n_lists, replace=False)].copy()
+        for _ in range(_KMEANS_ITERATIONS):
+            assignments = np.argmax(data @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = data[assignments == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    norm = np.linalg.norm(centroid)
+                    if norm > 0:
+                        centroids[c] = centroid / norm
+
+        self._centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self._assignments[:self._size] = np.argmax(data @ self._centroids.T, axis=1)
+        self._trained_size = self._size
+        logger.info(f"ベクトルインデックスのIVFを学習しました: 件数={self._size}, リスト数={n_lists}")
+
+    def _prepare_query(self, query: Any) -> Optional[np.ndarray]:
+        """クエリベクトルを正規化する（無効な場合はNone）"""
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        if self._dim is None or query.shape[0] != self._dim:
+            return None
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return None
+        return query / norm
+
+    def search(self, query: Any, k: int = 10) -> List[Tuple[int, float]]:
+        """クエリとのコサイン類似度が高い順にtop-kの(frame_id, 類似度)を返す"""
+        with self._lock:
+            q = self._prepare_query(query)
+            if q is None or self._size == 0 or k <= 0:
+                return []
+
+            if self._use_ivf() and self._centroids is not None:
+                n_probe = min(self.n_probe, len(self._centroids))
+                probes = np.argpartition(-(self._centroids @ q), n_probe - 1)[:n_probe]
+                rows = np.flatnonzero(np.isin(self._assignments[:self._size], probes))
+                scores = self._matrix[rows] @ q
+            else:
+                rows = None
+                scores = self._matrix[:self._size] @ q
+
+            k = min(k, len(scores))
+            if k == 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            ids = self._ids[rows[top]] if rows is not None else self._ids[top]
+            return [(int(frame_id), float(scores[i])) for frame_id, i in zip(ids, top)]
+
+    def similarities(self, query: Any, frame_ids: Iterable[int]) -> Dict[int, float]:
+        """指定したフレームとクエリとのコサイン類似度を返す（未登録のフレームは含めない）"""
+        with self._lock:
+            q = self._prepare_query(query)
+            if q is None:
+                return {}
+            pairs = [(int(fid), self._row_of[int(fid)]) for fid in frame_ids if int(fid) in self._row_of]
+            if not pairs:
+                return {}
+            rows = np.fromiter((row for _, row in pairs), dtype=np.int64, count=len(pairs))
+            scores = self._matrix[rows] @ q
+            return {fid: float(score) for (fid, _), score in zip(pairs, scores)}
+
+    def sync_frames(
+        self,
+        frames: Sequence[Any],
+        embed_texts: Callable[[List[str]], Any],
+    ) -> int:
+        """未登録・説明文が変わったフレームのみをエンベディングして反映する"""
+        stale_ids, stale_texts, stale_digests = [], [], []
+        hits = 0
+        for frame in frames:
+            if frame.id is None:
+                continue
+            text = build_frame_description(frame)
+            digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+            if self._digests.get(frame.id) == digest and frame.id in self._row_of:
+                hits += 1
+                continue
+            stale_ids.append(frame.id)
+            stale_texts.append(text)
+            stale_digests.append(digest)
+
+        record_cache("frame_embeddings", hits=hits, misses=len(stale_ids))
+        if not stale_ids:
+            return 0
+
+        vectors = embed_texts(stale_texts)
+        added = self.upsert(stale_ids, vectors, stale_digests)
+        logger.info(f"ベクトルインデックスを更新しました: 対象={len(stale_ids)}, 登録={added}, 総数={len(self)}")
+        return added
+
+
+# バックエンドごとに共有するインデックス（ベクトル空間が異なるため分けて保持）
+_frame_vector_indexes: Dict[str, FrameVectorIndex] = {}
+_frame_vector_indexes_lock = threading.Lock()
+
+
+def get_frame_vector_index(backend_name: str = "default") -> FrameVectorIndex:
+    """バックエンド名に対応する共有のフレームベクトルインデックスを取得する"""
+    with _frame_vector_indexes_lock:
+        index = _frame_vector_indexes.get(backend_name)
+        if index is None:
+            index = FrameVectorIndex()
+            _frame_vector_indexes[backend_name] = index
+        return index
+
+
+# スタイルのクエリ文のエンベディング（(バックエンド名, クエリ文)ごと、LRU）
+_query_vectors: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+_query_vectors_lock = threading.Lock()
+
+
+def embed_query(backend: EmbeddingBackend, query_text: str) -> np.ndarray:
+    """クエリ文のエンベディングを取得する（スタイルの組み合わせは限られるため、キャッシュして再利用する）"""
+    key = (backend.name, query_text)
+    with _query_vectors_lock:
+        vector = _query_vectors.get(key)
+        if vector is not None:
+            _query_vectors.move_to_end(key)
+    record_cache("query_embeddings", hits=int(vector is not None), misses=int(vector is None))
+    if vector is not None:
+        return vector
+
+    vector = np.asarray(backend.embed([query_text])[0], dtype=np.float32)
+    vector.setflags(write=False)
+    # ノルム0のベクトル（取得失敗時のダミーなど）はキャッシュしない
+    if VECTOR_QUERY_CACHE_SIZE > 0 and np.any(vector):
+        with _query_vectors_lock:
+            _query_vectors[key] = vector
+            _query_vectors.move_to_end(key)
+            while len(_query_vectors) > VECTOR_QUERY_CACHE_SIZE:
+                _query_vectors.popitem(last=False)
+    return vector
+
+
+def semantic_similarities(
+    frames: Sequence[Any],
+    query_text: Optional[str],
+    backends: Optional[Sequence[EmbeddingBackend]] = None,
+) -> Dict[int, float]:
+    """スタイルの説明文と各フレームとの意味的な類似度（0〜1）を返す
+
+    主バックエンドが失敗した場合は次のバックエンドとそのインデックスで計算し直す。
+    """
+    if not query_text or not frames:
+        return {}
+
+    for backend in backends or get_embedding_backends():
+        index = get_frame_vector_index(backend.name)
+        try:
+            index.sync_frames(frames, backend.embed)
+            query_vector = embed_query(backend, query_text)
+            similarities = index.similarities(query_vector, [frame.id for frame in frames])
+        except Exception as e:
+            logger.error(f"意味的類似度の計算エラー({backend.name}): {str(e)}")
+            continue
+
+        # 負の類似度は0として扱う
+        return {frame_id: max(0.0, score) for frame_id, score in similarities.items()}
+
+    return {}
+
+
+# カタログ変更時にインデックスから外し、次回の同期で再エンベディングする
+@event.listens_for(Frame, "after_update")
+@event.listens_for(Frame, "after_delete")
+def _invalidate_frame_vector(mapper, connection, target) -> None:
+    if target.id is None:
+        return
+    with _frame_vector_indexes_lock:
+        indexes = list(_frame_vector_indexes.values())
+    for index in indexes:
+        index.remove([target.id])
@@ -0,0 +1,178 @@
+import os
+import sys
+import atexit
+import queue
+import random
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+# ログ設定（環境変数から取得）
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# ロガー名ごとのサンプリング率（例: "src.routers.frame=0.1,sqlalchemy.engine=0.01"）
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+# リクエスト内容（ペイロード）をINFOで記録する割合（0の場合はDEBUG時のみ）
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0"))
+# 非同期ログを無効にする場合はfalse
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() == "true"
+
+
+def parse_sampling_rates(value: str) -> Dict[str, float]:
+    """「ロガー名=割合」のカンマ区切り設定を辞書に変換する"""
+    rates = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        name, rate = item.split("=", 1)
+        try:
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """ロガー名ごとのサンプリング率でWARNING未満のレコードを間引くフィルター
+
+    設定は親ロガー名にも適用される（"src.routers"は"src.routers.frame"にも効く）。
+    ロガー名ごとの判定結果はキャッシュする。
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._cache: Dict[str, float] = {}
+
+    def rate_for(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            candidate = name
+            while candidate:
+                if candidate in self.rates:
+                    rate = self.rates[candidate]
+                    break
+                candidate = candidate.rpartition(".")[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+# リスナースレッドで整形しても値が変わらない（イミュータブルな）引数の型
+_IMMUTABLE_ARG_TYPES = (str, int, float, bool, bytes, type(None))
+
+
+def _has_mutable_args(record: logging.LogRecord) -> bool:
+    """メッセージか引数に、後から変更されうるオブジェクトが含まれるかどうか"""
+    if not isinstance(record.msg, str):
+        return True
+    args = record.args
+    if not args:
+        return False
+    values = args.values() if isinstance(args, dict) else args
+    return not all(isinstance(value, _IMMUTABLE_ARG_TYPES) for value in values)
+
+
+class LazyQueueHandler(QueueHandler):
+    """レコードをなるべくフォーマットせずにキューへ渡すQueueHandler
+
+    標準のQueueHandlerは呼び出し元スレッドでメッセージを整形するが、
+    ここでは引数が文字列・数値などのイミュータブルな値のみの場合は引数のままキューに積み、
+    整形と出力はリスナースレッドで行う。ORMのインスタンスやリクエストのオブジェクトなど
+    それ以外の引数は、別スレッドでの遅延読み込みや値の変更を避けるため呼び出し元で整形する。
+    例外情報も、呼び出し元のスタックが有効なうちに文字列化しておく。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if _has_mutable_args(record):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def setup_logging(level: str = LOG_LEVEL) -> None:
+    """ルートロガーを設定する（ログの出力はバックグラウンドスレッドで行う）"""
+    global _listener
+    with _setup_lock:
+        root = logging.getLogger()
+        root.setLevel(logging.getLevelName(level))
+        if _listener is not None:
+            return
+
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+        if not LOG_ASYNC:
+            handler: logging.Handler = stream_handler
+        else:
+            log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+            handler = LazyQueueHandler(log_queue)
+            _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+            _listener.start()
+            atexit.register(stop_logging)
+
+        rates = parse_sampling_rates(LOG_SAMPLING)
+        if rates:
+            handler.addFilter(SamplingFilter(rates))
+
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+
+
+def stop_logging() -> None:
+    """キューに残ったログを出力してリスナーを停止する"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _restart_listener_after_fork() -> None:
+    """フォークした子プロセスでリスナーを起動し直す（スレッドはフォークで複製されないため）
+
+    gunicornのpreload時は、マスタープロセスで設定したロガーをワーカーがそのまま引き継ぐ。
+    """
+    global _listener, _setup_lock
+    _setup_lock = threading.Lock()
+    if _listener is None:
+        return
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, LazyQueueHandler):
+            handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def payload_logging_enabled(logger: logging.Logger) -> bool:
+    """リクエスト内容を記録するかどうか（DEBUG有効時、またはサンプリングに当たった場合）"""
+    if logger.isEnabledFor(logging.DEBUG):
+        return True
+    return LOG_PAYLOAD_SAMPLE_RATE > 0.0 and random.random() < LOG_PAYLOAD_SAMPLE_RATE
+
+
+def log_payload(logger: logging.Logger, message: str, payload: Any) -> None:
+    """リクエスト内容をDEBUGまたはサンプリング時のみ記録する（整形はリスナー側で行う）"""
+    if payload_logging_enabled(logger):
+        level = logging.DEBUG if logger.isEnabledFor(logging.DEBUG) else logging.INFO
+        logger.log(level, message, payload)
@@ -31,5 +31,5 @@ ls -la static/images/
 
 # サーバーの起動
 echo "アプリケーションを起動します..."
-gunicorn src.main:app -k uvicorn.workers.UvicornWorker -b 0.0.0.0:8000 --timeout 180
+gunicorn -c gunicorn.conf.py
 
@@ -0,0 +1,140 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.schema import CreateTable
+
+from src import models, schemas
+from src.crud import recommendation as crud_recommendation
+from src.services.catalog_scoring import CatalogScorer, build_query, score_range, top_k
+from src.services.catalog_snapshot import CatalogSnapshot, export_snapshot
+
+ROWS = 600
+SHAPES = ["ラウンド", "スクエア", "ウェリントン", "オーバル"]
+STYLES = ["クラシック", "モダン", "ミニマル", "カジュアル"]
+
+
+def _frame_rows():
+    """同点が多くなるよう、少数の値の組み合わせからフレームを作る"""
+    rng = np.random.default_rng(0)
+    rows = []
+    for i in range(1, ROWS + 1):
+        has_range = rng.random() > 0.1
+        rows.append({
+            "id": i,
+            "name": f"フレーム{i}",
+            "brand": "ブランド",
+            "price": 10000,
+            "style": STYLES[i % len(STYLES)],
+            "shape": SHAPES[rng.integers(len(SHAPES))],
+            "material": ["チタン", "アセテート"][rng.integers(2)],
+            "color": ["ブラック", "ブラウン", None][rng.integers(3)],
+            "recommended_face_width_min": float(rng.choice([125, 130, 135])) if has_range else None,
+            "recommended_face_width_max": float(rng.choice([140, 145])) if has_range else None,
+            "recommended_nose_height_min": float(rng.choice([15, 17])) if has_range else None,
+            "recommended_nose_height_max": float(rng.choice([20, 22])) if has_range else None,
+            "personal_color_season": ["春", "夏", "秋", "冬"][rng.integers(4)],
+            "face_shape_types": [],
+            "style_tags": list(rng.choice(STYLES, size=rng.integers(0, 3), replace=False)),
+        })
+    return rows
+
+
+@pytest.fixture(scope="module")
+def snapshot(tmp_path_factory):
+    """SQLiteのframesテーブルから書き出したカタログスナップショット"""
+    directory = tmp_path_factory.mktemp("catalog")
+    engine = create_engine(f"sqlite:///{directory / 'catalog.db'}")
+    with engine.begin() as conn:
+        # framesテーブルはモデルが2つあり索引の定義が重複するため、テーブルのみ作成する
+        conn.execute(CreateTable(models.Frame.__table__))
+        conn.execute(insert(models.Frame.__table__), _frame_rows())
+    manifest = export_snapshot(engine, str(directory / "snapshots"))
+    engine.dispose()
+    return CatalogSnapshot(str(directory / "snapshots" / manifest["catalog_version"]))
+
+
+@pytest.fixture(scope="module")
+def request_data():
+    face_data = schemas.FaceMeasurement(
+        id=1, user_id=1, created_at=datetime.now(),
+        face_width=138.0, eye_distance=63.0, cheek_area=45.0, nose_height=18.0, temple_position=82.0,
+    )
+    style_pref = schemas.StylePreference(
+        personal_color="秋",
+        preferred_styles=["クラシック", "ミニマル"],
+        preferred_materials=["チタン"],
+        preferred_colors=["ブラック"],
+    )
+    return face_data, crud_recommendation.analyze_face_shape(face_data), style_pref
+
+
+@pytest.fixture(scope="module")
+def query(snapshot, request_data):
+    face_data, face_shape, style_pref = request_data
+    shapes = crud_recommendation.OPTIMAL_FRAME_SHAPES.get(face_shape, ["すべて"])
+    return build_query(
+        snapshot, face_data.face_width, face_data.nose_height,
+        None if "すべて" in shapes else shapes,
+        style_pref.personal_color, style_pref.preferred_styles,
+        style_pref.preferred_materials, style_pref.preferred_colors,
+    )
+
+
+def test_top_k_breaks_ties_by_row():
+    """同点のスコアは行番号の小さい順に選び、並べる"""
+    scores = np.array([1.0, 3.0, 3.0, 2.0, 3.0, 2.0])
+    rows, top_scores = top_k(scores, 2)
+    assert rows.tolist() == [1, 2]
+    assert top_scores.tolist() == [3.0, 3.0]
+    assert top_k(scores, 4)[0].tolist() == [1, 2, 4, 3]
+    assert top_k(scores, 10)[0].tolist() == [1, 2, 4, 3, 5, 0]
+    assert top_k(scores, 0)[0].tolist() == []
+
+
+@pytest.mark.parametrize("k", [1, 10, 57, ROWS + 10])
+def test_sharded_top_k_matches_single_process(snapshot, query, k):
+    """シャードに分けた上位k件は、同点を含めて1プロセスでの計算と一致する"""
+    scores = score_range(snapshot, query, 0, len(snapshot))
+    assert len(np.unique(scores)) < len(scores) // 4  # 同点が多いデータであること
+
+    expected_rows, expected_scores = CatalogScorer(workers=0).top_k(snapshot, query, k)
+    scorer = CatalogScorer(workers=3, min_shard_rows=100)
+    try:
+        assert scorer.shard_count(len(snapshot)) == 3
+        rows, top_scores = scorer.top_k(snapshot, query, k)
+    finally:
+        scorer.shutdown()
+    assert rows.tolist() == expected_rows.tolist()
+    assert top_scores.tolist() == expected_scores.tolist()
+
+
+def test_shard_count_respects_min_shard_rows():
+    """シャードあたりの件数が最小件数に満たない場合はシャード数を減らす"""
+    scorer = CatalogScorer(workers=4, min_shard_rows=200)
+    assert scorer.shard_count(600) == 3
+    assert scorer.shard_count(199) == 1
+    assert CatalogScorer(workers=0).shard_count(10 ** 6) == 1
+
+
+def test_scores_match_crud_rank_frames(snapshot, query, request_data):
+    """ベクトル化したスコアがcrud.recommendation.rank_framesのスコアと一致する"""
+    face_data, face_shape, style_pref = request_data
+    scores = score_range(snapshot, query, 0, len(snapshot))
+    rows = np.arange(0, len(snapshot), 7)
+    frames = [models.Frame(**snapshot.frame(int(row))) for row in rows]
+    style_category = crud_recommendation.determine_style_category(face_shape, style_pref)
+    ranked = crud_recommendation.rank_frames(face_data, face_shape, style_category, frames, style_pref)
+    expected = {item["frame"].id: item["total_score"] for item in ranked}
+    for row in rows:
+        assert scores[row] == pytest.approx(expected[int(snapshot.ids[row])], abs=1e-3)
+
+
+def test_build_query_ignores_unknown_values(snapshot):
+    """辞書にない値は一致しない条件として扱う"""
+    query = build_query(snapshot, 138.0, 18.0, ["存在しない形状"], "不明", ["存在しないタグ"], ["不明"], ["不明"])
+    assert query["shape_codes"] == []
+    assert query["personal_color_code"] == -2
+    assert query["style_tag_positions"] == []
+    assert query["material_codes"] == [] and query["color_codes"] == []
@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from src.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    """テスト用の手動で進める時計"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_breaker(clock, **kwargs):
+    options = {"failure_threshold": 3, "recovery_timeout": 10.0, "half_open_max_calls": 1}
+    options.update(kwargs)
+    return CircuitBreaker("test", clock=clock, **options)
+
+
+async def succeed():
+    return "ok"
+
+
+async def fail():
+    raise RuntimeError("失敗")
+
+
+def test_opens_after_consecutive_failures():
+    """連続失敗がしきい値に達するとopenになり、呼び出しを拒否する"""
+    breaker = make_breaker(FakeClock())
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow_request() is False
+    assert breaker.snapshot()["total_rejected"] == 1
+
+
+def test_success_resets_consecutive_failures():
+    """成功すると連続失敗の回数がリセットされる"""
+    breaker = make_breaker(FakeClock())
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_after_recovery_timeout_limits_trial_calls():
+    """復旧待ち時間の経過後はhalf_openになり、試行枠の数だけ呼び出しを許可する"""
+    clock = FakeClock()
+    breaker = make_breaker(clock, half_open_max_calls=2)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now = 9.9
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 10.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False
+
+
+def test_half_open_success_closes():
+    """half_openで試行が成功するとclosedに戻る"""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now = 10.0
+    assert asyncio.run(breaker.call(succeed)) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()["consecutive_failures"] == 0
+
+
+def test_half_open_failure_reopens():
+    """half_openで試行が失敗すると、しきい値によらず再びopenになる"""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now = 10.0
+    with pytest.raises(RuntimeError):
+        asyncio.run(breaker.call(fail))
+    assert breaker.state == CircuitBreaker.OPEN
+    # 復旧待ち時間は再びopenになった時刻から数える
+    clock.now = 19.9
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 20.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_call_rejects_while_open():
+    """open中のcallは関数を呼ばずにCircuitOpenErrorを送出する"""
+    breaker = make_breaker(FakeClock(), failure_threshold=1)
+    calls = []
+
+    async def record():
+        calls.append(1)
+
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(breaker.call(record))
+    assert calls == []
+
+
+def test_latency_budget_counts_as_timeout_failure():
+    """レイテンシ予算を超えた呼び出しはタイムアウトの失敗として記録する"""
+    breaker = make_breaker(FakeClock(), failure_threshold=1, latency_budget=0.01)
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(breaker.call(slow))
+    snapshot = breaker.snapshot()
+    assert snapshot["state"] == CircuitBreaker.OPEN
+    assert snapshot["total_timeouts"] == 1
+
+
+def test_cancelled_half_open_call_releases_trial_slot():
+    """half_openの試行がキャンセルされた場合は、結果を記録せずに試行枠を返す"""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now = 10.0
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(breaker.call(asyncio.sleep, 1))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() is True
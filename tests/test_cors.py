@@ -0,0 +1,88 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.middleware.cors import CORSMiddleware, parse_origins
+
+ALLOWED = "https://app.example.com"
+OTHER = "https://evil.example.com"
+
+
+def make_client(origins):
+    app = FastAPI()
+
+    @app.get("/items")
+    def items():
+        return {"items": []}
+
+    @app.get("/boom")
+    def boom():
+        raise RuntimeError("失敗")
+
+    app.add_middleware(CORSMiddleware, allow_origins=origins, max_age="600")
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_parse_origins_ignores_blanks():
+    """カンマ区切りのオリジン設定から空の要素を除く"""
+    assert parse_origins(f" {ALLOWED}, ,http://localhost:3000,") == [ALLOWED, "http://localhost:3000"]
+
+
+def test_preflight_from_allowed_origin():
+    """許可されたオリジンのプリフライトは、ルーターに渡さずCORSヘッダー付きで応答する"""
+    client = make_client([ALLOWED])
+    response = client.options("/items", headers={"Origin": ALLOWED, "Access-Control-Request-Method": "POST"})
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == ALLOWED
+    assert response.headers["access-control-allow-credentials"] == "true"
+    assert "POST" in response.headers["access-control-allow-methods"]
+    assert "Authorization" in response.headers["access-control-allow-headers"]
+    assert response.headers["access-control-max-age"] == "600"
+    assert response.headers["vary"] == "Origin"
+    assert response.json() == {}
+
+
+def test_preflight_from_disallowed_origin_has_no_cors_headers():
+    """許可されていないオリジンのプリフライトにはCORSヘッダーを付けない"""
+    client = make_client([ALLOWED])
+    response = client.options("/items", headers={"Origin": OTHER, "Access-Control-Request-Method": "POST"})
+    assert response.status_code == 204
+    assert "access-control-allow-origin" not in response.headers
+
+
+def test_simple_request_from_allowed_origin():
+    """許可されたオリジンの通常のリクエストはレスポンスにCORSヘッダーを追加する"""
+    client = make_client([ALLOWED])
+    response = client.get("/items", headers={"Origin": ALLOWED})
+    assert response.status_code == 200
+    assert response.json() == {"items": []}
+    assert response.headers["access-control-allow-origin"] == ALLOWED
+    assert response.headers["access-control-allow-credentials"] == "true"
+    assert response.headers["access-control-expose-headers"] == "*"
+
+
+def test_simple_request_from_disallowed_origin():
+    """許可されていないオリジンのリクエストは処理するが、CORSヘッダーは付けない"""
+    client = make_client([ALLOWED])
+    response = client.get("/items", headers={"Origin": OTHER})
+    assert response.status_code == 200
+    assert "access-control-allow-origin" not in response.headers
+    assert "access-control-allow-credentials" not in response.headers
+
+
+def test_wildcard_echoes_origin_for_credentials():
+    """*の設定でも、Origin付きのリクエストには認証情報を許可するため具体的なオリジンを返す"""
+    client = make_client(["*"])
+    response = client.get("/items", headers={"Origin": OTHER})
+    assert response.headers["access-control-allow-origin"] == OTHER
+    assert response.headers["access-control-allow-credentials"] == "true"
+
+    response = client.get("/items")
+    assert response.headers["access-control-allow-origin"] == "*"
+
+
+def test_unhandled_error_keeps_cors_headers():
+    """エンドポイントの例外でも、ブラウザがエラーを読めるようCORSヘッダー付きの500を返す"""
+    client = make_client([ALLOWED])
+    response = client.get("/boom", headers={"Origin": ALLOWED})
+    assert response.status_code == 500
+    assert response.headers["access-control-allow-origin"] == ALLOWED
@@ -0,0 +1,84 @@
+import math
+
+import numpy as np
+import pytest
+
+from src.services.face_shape import (
+    CHEEK_FACTOR_THRESHOLD,
+    FACE_SHAPE_LABELS,
+    NARROW_RATIO,
+    TEMPLE_FACTOR_THRESHOLD,
+    WIDE_RATIO,
+    classify_face_shape,
+    classify_face_shapes,
+    face_shape_labels,
+)
+
+INF = math.inf
+NAN = math.nan
+
+# (顔幅, 鼻の高さ, 頬の面積, こめかみの位置)
+EDGE_CASES = [
+    # 0・負の値・NaN（判定できない測定値）
+    (0.0, 18.0, 45.0, 82.0),
+    (138.0, 0.0, 45.0, 82.0),
+    (0.0, 0.0, 0.0, 0.0),
+    (-138.0, 18.0, 45.0, 82.0),
+    (138.0, -18.0, 45.0, 82.0),
+    (NAN, 18.0, 45.0, 82.0),
+    (138.0, NAN, 45.0, 82.0),
+    (138.0, 18.0, NAN, NAN),
+    # 無限大・オーバーフロー・アンダーフロー
+    (INF, 18.0, 45.0, 82.0),
+    (138.0, INF, 45.0, 82.0),
+    (INF, INF, INF, INF),
+    (1e-200, 1e-200, 1.0, 1.0),
+    (1e200, 1e-200, 1e300, 1.0),
+    # しきい値ちょうど
+    (WIDE_RATIO * 100, 100.0, CHEEK_FACTOR_THRESHOLD * WIDE_RATIO * 100 * 100, 0.0),
+    (NARROW_RATIO * 100, 100.0, 0.0, TEMPLE_FACTOR_THRESHOLD * NARROW_RATIO * 100),
+    (100.0, 100.0, CHEEK_FACTOR_THRESHOLD * 100 * 100, 60.0),
+    # 通常の測定値（各顔型）
+    (138.0, 18.0, 45.0, 82.0),
+    (140.0, 100.0, 9000.0, 80.0),
+    (80.0, 100.0, 100.0, 70.0),
+    (80.0, 100.0, 100.0, 40.0),
+    (100.0, 100.0, 4000.0, 60.0),
+    (100.0, 100.0, 1000.0, 60.0),
+]
+
+
+@pytest.mark.parametrize("measurement", EDGE_CASES)
+def test_scalar_and_array_agree_on_edge_cases(measurement):
+    """1件用の判定と配列用の判定が境界値でも一致する"""
+    expected = classify_face_shape(*measurement)
+    codes = classify_face_shapes(*[[value] for value in measurement])
+    assert face_shape_labels(codes)[0] == expected
+
+
+def test_scalar_and_array_agree_on_random_measurements():
+    """1件用の判定と配列用の判定が無作為な測定値で一致する"""
+    rng = np.random.default_rng(0)
+    size = 5000
+    columns = [
+        rng.uniform(-10, 200, size),
+        rng.uniform(-10, 200, size),
+        rng.uniform(0, 20000, size),
+        rng.uniform(0, 250, size),
+    ]
+    labels = face_shape_labels(classify_face_shapes(*columns))
+    for row, label in zip(zip(*columns), labels):
+        assert classify_face_shape(*map(float, row)) == label
+
+
+@pytest.mark.parametrize("face_width, nose_height", [(0.0, 18.0), (138.0, 0.0), (-1.0, 18.0), (NAN, 18.0)])
+def test_unmeasurable_values_are_diamond(face_width, nose_height):
+    """顔幅・鼻の高さが0以下やNaNの場合は例外にせずダイヤモンド顔とする"""
+    assert classify_face_shape(face_width, nose_height, 45.0, 82.0) == "ダイヤモンド顔"
+
+
+def test_codes_index_labels():
+    """配列用の判定はFACE_SHAPE_LABELSのインデックスをint8で返す"""
+    codes = classify_face_shapes([140.0, 80.0], [100.0, 100.0], [9000.0, 100.0], [80.0, 40.0])
+    assert codes.dtype == np.int8
+    assert [FACE_SHAPE_LABELS[code] for code in codes] == ["丸顔", "卵型顔"]
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from src.services import vector_index
+from src.services.vector_index import FrameVectorIndex, embed_query
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_upsert_and_search_by_cosine_similarity():
+    """登録したベクトルをコサイン類似度の高い順に返す"""
+    index = FrameVectorIndex(mode="flat")
+    assert index.upsert([1, 2, 3], [[1, 0, 0], [0, 2, 0], [1, 1, 0]]) == 3
+    assert len(index) == 3 and index.dim == 3
+
+    results = index.search([1, 0, 0], k=2)
+    assert [frame_id for frame_id, _ in results] == [1, 3]
+    assert results[0][1] == pytest.approx(1.0)
+    assert results[1][1] == pytest.approx(float(unit(1, 1, 0)[0]))
+
+
+def test_upsert_updates_existing_rows():
+    """同じIDの再登録は行を追加せずに更新する"""
+    index = FrameVectorIndex(mode="flat")
+    index.upsert([1, 2], [[1, 0], [0, 1]])
+    index.upsert([1], [[0, 1]])
+    assert len(index) == 2
+    assert index.similarities([0, 1], [1, 2]) == {1: pytest.approx(1.0), 2: pytest.approx(1.0)}
+
+
+def test_remove_keeps_remaining_rows_searchable():
+    """削除は末尾の行と入れ替え、残りのIDと行の対応を保つ"""
+    index = FrameVectorIndex(mode="flat")
+    index.upsert([1, 2, 3], [[1, 0, 0], [0, 1, 0], [0, 0, 1]])
+    assert index.remove([1, 99]) == 1
+    assert len(index) == 2
+    assert index.search([0, 0, 1], k=1)[0][0] == 3
+    assert index.similarities([0, 1, 0], [1, 2, 3]) == {2: pytest.approx(1.0), 3: pytest.approx(0.0)}
+
+
+def test_zero_norm_rows_are_skipped():
+    """ノルム0の行は登録しない"""
+    index = FrameVectorIndex(mode="flat")
+    assert index.upsert([1, 2], [[0, 0], [1, 1]]) == 1
+    assert index.similarities([1, 1], [1, 2]) == {2: pytest.approx(1.0)}
+
+
+def test_all_zero_batch_does_not_fix_dimension():
+    """すべてノルム0のバッチ（エンベディング失敗時のダミー）では次元を確定しない"""
+    index = FrameVectorIndex(mode="flat")
+    assert index.upsert([1, 2], np.zeros((2, 1536))) == 0
+    assert index.dim is None
+    assert index.upsert([1, 2], [[1, 0, 0], [0, 1, 0]]) == 2
+    assert index.dim == 3
+
+
+def test_dimension_mismatch_is_rejected():
+    """次元の異なるベクトルの登録はエラーにし、異なる次元のクエリは結果なしとする"""
+    index = FrameVectorIndex(mode="flat")
+    index.upsert([1], [[1, 0, 0]])
+    with pytest.raises(ValueError):
+        index.upsert([2], [[1, 0]])
+    with pytest.raises(ValueError):
+        index.upsert([2, 3], [[1, 0, 0]])
+    assert index.search([1, 0], k=1) == []
+    assert index.similarities([1, 0], [1]) == {}
+
+
+def test_clear_resets_dimension():
+    """clearの後は別の次元で登録できる"""
+    index = FrameVectorIndex(mode="flat")
+    index.upsert([1], [[1, 0, 0]])
+    index.clear()
+    assert len(index) == 0 and index.dim is None
+    assert index.upsert([1], [[1, 0]]) == 1
+
+
+def test_ivf_search_finds_the_nearest_cluster():
+    """IVF方式でも、クエリに近いパーティションから上位を返す"""
+    rng = np.random.default_rng(0)
+    centers = np.eye(8, dtype=np.float32)
+    vectors = np.repeat(centers, 50, axis=0) + rng.normal(0, 0.01, (400, 8)).astype(np.float32)
+    index = FrameVectorIndex(mode="ivf", n_lists=8, n_probe=2)
+    index.upsert(list(range(400)), vectors)
+
+    flat = FrameVectorIndex(mode="flat")
+    flat.upsert(list(range(400)), vectors)
+    query = centers[3]
+    assert [frame_id for frame_id, _ in index.search(query, k=10)] == [frame_id for frame_id, _ in flat.search(query, k=10)]
+
+
+def test_embed_query_caches_per_backend(monkeypatch):
+    """クエリ文のエンベディングはバックエンドごとにキャッシュし、ゼロベクトルはキャッシュしない"""
+    monkeypatch.setattr(vector_index, "_query_vectors", vector_index.OrderedDict())
+
+    class Backend:
+        def __init__(self, name, vector):
+            self.name = name
+            self.vector = vector
+            self.calls = 0
+
+        def embed(self, texts):
+            self.calls += 1
+            return np.asarray([self.vector] * len(texts), dtype=np.float32)
+
+    first = Backend("a", [1.0, 0.0])
+    second = Backend("b", [0.0, 1.0])
+    failed = Backend("c", [0.0, 0.0])
+    for _ in range(3):
+        embed_query(first, "クラシック")
+        embed_query(second, "クラシック")
+        embed_query(failed, "クラシック")
+    assert (first.calls, second.calls, failed.calls) == (1, 1, 3)
+    assert embed_query(second, "クラシック").tolist() == [0.0, 1.0]